@@ -0,0 +1,121 @@
+"""
+Fan-out latency of the live alert stream to many local subscribers.
+
+Starts an AlertStream on 127.0.0.1 and a separate process holding the
+subscriber connections (asyncio, one StreamReader per client). A quarter of
+the clients subscribe to everything, a quarter to malicious verdicts only and
+the rest to a single IP. The detector side publishes verdicts stamped with
+time.time() at a fixed rate; every client records receive time minus stamp.
+Reports delivered/expected lines, latency percentiles across all deliveries,
+publish() cost and slow-subscriber drops.
+
+    python benchmarks/alert_fanout.py --clients 500 --events 2000 --rate 1000
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.config import ALERT_STREAM_CLIENT_BUFFER
+from src.Detection.alert_stream import AlertStream
+
+HOSTS = 50
+
+
+def client_spec(index):
+    if index % 4 == 0:
+        return {}
+    if index % 4 == 1:
+        return {"malicious_only": True}
+    return {"ips": [f"10.0.0.{index % HOSTS}"]}
+
+
+def expected_count(spec, events):
+    if not spec:
+        return events
+    if spec.get("malicious_only"):
+        return sum(1 for i in range(events) if i % 10 == 0)
+    host = int(spec["ips"][0].rsplit(".", 1)[1])
+    return sum(1 for i in range(events) if i % HOSTS == host)
+
+
+def run_clients(address, clients, events, ready, results):
+    async def client(index, latencies):
+        spec = client_spec(index)
+        reader, writer = await asyncio.open_connection(*address)
+        writer.write((json.dumps(spec) + "\n").encode())
+        await reader.readline()
+        ready.release()
+        received = 0
+        for _ in range(expected_count(spec, events)):
+            line = await reader.readline()
+            if not line:
+                break
+            latencies.append(time.time() - json.loads(line)["ts"])
+            received += 1
+        writer.close()
+        return received
+
+    async def run_all():
+        latencies = []
+        received = await asyncio.gather(*(client(i, latencies) for i in range(clients)))
+        return sum(received), latencies
+
+    received, latencies = asyncio.run(run_all())
+    latencies.sort()
+    results.put((received, [latencies[int(q * (len(latencies) - 1))] for q in (0.5, 0.9, 0.99, 1.0)]
+                 if latencies else [], statistics.fmean(latencies) if latencies else 0.0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=1000.0, help="Verdicts published per second")
+    parser.add_argument("--client-buffer", type=int, default=ALERT_STREAM_CLIENT_BUFFER)
+    args = parser.parse_args()
+
+    stream = AlertStream("127.0.0.1", 0, args.client_buffer, max_clients=args.clients + 1).start()
+    ready = multiprocessing.Semaphore(0)
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run_clients,
+                                      args=(stream.address, args.clients, args.events, ready, results))
+    process.start()
+    for _ in range(args.clients):
+        ready.acquire()
+    while len(stream.subscribers) < args.clients:
+        time.sleep(0.01)
+    print(f"{args.clients} subscribers connected")
+
+    publish_seconds = 0.0
+    start = time.perf_counter()
+    for i in range(args.events):
+        # Pace against the schedule rather than sleeping a fixed interval per event
+        delay = start + i / args.rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        t = time.perf_counter()
+        stream.publish(time.time(), f"10.0.0.{i % HOSTS}", "10.0.1.1", 40000, 443, "model",
+                       i % 10 == 0, f"event {i}")
+        publish_seconds += time.perf_counter() - t
+
+    received, percentiles, mean = results.get()
+    process.join()
+    stream.close()
+    expected = sum(expected_count(client_spec(i), args.events) for i in range(args.clients))
+    print(f"delivered {received}/{expected} lines, stream stats {stream.stats}")
+    print(f"publish(): {publish_seconds / args.events * 1e6:.1f} us/verdict on the detector thread")
+    if percentiles:
+        p50, p90, p99, worst = (value * 1000 for value in percentiles)
+        print(f"fan-out latency ms: mean {mean * 1000:.2f}  p50 {p50:.2f}  p90 {p90:.2f}  "
+              f"p99 {p99:.2f}  max {worst:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Loopback throughput test for split-mode detection.
+
+Starts a scorer on 127.0.0.1 (scoring with the vectorized labeling rules, so no
+trained model is needed) and several sensor processes that push synthetic
+feature records through SensorClient as fast as they can. Reports per-sensor
+and aggregate acknowledged records per second.
+
+    python benchmarks/distributed_loopback.py --sensors 4 --records 200000
+"""
+
+import argparse
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.config import FEATURE_COLUMNS, LABELING_RULES_PATH
+from utils.rule_engine import RuleSet
+from src.Detection import wire
+from src.Detection.scorer import ScorerServer, rule_scorer
+from src.Detection.sensor import SensorClient
+
+
+def synthetic_records(count, seed):
+    rng = random.Random(seed)
+    now = time.time()
+    for i in range(count):
+        yield wire.FeatureRecord(
+            now + i * 1e-4, f"10.0.{rng.randrange(256)}.{rng.randrange(1, 255)}", "10.0.0.1",
+            rng.randrange(1024, 65536), rng.choice([53, 80, 443, 5353, 51000]), 17,
+            rng.choice([1, 64, 128, 255]), rng.randrange(60, 1500), rng.randrange(2),
+            rng.random() * 50, rng.random() * 500, rng.randrange(64), rng.randrange(64)
+        )
+
+
+def run_sensor(index, port, records, batch_size, results):
+    # Pre-build records so the measurement covers batching, framing and transport only
+    batch = list(synthetic_records(records, index))
+    client = SensorClient("127.0.0.1", port, f"bench-{index}", batch_size=batch_size,
+                          max_buffered_batches=records // batch_size + 1).start()
+    start = time.perf_counter()
+    for record in batch:
+        client.add(record)
+    client.flush()
+    client.wait_idle(300)
+    elapsed = time.perf_counter() - start
+    client.close()
+    results.put((index, client.stats, elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sensors", type=int, default=4)
+    parser.add_argument("--records", type=int, default=100000, help="Records per sensor")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    rules = RuleSet.from_file(LABELING_RULES_PATH, FEATURE_COLUMNS)
+    server = ScorerServer(("127.0.0.1", 0), rule_scorer(rules))
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_sensor,
+                                         args=(i, port, args.records, args.batch_size, results))
+                 for i in range(args.sensors)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    reports = sorted(results.get() for _ in processes)
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    server.shutdown()
+    server.server_close()
+
+    total = 0
+    for index, stats, seconds in reports:
+        total += stats["acked_records"]
+        print(f"sensor {index}: {stats['acked_records']} records acked in {seconds:.2f}s "
+              f"({stats['acked_records'] / seconds:,.0f}/s), dropped {stats['dropped_records']}")
+    print(f"scorer: {server.stats['batches']} batches, "
+          f"{server.stats['score_seconds'] * 1000:.0f} ms spent scoring")
+    print(f"aggregate: {total} records in {elapsed:.2f}s = {total / elapsed:,.0f} records/s "
+          f"across {args.sensors} sensors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Per-packet cost of drift monitoring versus production scoring.
+
+Builds the detector's feature rows (the same values extract_features produces,
+host rates included) for a synthetic mixed scenario, then times on the same
+rows:
+
+- scoring: scaler.transform + model.predict on the one-row DataFrame, as
+           realtimeDetection.detect_record does for every scored packet
+- drift:   DriftMonitor.add per row, including the batch flushes and window
+           checks it triggers (configured as in the detector)
+
+Reports microseconds per row for each and drift as a share of scoring. Each
+measurement is the best of --repeat passes. Needs a trained model; the drift
+reference histograms are used if present.
+
+    python benchmarks/drift_overhead.py --duration 30
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.config import (
+    FEATURE_COLUMNS, HOST_RATE_COLUMNS, SKETCH_EPSILON, SKETCH_DELTA, SKETCH_WINDOW_SECONDS,
+    SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K, DRIFT_BATCH_SIZE
+)
+from src.Detection import realtimeDetection as detector
+from src.Detection.heavy_hitters import HostRateTracker
+from src.Sniffing.capture_engine import record_from_frame
+from benchmarks.scenarios import generate
+
+
+def feature_rows(duration, pps):
+    """Return [(timestamp, features_list)] for a mixed scenario, as the detector builds them."""
+    tracker = HostRateTracker(SKETCH_EPSILON, SKETCH_DELTA, SKETCH_WINDOW_SECONDS,
+                              SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K)
+    rows = []
+    for timestamp, frame, _, _ in generate("mixed", duration, pps):
+        record = record_from_frame(timestamp, frame)
+        if record is None:
+            continue
+        src_port, dst_port = record.src_port or 0, record.dst_port or 0
+        host_features = tracker.update(record.src_ip, record.dst_ip, dst_port, record.timestamp)
+        rows.append((timestamp, [src_port, dst_port, record.ttl, record.length, record.df] + host_features))
+    return rows
+
+
+def time_scoring(frames):
+    start = time.perf_counter()
+    for frame in frames:
+        detector.model.predict(detector.scaler.transform(frame[detector.model_columns]))
+    return time.perf_counter() - start
+
+
+def time_drift(rows):
+    """Time add() on a fresh monitor; returns (seconds, seconds spent in flush, batches)."""
+    detector.load_drift_monitor()
+    monitor = detector.drift_monitor
+    start = time.perf_counter()
+    for timestamp, row in rows:
+        monitor.add(row, timestamp)
+    return time.perf_counter() - start, monitor.stats["seconds"], monitor.stats["batches"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of scenario traffic")
+    parser.add_argument("--pps", type=float, default=500.0, help="Baseline packets per second")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if not detector.load_models():
+        sys.exit(1)
+    rows = feature_rows(args.duration, args.pps)
+    # DataFrame construction is part of extract_features, not of scoring
+    frames = [pd.DataFrame([row], columns=FEATURE_COLUMNS + HOST_RATE_COLUMNS) for _, row in rows]
+    print(f"{len(rows)} rows, drift batch size {DRIFT_BATCH_SIZE}")
+
+    scoring = min(time_scoring(frames) for _ in range(args.repeat))
+    drift, flush, batches = min(time_drift(rows) for _ in range(args.repeat))
+    scoring_us = scoring / len(rows) * 1e6
+    drift_us = drift / len(rows) * 1e6
+    print(f"scoring (transform + predict): {scoring_us:8.2f} us/row")
+    print(f"drift (add, incl. flush):      {drift_us:8.2f} us/row "
+          f"({flush / batches * 1e3 if batches else 0.0:.2f} ms per flush of {DRIFT_BATCH_SIZE})")
+    print(f"drift / scoring: {drift_us / scoring_us:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Scenario load test: detection quality versus packet rate.
+
+Replays the pcaps written by scenarios.py through the real-time detector
+(realtimeDetection.detect_record, behind a capture-engine sink with its bounded
+queue) at increasing packet rates. For every rate it reports drops, sink lag and
+per-packet precision/recall against the ground-truth labels, then the highest
+rate each scenario sustained without drops. Dropped packets count as missed.
+
+Timestamps are rewritten to replay time, so the host rate features see the
+replayed rate. Non-IP frames (ARP) are never handed to the detector and count
+as predicted normal.
+
+With --shadow every rate is replayed a second time with a ShadowScorer attached
+(the candidate model if one is trained, else the production model), so the
+cost of shadow mode shows up as detector time per packet and drops.
+
+    python benchmarks/load_harness.py --rates 1000 5000 20000
+    python benchmarks/load_harness.py --shadow --rates 2000 5000
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import time
+from collections import Counter, namedtuple
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.config import (
+    CAPTURE_SINK_QUEUE_SIZE, SKETCH_EPSILON, SKETCH_DELTA, SKETCH_WINDOW_SECONDS,
+    SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K, DNS_QUERY_TIMEOUT, DNS_MAX_PENDING, DNS_ANSWER_HOLD,
+    DNS_MAX_ANSWER_TTL, DNS_IP_TTL_TOLERANCE, DNS_MAX_RESOLVERS, MODEL_PATH, SCALER_PATH,
+    SHADOW_MODEL_PATH, SHADOW_SCALER_PATH, SHADOW_BATCH_SIZE, SHADOW_MAX_PENDING_BATCHES,
+    FEATURE_COLUMNS, HOST_RATE_COLUMNS
+)
+from utils.logger import logger
+from utils.pcap import read_pcap
+from src.Detection import realtimeDetection as detector
+from src.Detection.heavy_hitters import HostRateTracker
+from src.Detection.dns_monitor import DnsMonitor
+from src.Detection.shadow import ShadowScorer
+from src.Sniffing.capture_engine import Sink, record_from_frame
+from benchmarks.scenarios import DEFAULT_OUTPUT_DIR, SCENARIOS, generate, read_labels, write_scenario
+
+# What the sink queue carries: Sink measures lag from .timestamp
+ReplayItem = namedtuple("ReplayItem", ["timestamp", "index", "record"])
+
+
+def load_scenario(directory, name):
+    """Return (records, labels) for a scenario, generating it first if needed."""
+    pcap_path = directory / f"{name}.pcap"
+    labels_path = directory / f"{name}.labels.csv"
+    if not pcap_path.exists() or not labels_path.exists():
+        write_scenario(directory, name, generate(name))
+    records = [record_from_frame(ts, frame) for ts, frame in read_pcap(pcap_path)]
+    labels = read_labels(labels_path)
+    if len(records) != len(labels):
+        raise ValueError(f"{name}: {len(records)} packets but {len(labels)} labels")
+    return records, labels
+
+
+@contextlib.contextmanager
+def quiet_detector():
+    """Silence the detector's per-packet output for the duration of a replay.
+
+    redirect_stdout only catches print(); log_info goes to the stderr handler and
+    logs/logs.log, so records below ERROR are dropped as well.
+    """
+    level = logger.level
+    logger.setLevel(logging.ERROR)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        logger.setLevel(level)
+
+
+def reset_detector_state():
+    """Fresh sketches and DNS tables so each run starts cold."""
+    detector.host_tracker = HostRateTracker(
+        SKETCH_EPSILON, SKETCH_DELTA, SKETCH_WINDOW_SECONDS, SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K)
+    detector.dns_monitor = DnsMonitor(
+        DNS_QUERY_TIMEOUT, DNS_MAX_PENDING, DNS_ANSWER_HOLD, DNS_MAX_ANSWER_TTL,
+        DNS_IP_TTL_TOLERANCE, DNS_MAX_RESOLVERS)
+
+
+def replay(records, rate, queue_size):
+    """Offer records to a detector sink at rate packets/s; returns (verdicts, run stats)."""
+    reset_detector_state()
+    verdicts = [False] * len(records)
+
+    def handle(item):
+        verdicts[item.index] = detector.detect_record(item.record)
+
+    sink = Sink("detector", handle, queue_size)
+    sink.start()
+    start = time.perf_counter()
+    for index, record in enumerate(records):
+        delay = start + index / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if record is not None:
+            now = time.time()
+            sink.offer(ReplayItem(now, index, record._replace(timestamp=now)))
+    offered_seconds = time.perf_counter() - start
+    sink.stop()
+    stats = sink.stats
+    processed = stats["processed"]
+    return verdicts, {
+        "offered_pps": len(records) / offered_seconds,
+        "processed": processed,
+        "dropped": stats["dropped"],
+        "drop_rate": stats["dropped"] / max(processed + stats["dropped"], 1),
+        "lag_avg_ms": stats["lag_total"] / processed * 1000 if processed else 0.0,
+        "lag_max_ms": stats["lag_max"] * 1000,
+        "us_per_packet": stats["busy_seconds"] / processed * 1e6 if processed else 0.0,
+    }
+
+
+def replay_with_shadow(records, rate, queue_size):
+    """replay() with a shadow scorer attached; returns (run stats, shadow scorer stats)."""
+    if SHADOW_MODEL_PATH.exists() and SHADOW_SCALER_PATH.exists():
+        model_path, scaler_path = SHADOW_MODEL_PATH, SHADOW_SCALER_PATH
+    else:
+        model_path, scaler_path = MODEL_PATH, SCALER_PATH
+    detector.shadow_scorer = ShadowScorer(
+        model_path, scaler_path, FEATURE_COLUMNS + HOST_RATE_COLUMNS, detector.malicious_label,
+        SHADOW_BATCH_SIZE, SHADOW_MAX_PENDING_BATCHES, report_interval=3600.0).start()
+    try:
+        _, run = replay(records, rate, queue_size)
+    finally:
+        shadow_stats = dict(detector.shadow_scorer.stats)
+        detector.shadow_scorer.close()
+        detector.shadow_scorer = None
+    return run, shadow_stats
+
+
+def score(labels, verdicts):
+    """Per-packet precision, recall and per-attack recall."""
+    counts = Counter()
+    caught = Counter()
+    attacks = Counter()
+    for (label, attack), predicted in zip(labels, verdicts):
+        counts[(label, bool(predicted))] += 1
+        if label:
+            attacks[attack] += 1
+            caught[attack] += bool(predicted)
+    tp, fp, fn = counts[(1, True)], counts[(0, True)], counts[(1, False)]
+    return {
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+        "false_positives": fp,
+        "attack_recall": {attack: caught[attack] / total for attack, total in attacks.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--input", type=Path, default=DEFAULT_OUTPUT_DIR,
+                        help="Directory with scenario pcaps (missing ones are generated)")
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append",
+                        help="Scenario to replay (repeatable, default: all)")
+    parser.add_argument("--rates", type=float, nargs="+",
+                        default=[1000, 2000, 5000, 10000, 20000, 50000])
+    parser.add_argument("--queue-size", type=int, default=CAPTURE_SINK_QUEUE_SIZE)
+    parser.add_argument("--shadow", action="store_true",
+                        help="Also replay every rate with shadow scoring and report its cost")
+    args = parser.parse_args()
+
+    if not detector.load_models():
+        sys.exit(1)
+    detector.load_rules()
+
+    for name in args.scenario or SCENARIOS:
+        records, labels = load_scenario(args.input, name)
+        print(f"\n{name}: {len(records)} packets, {sum(label for label, _ in labels)} malicious")
+        print(f"{'rate':>8} {'offered':>9} {'dropped':>8} {'lag avg':>9} {'lag max':>9} "
+              f"{'us/pkt':>7} {'prec':>6} {'recall':>6}  per-attack recall")
+        sustained = None
+        for rate in sorted(args.rates):
+            # The detector prints and logs every verdict; keep the table readable
+            with quiet_detector():
+                verdicts, run = replay(records, rate, args.queue_size)
+            quality = score(labels, verdicts)
+            # Only counts if the replay itself kept up with the requested rate
+            if run["dropped"] == 0 and run["offered_pps"] >= 0.95 * rate:
+                sustained = rate
+            per_attack = ", ".join(f"{attack} {value:.0%}"
+                                   for attack, value in sorted(quality["attack_recall"].items()))
+            print(f"{rate:>8,.0f} {run['offered_pps']:>9,.0f} {run['drop_rate']:>8.1%} "
+                  f"{run['lag_avg_ms']:>7.1f}ms {run['lag_max_ms']:>7.1f}ms "
+                  f"{run['us_per_packet']:>7.1f} {quality['precision']:>6.1%} "
+                  f"{quality['recall']:>6.1%}  {per_attack}")
+            if args.shadow:
+                with quiet_detector():
+                    shadow_run, shadow_stats = replay_with_shadow(records, rate, args.queue_size)
+                baseline_us = run["us_per_packet"]
+                change = shadow_run["us_per_packet"] / baseline_us - 1 if baseline_us else 0.0
+                print(f"{'+shadow':>8} {shadow_run['offered_pps']:>9,.0f} {shadow_run['drop_rate']:>8.1%} "
+                      f"{shadow_run['lag_avg_ms']:>7.1f}ms {shadow_run['lag_max_ms']:>7.1f}ms "
+                      f"{shadow_run['us_per_packet']:>7.1f} ({change:+.1%} detector time per packet, "
+                      f"{shadow_stats['dropped']} shadow rows dropped)")
+        if sustained is None:
+            print(f"{name}: drops at every tested rate")
+        else:
+            print(f"{name}: max sustained rate without drops: {sustained:,.0f} packets/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Synthetic MITM scenario generator.
+
+Writes one pcap per scenario plus a ground-truth label file with one row per
+packet (same order as the pcap). Every scenario is a LAN baseline (web flows,
+DNS through an upstream resolver, mDNS announcements, ARP) with one attack
+overlaid:
+
+- baseline       no attack
+- arp_poisoning  gratuitous ARP replies claiming the gateway's IP
+- dns_spoofing   on-LAN attacker racing the resolver, plus blind answer floods
+- ttl_hijack     segments injected into a remote server's flow from the LAN
+                 (the server's usual IP TTL shifts)
+- syn_flood      high-rate SYNs from spoofed sources
+- mixed          all of the above
+
+    python benchmarks/scenarios.py --duration 60 --pps 200
+"""
+
+import argparse
+import csv
+import random
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.config import BASE_DIR
+from utils.pcap import (
+    PcapWriter, build_arp_frame, build_ipv4_frame, build_tcp, build_udp, PROTO_TCP, PROTO_UDP
+)
+from src.Detection.dns_monitor import build_dns_query, build_dns_response
+
+DEFAULT_OUTPUT_DIR = BASE_DIR / "datasets" / "scenarios"
+LABEL_COLUMNS = ["Index", "Timestamp", "Label", "Attack"]
+
+GATEWAY_IP = "192.168.1.1"
+GATEWAY_MAC = b"\x02\x00\x00\x00\x01\x01"
+ATTACKER_IP = "192.168.1.66"
+ATTACKER_MAC = b"\x02\x00\x00\x00\x66\x66"
+# Upstream resolver and its IP TTL as seen from the LAN
+RESOLVER_IP = "9.9.9.9"
+RESOLVER_TTL = 52
+MDNS_GROUP = "224.0.0.251"
+MDNS_MAC = b"\x01\x00\x5e\x00\x00\xfb"
+# Remote servers and the IP TTL their packets arrive with
+SERVERS = {
+    "93.184.216.34": 54, "151.101.1.69": 57, "142.250.74.46": 116,
+    "104.16.132.229": 58, "13.107.42.14": 111, "185.199.108.153": 55,
+}
+DOMAINS = ["example.com", "github.com", "bank.example", "mail.example.org",
+           "cdn.example.net", "updates.example.com"]
+LAN_HOSTS = [f"192.168.1.{i}" for i in range(10, 30)]
+
+
+def host_mac(ip):
+    return b"\x02\x00\x00\x00\x00" + bytes([int(ip.rsplit(".", 1)[1])])
+
+
+class Scenario:
+    """Collects labelled frames; written sorted by timestamp."""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.events = []  # (timestamp, sequence, frame, label, attack)
+        self.txids = {}
+
+    def add(self, ts, frame, attack=None):
+        self.events.append((ts, len(self.events), frame, 0 if attack is None else 1,
+                            attack or "none"))
+
+    def next_txid(self, client):
+        self.txids[client] = (self.txids.get(client, self.rng.randrange(1 << 16)) + 1) & 0xFFFF
+        return self.txids[client]
+
+    def sorted_events(self):
+        return sorted(self.events)
+
+
+def add_baseline(scenario, start, duration, pps):
+    """LAN traffic mix at roughly pps packets per second."""
+    rng = scenario.rng
+    ts = start
+    end = start + duration
+    flows = {}
+    while True:
+        ts += rng.expovariate(pps)
+        if ts >= end:
+            return
+        host = rng.choice(LAN_HOSTS)
+        kind = rng.random()
+        if kind < 0.78:
+            # Web flow segment, either direction
+            server = rng.choice(list(SERVERS))
+            key = (host, server)
+            if key not in flows:
+                flows[key] = (rng.randrange(32768, 61000), rng.choice([80, 443, 443, 443]))
+            sport, dport = flows[key]
+            if rng.random() < 0.4:
+                segment = build_tcp(sport, dport, b"\x00" * rng.randrange(0, 600))
+                frame = build_ipv4_frame(host, server, PROTO_TCP, segment, ttl=64,
+                                         src_mac=host_mac(host), dst_mac=GATEWAY_MAC)
+            else:
+                segment = build_tcp(dport, sport, b"\x00" * rng.randrange(0, 1400))
+                frame = build_ipv4_frame(server, host, PROTO_TCP, segment, ttl=SERVERS[server],
+                                         src_mac=GATEWAY_MAC, dst_mac=host_mac(host))
+            scenario.add(ts, frame)
+        elif kind < 0.88:
+            # DNS lookup through the upstream resolver, answered once
+            txid = scenario.next_txid(host)
+            port = rng.randrange(32768, 61000)
+            name = rng.choice(DOMAINS)
+            scenario.add(ts, build_ipv4_frame(
+                host, RESOLVER_IP, PROTO_UDP, build_udp(port, 53, build_dns_query(txid, name)),
+                src_mac=host_mac(host), dst_mac=GATEWAY_MAC))
+            answer = build_dns_response(txid, name, [rng.choice(list(SERVERS))])
+            scenario.add(ts + rng.uniform(0.01, 0.04), build_ipv4_frame(
+                RESOLVER_IP, host, PROTO_UDP, build_udp(53, port, answer), ttl=RESOLVER_TTL,
+                src_mac=GATEWAY_MAC, dst_mac=host_mac(host)))
+        elif kind < 0.96:
+            # mDNS announcement (multicast, TTL 255, no DF)
+            announcement = build_dns_response(0, f"host{host.rsplit('.', 1)[1]}.local", [host], ttl=120)
+            scenario.add(ts, build_ipv4_frame(
+                host, MDNS_GROUP, PROTO_UDP, build_udp(5353, 5353, announcement), ttl=255,
+                df=False, src_mac=host_mac(host), dst_mac=MDNS_MAC))
+        else:
+            # ARP request for the gateway and its reply
+            scenario.add(ts, build_arp_frame(1, host_mac(host), host, b"\x00" * 6, GATEWAY_IP))
+            scenario.add(ts + 0.0005, build_arp_frame(2, GATEWAY_MAC, GATEWAY_IP, host_mac(host),
+                                                      host, dst_mac=host_mac(host)))
+
+
+def add_arp_poisoning(scenario, start, duration, interval=0.5, victims=4):
+    """Attacker keeps telling victims that the gateway's IP is at its MAC."""
+    targets = scenario.rng.sample(LAN_HOSTS, victims)
+    ts = start
+    while ts < start + duration:
+        for victim in targets:
+            scenario.add(ts, build_arp_frame(2, ATTACKER_MAC, GATEWAY_IP, host_mac(victim), victim,
+                                             dst_mac=host_mac(victim)), "arp_poisoning")
+        ts += interval
+
+
+def add_dns_spoofing(scenario, start, duration, lookups_per_second=5, flood_every=5.0, flood_size=50):
+    """Raced answers from the LAN (wrong IP TTL) and blind floods of guessed transaction IDs."""
+    rng = scenario.rng
+    ts = start
+    next_flood = start + flood_every / 2
+    while ts < start + duration:
+        victim = rng.choice(LAN_HOSTS)
+        txid = scenario.next_txid(victim)
+        port = rng.randrange(32768, 61000)
+        name = rng.choice(DOMAINS)
+        scenario.add(ts, build_ipv4_frame(
+            victim, RESOLVER_IP, PROTO_UDP, build_udp(port, 53, build_dns_query(txid, name)),
+            src_mac=host_mac(victim), dst_mac=GATEWAY_MAC))
+        # The attacker sees the query first and answers from one hop away
+        forged = build_dns_response(txid, name, [ATTACKER_IP], ttl=rng.choice([300, 86400]))
+        scenario.add(ts + rng.uniform(0.001, 0.004), build_ipv4_frame(
+            RESOLVER_IP, victim, PROTO_UDP, build_udp(53, port, forged), ttl=64,
+            src_mac=ATTACKER_MAC, dst_mac=host_mac(victim)), "dns_spoofing")
+        # The genuine answer still arrives afterwards
+        genuine = build_dns_response(txid, name, [rng.choice(list(SERVERS))])
+        scenario.add(ts + rng.uniform(0.02, 0.05), build_ipv4_frame(
+            RESOLVER_IP, victim, PROTO_UDP, build_udp(53, port, genuine), ttl=RESOLVER_TTL,
+            src_mac=GATEWAY_MAC, dst_mac=host_mac(victim)))
+
+        if ts >= next_flood:
+            # Blind spoofing: guessed transaction IDs and ports, no matching query
+            for i in range(flood_size):
+                payload = build_dns_response(rng.randrange(1 << 16), name, [ATTACKER_IP])
+                scenario.add(ts + i * 0.0002, build_ipv4_frame(
+                    RESOLVER_IP, victim, PROTO_UDP,
+                    build_udp(53, rng.randrange(32768, 61000), payload), ttl=RESOLVER_TTL,
+                    src_mac=ATTACKER_MAC, dst_mac=host_mac(victim)), "dns_spoofing")
+            next_flood += flood_every
+        ts += rng.expovariate(lookups_per_second)
+
+
+def add_ttl_hijack(scenario, start, duration, pps=20, flows=3):
+    """Segments claiming to come from remote servers but injected from the LAN (IP TTL 64)."""
+    rng = scenario.rng
+    hijacked = [(rng.choice(LAN_HOSTS), rng.choice(list(SERVERS)), rng.randrange(32768, 61000))
+                for _ in range(flows)]
+    ts = start
+    while ts < start + duration:
+        victim, server, port = rng.choice(hijacked)
+        segment = build_tcp(443, port, b"\x00" * rng.randrange(100, 1400))
+        scenario.add(ts, build_ipv4_frame(server, victim, PROTO_TCP, segment, ttl=64,
+                                          src_mac=ATTACKER_MAC, dst_mac=host_mac(victim)),
+                     "ttl_hijack")
+        ts += rng.expovariate(pps)
+
+
+def add_syn_flood(scenario, start, duration, pps=4000):
+    """SYNs from random spoofed sources to one LAN host."""
+    rng = scenario.rng
+    target = rng.choice(LAN_HOSTS)
+    ts = start
+    while ts < start + duration:
+        source = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+        segment = build_tcp(rng.randrange(1024, 65536), 80, seq=rng.randrange(1 << 32), flags=0x02)
+        scenario.add(ts, build_ipv4_frame(source, target, PROTO_TCP, segment,
+                                          ttl=rng.randrange(32, 256), df=False,
+                                          src_mac=GATEWAY_MAC, dst_mac=host_mac(target)),
+                     "syn_flood")
+        ts += rng.expovariate(pps)
+
+
+# Attack overlays: name -> (function, start fraction, length fraction of the scenario)
+ATTACKS = {
+    "arp_poisoning": (add_arp_poisoning, 0.3, 0.6),
+    "dns_spoofing": (add_dns_spoofing, 0.2, 0.6),
+    "ttl_hijack": (add_ttl_hijack, 0.4, 0.4),
+    "syn_flood": (add_syn_flood, 0.5, 0.1),
+}
+SCENARIOS = ["baseline", *ATTACKS, "mixed"]
+
+
+def generate(name, duration=60.0, pps=200.0, seed=1, start=1_700_000_000.0):
+    """Return the scenario's packets as sorted (timestamp, frame, label, attack) tuples."""
+    if name not in SCENARIOS:
+        raise ValueError(f"Unknown scenario '{name}', expected one of {SCENARIOS}")
+    scenario = Scenario(seed)
+    add_baseline(scenario, start, duration, pps)
+    attacks = list(ATTACKS) if name == "mixed" else [name] if name in ATTACKS else []
+    for attack in attacks:
+        add, offset, length = ATTACKS[attack]
+        add(scenario, start + offset * duration, length * duration)
+    return [(ts, frame, label, attack) for ts, _, frame, label, attack in scenario.sorted_events()]
+
+
+def write_scenario(output_dir, name, packets):
+    """Write <name>.pcap and <name>.labels.csv; returns both paths."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    pcap_path = output_dir / f"{name}.pcap"
+    labels_path = output_dir / f"{name}.labels.csv"
+    with PcapWriter(pcap_path) as writer, open(labels_path, "w", newline="") as labels:
+        rows = csv.writer(labels)
+        rows.writerow(LABEL_COLUMNS)
+        for index, (ts, frame, label, attack) in enumerate(packets):
+            writer.write(ts, frame)
+            rows.writerow([index, f"{ts:.6f}", label, attack])
+    return pcap_path, labels_path
+
+
+def read_labels(path):
+    """Return [(label, attack)] in pcap order."""
+    with open(path, newline="") as labels:
+        return [(int(row["Label"]), row["Attack"]) for row in csv.DictReader(labels)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append",
+                        help="Scenario to write (repeatable, default: all)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of traffic")
+    parser.add_argument("--pps", type=float, default=200.0, help="Baseline packets per second")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for name in args.scenario or SCENARIOS:
+        packets = generate(name, args.duration, args.pps, args.seed)
+        pcap_path, _ = write_scenario(args.output, name, packets)
+        malicious = sum(label for _, _, label, _ in packets)
+        print(f"{name:>14}: {len(packets):>7} packets, {malicious:>6} malicious -> {pcap_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Single-process detector versus two-process capture/inference over shared memory.
+
+Both modes get the same frames (a synthetic mixed scenario) and do the same
+work per packet: scapy dissection, host rate features and model scoring.
+Logging is limited to errors in both processes and the single-process run
+skips the DNS checks, which the inference process does not have.
+
+- single:  realtimeDetection.detect_record per packet, one GIL
+- two:     dissection + features + ring push here, batched scoring in the
+           inference process (shm_detector.inference_worker)
+
+Reports packets per second end to end (until every packet is scored), the
+capture-side cost per packet and ring overruns. Needs a trained model.
+
+    python benchmarks/shm_pipeline.py --duration 30
+"""
+
+import argparse
+import logging
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+from scapy.all import Ether
+
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.config import (
+    SKETCH_EPSILON, SKETCH_DELTA, SKETCH_WINDOW_SECONDS, SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K
+)
+from utils.logger import logger
+from src.Detection import realtimeDetection as detector
+from src.Detection.heavy_hitters import HostRateTracker
+from src.Detection.sensor import to_feature_record
+from src.Detection.shm_detector import inference_worker
+from src.Detection.shm_ring import SharedRing
+from src.Sniffing.capture_engine import dissect
+from benchmarks.load_harness import quiet_detector
+from benchmarks.scenarios import generate
+
+
+def run_single(frames):
+    inspect_dns = detector.inspect_dns
+    detector.inspect_dns = lambda record: []
+    try:
+        with quiet_detector():
+            start = time.perf_counter()
+            for frame in frames:
+                record = dissect(Ether(frame))
+                if record is not None:
+                    detector.detect_record(record)
+            return time.perf_counter() - start
+    finally:
+        detector.inspect_dns = inspect_dns
+
+
+def quiet_inference_worker(*args):
+    """inference_worker logging only errors, like the single-process run."""
+    logger.setLevel(logging.ERROR)
+    inference_worker(*args)
+
+
+def run_two(frames, ring_records, batch_size):
+    ring = SharedRing.create(ring_records)
+    stopping = multiprocessing.Event()
+    worker = multiprocessing.Process(target=quiet_inference_worker,
+                                     args=(ring.name, batch_size, 0.0005, stopping, 3600, None))
+    worker.start()
+    # Let the worker load the model before timing
+    time.sleep(2.0)
+    tracker = HostRateTracker(SKETCH_EPSILON, SKETCH_DELTA, SKETCH_WINDOW_SECONDS,
+                              SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K)
+    start = time.perf_counter()
+    for frame in frames:
+        record = dissect(Ether(frame))
+        if record is not None:
+            ring.push(to_feature_record(record, tracker))
+    capture_seconds = time.perf_counter() - start
+    while ring.stats()["occupancy"]:
+        time.sleep(0.0005)
+    total_seconds = time.perf_counter() - start
+    stopping.set()
+    worker.join()
+    stats = ring.stats()
+    ring.close()
+    return capture_seconds, total_seconds, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of scenario traffic")
+    parser.add_argument("--pps", type=float, default=500.0, help="Baseline packets per second")
+    parser.add_argument("--ring-records", type=int, default=1 << 20)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    if not detector.load_models():
+        sys.exit(1)
+    frames = [frame for _, frame, _, _ in generate("mixed", args.duration, args.pps)]
+    print(f"{len(frames)} frames")
+
+    single = run_single(frames)
+    print(f"single process: {len(frames) / single:>9,.0f} packets/s "
+          f"({single / len(frames) * 1e6:.1f} us/packet)")
+
+    capture, total, stats = run_two(frames, args.ring_records, args.batch_size)
+    print(f"two processes:  {len(frames) / total:>9,.0f} packets/s end to end, capture side "
+          f"{capture / len(frames) * 1e6:.1f} us/packet, {stats['overruns']} ring overruns")
+    print(f"speedup: {single / total:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
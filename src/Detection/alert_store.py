@@ -0,0 +1,214 @@
+"""
+Indexed SQLite storage for detector verdicts.
+
+The packet loop only puts rows on a bounded queue; a background writer thread
+commits them in batched transactions to a WAL-mode database and periodically
+prunes rows older than the retention period. If the queue is full, rows are
+dropped and counted so the detector never blocks on disk.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from utils.logger import log_info, log_error
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    src_ip TEXT NOT NULL,
+    dst_ip TEXT NOT NULL,
+    src_port INTEGER,
+    dst_port INTEGER,
+    kind TEXT NOT NULL,
+    malicious INTEGER NOT NULL,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts (ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_src_ts ON alerts (src_ip, ts);
+CREATE INDEX IF NOT EXISTS idx_alerts_dst_ts ON alerts (dst_ip, ts);
+"""
+
+INSERT = ("INSERT INTO alerts (ts, src_ip, dst_ip, src_port, dst_port, kind, malicious, detail) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+COLUMNS = ["ts", "src_ip", "dst_ip", "src_port", "dst_port", "kind", "malicious", "detail"]
+
+_STOP = object()
+
+
+def connect(path, readonly=False):
+    """Open the alert database, creating the schema for writable connections."""
+    if readonly:
+        conn = sqlite3.connect(f"file:{Path(path).as_posix()}?mode=ro", uri=True)
+    else:
+        conn = sqlite3.connect(str(path))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+    return conn
+
+
+class AlertStore:
+    """Batched background writer for the alerts table."""
+
+    def __init__(self, path, batch_size=500, flush_interval=1.0, max_queue=100000,
+                 retention_seconds=None, prune_interval=3600.0):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_seconds = retention_seconds
+        self.prune_interval = prune_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.thread = None
+        self.stats = {"queued": 0, "written": 0, "dropped": 0, "batches": 0, "pruned": 0}
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="alert-store", daemon=True)
+        self.thread.start()
+        return self
+
+    def record(self, ts, src_ip, dst_ip, src_port, dst_port, kind, malicious, detail=""):
+        """Queue one verdict for writing; never blocks."""
+        try:
+            self.queue.put_nowait((ts, src_ip, dst_ip, src_port, dst_port, kind,
+                                   int(bool(malicious)), detail))
+            self.stats["queued"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def close(self, timeout=10.0):
+        """Flush queued rows and stop the writer thread, waiting at most timeout seconds.
+
+        If the writer has died or cannot keep up, the rows still queued are counted
+        as dropped and logged instead of blocking shutdown.
+        """
+        if self.thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        if self.thread.is_alive():
+            try:
+                self.queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self.thread.join(max(0.0, deadline - time.monotonic()))
+        if self.thread.is_alive() or not self.queue.empty():
+            lost = sum(1 for item in list(self.queue.queue) if item is not _STOP)
+            self.stats["dropped"] += lost
+            log_error(f"Alert store: writer did not finish within {timeout:g}s, "
+                      f"{lost} queued alerts were not written")
+        self.thread = None
+
+    def prune(self, conn, now=None):
+        """Delete rows older than the retention period; returns the number removed."""
+        if not self.retention_seconds:
+            return 0
+        cutoff = (now or time.time()) - self.retention_seconds
+        with conn:
+            removed = conn.execute("DELETE FROM alerts WHERE ts < ?", (cutoff,)).rowcount
+        self.stats["pruned"] += removed
+        if removed:
+            log_info(f"Alert store: pruned {removed} alerts older than {self.retention_seconds:g}s")
+        return removed
+
+    def _write(self, conn, batch):
+        try:
+            with conn:
+                conn.executemany(INSERT, batch)
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+        except sqlite3.Error as e:
+            log_error(f"Alert store: failed to write {len(batch)} alerts: {e}")
+
+    def _run(self):
+        try:
+            conn = connect(self.path)
+        except sqlite3.Error as e:
+            log_error(f"Alert store writer could not open {self.path}: {e}")
+            return
+        next_prune = time.monotonic()
+        batch = []
+        deadline = None
+        stopping = False
+        try:
+            while not stopping:
+                timeout = self.flush_interval if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self.queue.get(timeout=timeout)
+                    if item is _STOP:
+                        stopping = True
+                    else:
+                        batch.append(item)
+                        if deadline is None:
+                            deadline = time.monotonic() + self.flush_interval
+                except queue.Empty:
+                    pass
+
+                if batch and (stopping or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                    self._write(conn, batch)
+                    batch = []
+                    deadline = None
+
+                if time.monotonic() >= next_prune:
+                    self.prune(conn)
+                    next_prune = time.monotonic() + self.prune_interval
+        except Exception as e:
+            log_error(f"Alert store writer stopped: {e}")
+        finally:
+            conn.close()
+
+
+def query_alerts(path, ip=None, src_ip=None, dst_ip=None, since=None, until=None,
+                 malicious_only=False, limit=1000):
+    """Return matching alert rows (newest first) as dictionaries."""
+    clauses, params = [], []
+    if ip:
+        clauses.append("(src_ip = ? OR dst_ip = ?)")
+        params += [ip, ip]
+    if src_ip:
+        clauses.append("src_ip = ?")
+        params.append(src_ip)
+    if dst_ip:
+        clauses.append("dst_ip = ?")
+        params.append(dst_ip)
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        params.append(until)
+    if malicious_only:
+        clauses.append("malicious = 1")
+
+    sql = f"SELECT {', '.join(COLUMNS)} FROM alerts"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY ts DESC LIMIT ?"
+    params.append(limit)
+
+    conn = connect(path, readonly=True)
+    try:
+        return [dict(zip(COLUMNS, row)) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def summarize_hosts(path, since=None, until=None, limit=20):
+    """Return the hosts with the most malicious verdicts as (ip, alert count) pairs."""
+    clauses, params = ["malicious = 1"], []
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        params.append(until)
+    sql = (f"SELECT src_ip, COUNT(*) AS n FROM alerts WHERE {' AND '.join(clauses)} "
+           "GROUP BY src_ip ORDER BY n DESC LIMIT ?")
+    conn = connect(path, readonly=True)
+    try:
+        return conn.execute(sql, params + [limit]).fetchall()
+    finally:
+        conn.close()
@@ -0,0 +1,310 @@
+"""
+Live alert subscriptions over a local TCP socket (JSON lines).
+
+An asyncio server runs in a background thread. The detector calls publish()
+with the same fields it stores in the alert database. The call appends to a
+bounded deque and wakes the event loop at most once per burst, so it never
+blocks on subscribers. The loop serializes each verdict once and hands it to
+every subscriber whose filter matches; IP-filtered subscribers are indexed by
+address, and each subscriber gets one socket write per wakeup however many
+verdicts it covers.
+
+Protocol: the client sends one JSON line with its filter, e.g.
+{"malicious_only": true, "ips": ["10.0.0.5"], "kinds": ["model", "dns_spoofed"]}
+(an empty line or {} subscribes to everything). The server answers
+{"subscribed": {...}}, then streams one JSON object per verdict with the
+alert_store.COLUMNS keys. A subscriber whose unsent output exceeds the per-client
+buffer is disconnected instead of slowing down everyone else.
+
+    python src/Detection/alert_stream.py --malicious-only --ip 10.0.0.5
+"""
+
+import argparse
+import asyncio
+import ipaddress
+import json
+import socket
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from utils.config import ALERT_STREAM_HOST, ALERT_STREAM_PORT
+from utils.logger import log_info, log_error, log_warning
+from src.Detection.alert_store import COLUMNS
+
+_FILTER_KEYS = {"malicious_only", "ips", "kinds"}
+
+
+def _string_set(spec, key):
+    values = spec.get(key)
+    if values is None:
+        return None
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise ValueError(f"'{key}' must be a list of strings")
+    return frozenset(values) or None
+
+
+def parse_filter(line):
+    """Validate a subscription line; returns (malicious_only, ips or None, kinds or None).
+
+    Raises ValueError for anything that is not a well-formed filter.
+    """
+    text = line.strip()
+    spec = json.loads(text) if text else {}
+    if not isinstance(spec, dict) or set(spec) - _FILTER_KEYS:
+        raise ValueError(f"filter must be an object with keys {sorted(_FILTER_KEYS)}")
+    malicious_only = spec.get("malicious_only", False)
+    if not isinstance(malicious_only, bool):
+        raise ValueError("'malicious_only' must be true or false")
+    ips = _string_set(spec, "ips")
+    if ips is not None:
+        # Verdicts carry addresses in canonical form
+        ips = frozenset(str(ipaddress.ip_address(ip)) for ip in ips)
+    return malicious_only, ips, _string_set(spec, "kinds")
+
+
+class _Subscriber:
+    __slots__ = ("transport", "malicious_only", "ips", "kinds", "peer")
+
+    def __init__(self, transport, malicious_only, ips, kinds, peer):
+        self.transport = transport
+        self.malicious_only = malicious_only
+        self.ips = ips
+        self.kinds = kinds
+        self.peer = peer
+
+    def wants(self, event):
+        _, src_ip, dst_ip, _, _, kind, malicious, _ = event
+        if self.malicious_only and not malicious:
+            return False
+        if self.ips is not None and src_ip not in self.ips and dst_ip not in self.ips:
+            return False
+        return self.kinds is None or kind in self.kinds
+
+
+class AlertStream:
+    """Fan-out of detector verdicts to filtered TCP subscribers."""
+
+    def __init__(self, host=ALERT_STREAM_HOST, port=ALERT_STREAM_PORT, client_buffer=262144,
+                 max_pending=10000, max_clients=1000, handshake_timeout=10.0):
+        self.host = host
+        self.port = port
+        self.client_buffer = client_buffer
+        self.max_pending = max_pending
+        self.max_clients = max_clients
+        self.handshake_timeout = handshake_timeout
+        self.pending = deque()
+        self.subscribers = set()
+        # Subscribers with an IP filter, by IP; the rest see every event
+        self._by_ip = {}
+        self._any_ip = set()
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self._wakeup = False
+        self.stats = {"published": 0, "dropped": 0, "delivered": 0, "subscribed": 0,
+                      "slow_disconnects": 0, "rejected": 0}
+
+    @property
+    def address(self):
+        """(host, port) the server listens on; port is resolved when started with port 0."""
+        return self.server.sockets[0].getsockname()[:2]
+
+    def start(self):
+        """Start the event loop thread and wait until the server is listening."""
+        ready = threading.Event()
+        failure = []
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            try:
+                self.server = self.loop.run_until_complete(
+                    asyncio.start_server(self._serve, self.host, self.port, limit=4096))
+            except OSError as e:
+                failure.append(e)
+                ready.set()
+                self.loop.close()
+                return
+            ready.set()
+            self.loop.run_forever()
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run, name="alert-stream", daemon=True)
+        self.thread.start()
+        ready.wait()
+        if failure:
+            self.thread = None
+            raise failure[0]
+        return self
+
+    def publish(self, ts, src_ip, dst_ip, src_port, dst_port, kind, malicious, detail=""):
+        """Queue one verdict for subscribers; never blocks."""
+        if len(self.pending) >= self.max_pending:
+            self.stats["dropped"] += 1
+            return
+        self.pending.append((ts, src_ip, dst_ip, src_port, dst_port, kind, bool(malicious), detail))
+        self.stats["published"] += 1
+        if not self._wakeup and self.loop is not None:
+            self._wakeup = True
+            self.loop.call_soon_threadsafe(self._fan_out)
+
+    def close(self, timeout=5.0):
+        """Disconnect every subscriber and stop the server thread."""
+        if self.thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        self.thread = None
+
+    # Event loop side
+
+    def _add(self, subscriber):
+        self.subscribers.add(subscriber)
+        if subscriber.ips is None:
+            self._any_ip.add(subscriber)
+        for ip in subscriber.ips or ():
+            self._by_ip.setdefault(ip, set()).add(subscriber)
+
+    def _remove(self, subscriber):
+        self.subscribers.discard(subscriber)
+        self._any_ip.discard(subscriber)
+        for ip in subscriber.ips or ():
+            watchers = self._by_ip.get(ip)
+            if watchers is not None:
+                watchers.discard(subscriber)
+                if not watchers:
+                    del self._by_ip[ip]
+
+    def _fan_out(self):
+        # Cleared before draining, so a publish() racing with this drain schedules another one
+        self._wakeup = False
+        pending = self.pending
+        batches = {}
+        while pending:
+            event = pending.popleft()
+            line = None
+            src_watchers = self._by_ip.get(event[1], ())
+            dst_watchers = self._by_ip.get(event[2], ()) if event[2] != event[1] else ()
+            for group, skip in ((self._any_ip, ()), (src_watchers, ()), (dst_watchers, src_watchers)):
+                for subscriber in group:
+                    # A subscriber watching both addresses gets the event once
+                    if subscriber in skip or not subscriber.wants(event):
+                        continue
+                    if line is None:
+                        line = (json.dumps(dict(zip(COLUMNS, event)), ensure_ascii=False) + "\n").encode()
+                    batch = batches.get(subscriber)
+                    if batch is None:
+                        batches[subscriber] = [line]
+                    else:
+                        batch.append(line)
+
+        for subscriber, lines in batches.items():
+            transport = subscriber.transport
+            if transport.is_closing():
+                self._remove(subscriber)
+                continue
+            transport.write(b"".join(lines))
+            self.stats["delivered"] += len(lines)
+            if transport.get_write_buffer_size() > self.client_buffer:
+                log_warning(f"Alert stream: dropping slow subscriber {subscriber.peer}")
+                self.stats["slow_disconnects"] += 1
+                self._remove(subscriber)
+                transport.abort()
+
+    async def _serve(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        if len(self.subscribers) >= self.max_clients:
+            self.stats["rejected"] += 1
+            writer.write(b'{"error": "too many subscribers"}\n')
+            writer.close()
+            return
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.handshake_timeout)
+            malicious_only, ips, kinds = parse_filter(line.decode())
+        except (asyncio.TimeoutError, ValueError, UnicodeDecodeError, ConnectionError) as e:
+            self.stats["rejected"] += 1
+            writer.write((json.dumps({"error": f"bad subscription: {e}"}) + "\n").encode())
+            writer.close()
+            return
+
+        # Keep the kernel buffer small too, so client_buffer bounds what a stalled client holds
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.client_buffer)
+        subscriber = _Subscriber(writer.transport, malicious_only, ips, kinds, peer)
+        ack = {"malicious_only": malicious_only, "ips": sorted(ips or ()), "kinds": sorted(kinds or ())}
+        writer.write((json.dumps({"subscribed": ack}) + "\n").encode())
+        self._add(subscriber)
+        self.stats["subscribed"] += 1
+        try:
+            # Subscribers only listen; wait for them to hang up
+            while await reader.read(4096):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self._remove(subscriber)
+            writer.close()
+
+    async def _shutdown(self):
+        self.server.close()
+        for subscriber in tuple(self.subscribers):
+            subscriber.transport.close()
+            self._remove(subscriber)
+        await self.server.wait_closed()
+
+
+def subscribe(host=ALERT_STREAM_HOST, port=ALERT_STREAM_PORT, malicious_only=False, ips=None,
+              kinds=None):
+    """Connect to an AlertStream and yield verdict dictionaries as they arrive."""
+    spec = {"malicious_only": malicious_only}
+    if ips:
+        spec["ips"] = list(ips)
+    if kinds:
+        spec["kinds"] = list(kinds)
+    with socket.create_connection((host, port)) as sock:
+        sock.sendall((json.dumps(spec) + "\n").encode())
+        lines = sock.makefile("r", encoding="utf-8")
+        reply = json.loads(lines.readline() or "{}")
+        if "subscribed" not in reply:
+            raise ConnectionError(reply.get("error", "subscription refused"))
+        for line in lines:
+            yield json.loads(line)
+
+
+def main():
+    """Print live verdicts from a running detector."""
+    parser = argparse.ArgumentParser(description="Subscribe to live MITM detection verdicts")
+    parser.add_argument("--host", default=ALERT_STREAM_HOST)
+    parser.add_argument("--port", type=int, default=ALERT_STREAM_PORT)
+    parser.add_argument("--malicious-only", action="store_true", help="Skip normal verdicts")
+    parser.add_argument("--ip", action="append", help="Only verdicts involving this IP (repeatable)")
+    parser.add_argument("--kind", action="append", help="Only this alert kind, e.g. model (repeatable)")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON lines")
+    args = parser.parse_args()
+
+    try:
+        for row in subscribe(args.host, args.port, args.malicious_only, args.ip, args.kind):
+            if args.json:
+                print(json.dumps(row, ensure_ascii=False), flush=True)
+                continue
+            timestamp = datetime.fromtimestamp(row["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+            label = "Malicious 🚨" if row["malicious"] else "Normal ✅"
+            print(f"[{timestamp}] {label} {row['kind']} | {row['src_ip']}:{row['src_port']} → "
+                  f"{row['dst_ip']}:{row['dst_port']} | {row['detail']}", flush=True)
+    except KeyboardInterrupt:
+        return 0
+    except (OSError, ValueError) as e:
+        log_error(f"Alert stream subscription failed: {e}")
+        return 1
+    log_info("Alert stream closed by the detector")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Periodic checkpoints of detector state for warm restarts.
+
+Components (the host rate sketches, the DNS monitor) are registered with a
+Checkpointer and must provide snapshot() -> bytes and restore(bytes). The
+packet thread calls maybe_capture() between packets: when a checkpoint is due
+it copies the state of every component that changed since the last write (the
+only pause the packet loop sees) and hands the copies to a writer thread. The
+writer compresses each one and replaces its file atomically (temp file, fsync,
+os.replace), so a crash never leaves a half-written checkpoint.
+
+File layout: magic "MCKP" | format version u16 | reserved u16 |
+generation u64 | wall-clock time f64 | zlib-compressed snapshot
+"""
+
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from utils.logger import log_info, log_error, log_warning
+
+MAGIC = b"MCKP"
+VERSION = 1
+FILE_HEADER = struct.Struct("!4sHHQd")
+
+
+class _Component:
+    __slots__ = ("name", "state", "generation", "written")
+
+    def __init__(self, name, state, generation):
+        self.name = name
+        self.state = state
+        self.generation = generation
+        self.written = None
+
+
+class Checkpointer:
+    """Snapshots registered components to one file each on a background thread."""
+
+    def __init__(self, directory, interval=30.0, max_age=None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+        self.max_age = max_age
+        self.components = {}
+        # Holds at most one pending capture; if the writer is still busy the next one is skipped
+        self.queue = queue.Queue(maxsize=1)
+        self.thread = None
+        self.next_due = time.monotonic() + interval
+        self.stats = {"captures": 0, "skipped_busy": 0, "unchanged": 0, "files_written": 0,
+                      "bytes_written": 0, "errors": 0, "pause_seconds": 0.0, "pause_max": 0.0,
+                      "write_seconds": 0.0}
+
+    def register(self, name, state, generation=None):
+        """Register state (with snapshot/restore); generation() should change whenever it does."""
+        self.components[name] = _Component(name, state, generation)
+
+    def path(self, name):
+        return self.directory / f"{name}.ckpt"
+
+    def restore(self):
+        """Restore every component that has a fresh checkpoint; returns {name: seconds}."""
+        timings = {}
+        for component in self.components.values():
+            path = self.path(component.name)
+            if not path.exists():
+                continue
+            start = time.perf_counter()
+            try:
+                data = path.read_bytes()
+                magic, version, _, _, saved_at = FILE_HEADER.unpack_from(data)
+                if magic != MAGIC or version != VERSION:
+                    raise ValueError(f"unknown checkpoint format {magic!r} v{version}")
+                age = time.time() - saved_at
+                if self.max_age and age > self.max_age:
+                    log_info(f"Checkpoint {path.name} is {age:.0f}s old, starting {component.name} cold")
+                    continue
+                component.state.restore(zlib.decompress(data[FILE_HEADER.size:]))
+            except Exception as e:
+                log_warning(f"Could not restore {component.name} from {path}: {e}; starting cold")
+                continue
+            timings[component.name] = time.perf_counter() - start
+            log_info(f"Restored {component.name} from checkpoint ({age:.0f}s old, {len(data)} bytes) "
+                     f"in {timings[component.name] * 1000:.1f} ms")
+        return timings
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self.thread.start()
+        return self
+
+    def maybe_capture(self):
+        """Capture if a checkpoint is due; call from the thread that mutates the state."""
+        if time.monotonic() >= self.next_due:
+            self.capture()
+
+    def capture(self, block=False):
+        """Copy the state of changed components and queue it for writing."""
+        self.next_due = time.monotonic() + self.interval
+        if not block and self.queue.full():
+            self.stats["skipped_busy"] += 1
+            return
+        start = time.perf_counter()
+        snapshots = []
+        for component in self.components.values():
+            generation = component.generation() if component.generation else None
+            if generation is not None and generation == component.written:
+                self.stats["unchanged"] += 1
+                continue
+            snapshots.append((component, generation, component.state.snapshot()))
+            component.written = generation
+        pause = time.perf_counter() - start
+        self.stats["captures"] += 1
+        self.stats["pause_seconds"] += pause
+        self.stats["pause_max"] = max(self.stats["pause_max"], pause)
+        if snapshots:
+            # Only this thread adds to the queue, so it still has room
+            self.queue.put(snapshots)
+
+    def _write(self, component, generation, snapshot):
+        path = self.path(component.name)
+        tmp = path.with_name(path.name + ".tmp")
+        header = FILE_HEADER.pack(MAGIC, VERSION, 0, generation or 0, time.time())
+        payload = zlib.compress(snapshot, 1)
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self.stats["files_written"] += 1
+        self.stats["bytes_written"] += len(header) + len(payload)
+
+    def _run(self):
+        while True:
+            snapshots = self.queue.get()
+            if snapshots is None:
+                return
+            start = time.perf_counter()
+            for component, generation, snapshot in snapshots:
+                try:
+                    self._write(component, generation, snapshot)
+                except OSError as e:
+                    # Write it again at the next capture
+                    component.written = None
+                    self.stats["errors"] += 1
+                    log_error(f"Error writing checkpoint for {component.name}: {e}")
+            self.stats["write_seconds"] += time.perf_counter() - start
+
+    def close(self):
+        """Write a final checkpoint and stop the writer; call once the packet loop has stopped."""
+        if self.thread is None:
+            return
+        self.capture(block=True)
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        log_info(f"Checkpoints: {self.stats}")
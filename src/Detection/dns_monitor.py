@@ -0,0 +1,239 @@
+"""
+DNS response spoofing detection for the real-time detector.
+
+Parses UDP/53 payloads with a small struct-based parser and keeps the
+outstanding queries in a bounded, time-expiring table. Responses are checked for:
+
+- unsolicited answers (no matching outstanding query)
+- duplicate or conflicting answers to an already answered query
+- answers whose question does not match the query
+- TTL anomalies: implausible record TTLs and IP TTLs that differ from the
+  resolver's usual hop distance (spoofed replies usually come from elsewhere)
+
+snapshot()/restore() serialize the tables with marshal for checkpointing.
+"""
+
+import marshal
+import socket
+import struct
+from collections import OrderedDict, namedtuple
+
+DNS_PORT = 53
+TYPE_A = 1
+TYPE_AAAA = 28
+
+_HEADER = struct.Struct("!HHHHHH")
+_QUESTION_TAIL = struct.Struct("!HH")
+_ANSWER_TAIL = struct.Struct("!HHIH")
+
+DnsMessage = namedtuple("DnsMessage", ["txid", "is_response", "rcode", "qname", "qtype", "answers"])
+DnsAlert = namedtuple("DnsAlert", ["kind", "client", "server", "txid", "qname", "detail"])
+
+
+def _read_name(data, offset):
+    """Return (lowercase name, offset after the name), following compression pointers."""
+    labels = []
+    end = None
+    jumps = 0
+    while True:
+        length = data[offset]
+        if length == 0:
+            offset += 1
+            break
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            if jumps > 16:
+                raise ValueError("DNS name compression loop")
+            continue
+        labels.append(bytes(data[offset + 1:offset + 1 + length]))
+        offset += 1 + length
+    name = b".".join(labels).decode("ascii", "replace").lower()
+    return name, (end if end is not None else offset)
+
+
+def parse_dns(payload):
+    """Parse the header, first question and answer records of a DNS message.
+
+    Returns a DnsMessage, or None when the payload is not a well-formed DNS message.
+    Answers are (type, ttl, value) tuples; A/AAAA values are addresses, others raw hex.
+    """
+    try:
+        txid, flags, qdcount, ancount, _, _ = _HEADER.unpack_from(payload, 0)
+        if qdcount == 0:
+            return None
+        qname, offset = _read_name(payload, _HEADER.size)
+        qtype, _ = _QUESTION_TAIL.unpack_from(payload, offset)
+        offset += _QUESTION_TAIL.size
+        for _ in range(qdcount - 1):
+            _, offset = _read_name(payload, offset)
+            offset += _QUESTION_TAIL.size
+
+        answers = []
+        for _ in range(ancount):
+            _, offset = _read_name(payload, offset)
+            rtype, _, ttl, rdlength = _ANSWER_TAIL.unpack_from(payload, offset)
+            offset += _ANSWER_TAIL.size
+            rdata = bytes(payload[offset:offset + rdlength])
+            if len(rdata) < rdlength:
+                return None
+            offset += rdlength
+            if rtype == TYPE_A and rdlength == 4:
+                value = socket.inet_ntoa(rdata)
+            elif rtype == TYPE_AAAA and rdlength == 16:
+                value = socket.inet_ntop(socket.AF_INET6, rdata)
+            else:
+                value = rdata.hex()
+            answers.append((rtype, ttl, value))
+        return DnsMessage(txid, bool(flags & 0x8000), flags & 0x000F, qname, qtype, answers)
+    except (struct.error, IndexError, ValueError):
+        return None
+
+
+def _encode_name(name):
+    return b"".join(bytes([len(label)]) + label.encode("ascii")
+                    for label in name.rstrip(".").split(".") if label) + b"\x00"
+
+
+def build_dns_query(txid, qname, qtype=TYPE_A):
+    """Return the payload of a recursive DNS query."""
+    return (_HEADER.pack(txid, 0x0100, 1, 0, 0, 0) + _encode_name(qname) +
+            _QUESTION_TAIL.pack(qtype, 1))
+
+
+def build_dns_response(txid, qname, addresses, ttl=300, qtype=TYPE_A):
+    """Return the payload of a DNS response answering qname with IPv4 addresses."""
+    body = _HEADER.pack(txid, 0x8180, 1, len(addresses), 0, 0)
+    body += _encode_name(qname) + _QUESTION_TAIL.pack(qtype, 1)
+    for address in addresses:
+        # 0xC00C points back at the question name
+        body += b"\xc0\x0c" + _ANSWER_TAIL.pack(TYPE_A, 1, ttl, 4) + socket.inet_aton(address)
+    return body
+
+
+class DnsMonitor:
+    """Tracks DNS transactions in bounded memory and flags spoofing indicators."""
+
+    def __init__(self, query_timeout, max_pending, answer_hold, max_answer_ttl,
+                 ip_ttl_tolerance, max_resolvers):
+        self.query_timeout = query_timeout
+        self.max_pending = max_pending
+        self.answer_hold = answer_hold
+        self.max_answer_ttl = max_answer_ttl
+        self.ip_ttl_tolerance = ip_ttl_tolerance
+        self.max_resolvers = max_resolvers
+
+        # (client ip, client port, server ip, txid) -> (timestamp, qname, qtype)
+        self.pending = OrderedDict()
+        # Same key -> (timestamp, qname, frozenset of answer values)
+        self.answered = OrderedDict()
+        # Resolver ip -> IP TTL observed on its first answered reply
+        self.resolver_ttls = OrderedDict()
+
+        self.stats = {"queries": 0, "responses": 0, "expired": 0, "evicted": 0,
+                      "malformed": 0, "alerts": 0}
+
+    def snapshot(self):
+        """Return the query, answer and resolver tables plus counters as bytes."""
+        return marshal.dumps((list(self.pending.items()), list(self.answered.items()),
+                              list(self.resolver_ttls.items()), self.stats))
+
+    def restore(self, data):
+        """Load tables written by snapshot(), trimmed to the current size limits.
+
+        The snapshot is fully decoded before anything is replaced, so on error the
+        monitor is left unchanged.
+        """
+        try:
+            pending, answered, resolver_ttls, stats = marshal.loads(data)
+            pending = OrderedDict(pending[-self.max_pending:])
+            answered = OrderedDict(answered[-self.max_pending:])
+            resolver_ttls = OrderedDict(resolver_ttls[-self.max_resolvers:])
+            if set(stats) - set(self.stats) or not all(isinstance(v, int) for v in stats.values()):
+                raise ValueError("unexpected counters")
+        except (EOFError, TypeError, ValueError, AttributeError) as e:
+            raise ValueError(f"Unreadable DNS monitor snapshot: {e}") from e
+        self.pending = pending
+        self.answered = answered
+        self.resolver_ttls = resolver_ttls
+        self.stats.update(stats)
+
+    def _expire(self, table, now, max_age, counter=None):
+        while table:
+            key, entry = next(iter(table.items()))
+            if now - entry[0] <= max_age:
+                break
+            table.popitem(last=False)
+            if counter:
+                self.stats[counter] += 1
+
+    def _bounded_insert(self, table, key, value, limit):
+        table[key] = value
+        table.move_to_end(key)
+        if len(table) > limit:
+            table.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def observe(self, timestamp, src_ip, dst_ip, src_port, dst_port, ip_ttl, payload):
+        """Process one UDP/53 packet and return a list of DnsAlert for it."""
+        if src_port != DNS_PORT and dst_port != DNS_PORT:
+            return []
+        message = parse_dns(payload)
+        if message is None:
+            self.stats["malformed"] += 1
+            return []
+
+        self._expire(self.pending, timestamp, self.query_timeout, "expired")
+        self._expire(self.answered, timestamp, self.answer_hold)
+
+        if not message.is_response:
+            self.stats["queries"] += 1
+            key = (src_ip, src_port, dst_ip, message.txid)
+            self._bounded_insert(self.pending, key, (timestamp, message.qname, message.qtype),
+                                 self.max_pending)
+            return []
+
+        self.stats["responses"] += 1
+        key = (dst_ip, dst_port, src_ip, message.txid)
+        values = frozenset(value for _, _, value in message.answers)
+        alerts = []
+
+        def alert(kind, detail):
+            alerts.append(DnsAlert(kind, f"{dst_ip}:{dst_port}", src_ip, message.txid,
+                                   message.qname, detail))
+
+        query = self.pending.pop(key, None)
+        if query is not None:
+            _, qname, qtype = query
+            if qname != message.qname or qtype != message.qtype:
+                alert("question_mismatch", f"asked {qname} type {qtype}")
+            self._bounded_insert(self.answered, key, (timestamp, message.qname, values),
+                                 self.max_pending)
+            self._check_ttls(src_ip, ip_ttl, message, alert)
+        elif key in self.answered:
+            _, _, previous = self.answered[key]
+            if previous == values:
+                alert("duplicate_answer", f"answers {sorted(values)}")
+            else:
+                alert("conflicting_answer",
+                      f"first {sorted(previous)}, now {sorted(values)}")
+            self._check_ttls(src_ip, ip_ttl, message, alert)
+        else:
+            alert("unsolicited_answer", f"answers {sorted(values)}")
+
+        self.stats["alerts"] += len(alerts)
+        return alerts
+
+    def _check_ttls(self, resolver, ip_ttl, message, alert):
+        for rtype, ttl, value in message.answers:
+            if ttl == 0 or ttl > self.max_answer_ttl:
+                alert("answer_ttl_anomaly", f"{value} has TTL {ttl}s")
+                break
+
+        baseline = self.resolver_ttls.get(resolver)
+        if baseline is None:
+            self._bounded_insert(self.resolver_ttls, resolver, ip_ttl, self.max_resolvers)
+        elif abs(ip_ttl - baseline) > self.ip_ttl_tolerance:
+            alert("ip_ttl_anomaly", f"IP TTL {ip_ttl}, resolver usually {baseline}")
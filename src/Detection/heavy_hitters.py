@@ -0,0 +1,425 @@
+"""
+Probabilistic per-host traffic counters for the real-time detector.
+
+Exact per-IP counters grow with every distinct address seen, which scans and
+spoofed floods turn into millions of keys. The structures here use a fixed
+amount of memory regardless of how many hosts appear:
+
+- WindowedCountMinSketch: packet counts per key over a sliding time window
+- WindowedDistinctSketch: approximate distinct-port counts per key
+- HostRateTracker: ties both together with a top-k heavy-hitter list and
+  produces the HOST_RATE_COLUMNS features for detect_packet
+
+snapshot()/restore() dump the raw counter tables for checkpointing (see
+checkpoint.py); a snapshot only restores into a tracker with the same settings.
+"""
+
+import math
+import random
+import socket
+import struct
+from array import array
+
+# Mersenne prime used for the universal hash family
+_PRIME = (1 << 61) - 1
+
+# Fixed seeds keep hashing stable across processes and restarts
+_rng = random.Random(0x4D49544D)
+_SEEDS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(10)]
+_VALUE_SEED = (_rng.randrange(1, _PRIME), _rng.randrange(_PRIME))
+
+# width, depth, buckets, window seconds, current slot (-1 before the first packet)
+_SKETCH_HEADER = struct.Struct("!IIIdq")
+_COUNT = struct.Struct("!I")
+
+
+def ip_to_int(ip):
+    """Convert a dotted IPv4 string to an integer key."""
+    return int.from_bytes(socket.inet_aton(ip), "big")
+
+
+def sketch_dimensions(epsilon, delta):
+    """Return (width, depth) for the requested error bound and failure probability."""
+    if not 0 < epsilon < 1 or not 0 < delta < 1:
+        raise ValueError("epsilon and delta must be between 0 and 1")
+    width = int(math.ceil(math.e / epsilon))
+    depth = int(math.ceil(math.log(1.0 / delta)))
+    if depth > len(_SEEDS):
+        raise ValueError(f"delta too small, at most {len(_SEEDS)} hash rows are supported")
+    return width, depth
+
+
+def _snapshot_header(sketch):
+    slot = sketch.window.current_slot
+    return _SKETCH_HEADER.pack(sketch.width, sketch.depth, sketch.window.buckets,
+                               sketch.window.window_seconds, -1 if slot is None else slot)
+
+
+def _read_header(sketch, data, offset):
+    """Check a snapshot header against the sketch settings; returns (slot, next offset)."""
+    if offset + _SKETCH_HEADER.size > len(data):
+        raise ValueError("Truncated sketch snapshot")
+    width, depth, buckets, window_seconds, slot = _SKETCH_HEADER.unpack_from(data, offset)
+    if (width, depth, buckets, window_seconds) != (sketch.width, sketch.depth,
+                                                   sketch.window.buckets, sketch.window.window_seconds):
+        raise ValueError("Snapshot was taken with different sketch settings")
+    return (None if slot < 0 else slot), offset + _SKETCH_HEADER.size
+
+
+def _read_arrays(data, offset, typecode, size, count):
+    """Read count arrays of size items each; returns (arrays, next offset)."""
+    arrays = []
+    for _ in range(count):
+        table = array(typecode)
+        end = offset + size * table.itemsize
+        if end > len(data):
+            raise ValueError("Truncated sketch snapshot")
+        table.frombytes(data[offset:end])
+        arrays.append(table)
+        offset = end
+    return arrays, offset
+
+
+class _SlidingWindow:
+    """Maps timestamps onto a ring of sub-window buckets."""
+
+    def __init__(self, window_seconds, buckets):
+        if window_seconds <= 0 or buckets < 1:
+            raise ValueError("window_seconds must be positive and buckets at least 1")
+        self.window_seconds = float(window_seconds)
+        self.buckets = buckets
+        self.bucket_span = self.window_seconds / buckets
+        self.current_slot = None
+
+    def advance(self, timestamp):
+        """Move to the slot for timestamp and return the bucket indexes that expired."""
+        slot = int(timestamp // self.bucket_span)
+        if self.current_slot is None:
+            self.current_slot = slot
+            return []
+        if slot <= self.current_slot:
+            return []
+        skipped = min(slot - self.current_slot, self.buckets)
+        expired = [(self.current_slot + i) % self.buckets for i in range(1, skipped + 1)]
+        self.current_slot = slot
+        return expired
+
+    @property
+    def current_bucket(self):
+        return (self.current_slot or 0) % self.buckets
+
+
+class WindowedCountMinSketch:
+    """Count-min sketch over a sliding time window.
+
+    Each sub-window keeps its own counter table and a running total table holds
+    their sum, so a query costs one lookup per hash row. Expired sub-windows are
+    subtracted from the total when the window slides.
+    """
+
+    def __init__(self, epsilon, delta, window_seconds, buckets):
+        self.width, self.depth = sketch_dimensions(epsilon, delta)
+        self.window = _SlidingWindow(window_seconds, buckets)
+        size = self.width * self.depth
+        self.tables = [array("I", bytes(4 * size)) for _ in range(buckets)]
+        self.total = array("I", bytes(4 * size))
+        self.hashes = _SEEDS[:self.depth]
+
+    def _positions(self, key):
+        width = self.width
+        return [row * width + ((a * key + b) % _PRIME) % width
+                for row, (a, b) in enumerate(self.hashes)]
+
+    def _expire(self, timestamp):
+        for bucket in self.window.advance(timestamp):
+            table = self.tables[bucket]
+            total = self.total
+            for i, value in enumerate(table):
+                if value:
+                    total[i] -= value
+            self.tables[bucket] = array("I", bytes(4 * len(table)))
+
+    def add(self, key, timestamp, count=1):
+        """Add count for key at timestamp and return the new windowed estimate."""
+        self._expire(timestamp)
+        table = self.tables[self.window.current_bucket]
+        total = self.total
+        estimate = None
+        for pos in self._positions(key):
+            table[pos] += count
+            total[pos] += count
+            value = total[pos]
+            if estimate is None or value < estimate:
+                estimate = value
+        return estimate
+
+    def estimate(self, key):
+        """Return the windowed count estimate for key."""
+        total = self.total
+        return min(total[pos] for pos in self._positions(key))
+
+    def snapshot(self):
+        """Return the sketch state as bytes (header + raw counter tables)."""
+        return (_snapshot_header(self) + b"".join(table.tobytes() for table in self.tables) +
+                self.total.tobytes())
+
+    def parse(self, data, offset=0):
+        """Validate state written by snapshot(); returns (state, next offset) without applying it."""
+        slot, offset = _read_header(self, data, offset)
+        size = self.width * self.depth
+        tables, offset = _read_arrays(data, offset, "I", size, len(self.tables) + 1)
+        return (slot, tables), offset
+
+    def load(self, state):
+        """Apply state returned by parse()."""
+        slot, tables = state
+        self.tables, self.total = tables[:-1], tables[-1]
+        self.window.current_slot = slot
+
+    def restore(self, data, offset=0):
+        """Load state written by snapshot(); returns the offset just past it."""
+        state, offset = self.parse(data, offset)
+        self.load(state)
+        return offset
+
+    @property
+    def memory_bytes(self):
+        return (len(self.tables) + 1) * self.width * self.depth * 4
+
+
+class WindowedDistinctSketch:
+    """Approximate distinct-value counts per key over a sliding time window.
+
+    Every cell of a count-min shaped grid holds a 64-bit linear-counting bitmap.
+    A key's estimate is the smallest cardinality among its cells, since
+    collisions can only set extra bits. Estimates saturate around a few hundred
+    distinct values, which is plenty to separate scans from normal clients.
+    """
+
+    BITS = 64
+
+    def __init__(self, epsilon, delta, window_seconds, buckets):
+        self.width, self.depth = sketch_dimensions(epsilon, delta)
+        self.window = _SlidingWindow(window_seconds, buckets)
+        size = self.width * self.depth
+        self.tables = [array("Q", bytes(8 * size)) for _ in range(buckets)]
+        self.hashes = _SEEDS[:self.depth]
+
+    def _positions(self, key):
+        width = self.width
+        return [row * width + ((a * key + b) % _PRIME) % width
+                for row, (a, b) in enumerate(self.hashes)]
+
+    def add(self, key, value, timestamp):
+        """Record value as seen for key at timestamp."""
+        for bucket in self.window.advance(timestamp):
+            self.tables[bucket] = array("Q", bytes(8 * self.width * self.depth))
+        a, b = _VALUE_SEED
+        bit = 1 << (((a * value + b) % _PRIME) % self.BITS)
+        table = self.tables[self.window.current_bucket]
+        for pos in self._positions(key):
+            table[pos] |= bit
+
+    def estimate(self, key):
+        """Return the approximate number of distinct values seen for key."""
+        best = None
+        for pos in self._positions(key):
+            bitmap = 0
+            for table in self.tables:
+                bitmap |= table[pos]
+            zeros = self.BITS - bin(bitmap).count("1")
+            if zeros == 0:
+                count = self.BITS * math.log(self.BITS)
+            else:
+                count = -self.BITS * math.log(zeros / self.BITS)
+            if best is None or count < best:
+                best = count
+        return int(round(best))
+
+    def snapshot(self):
+        """Return the sketch state as bytes (header + raw bitmap tables)."""
+        return _snapshot_header(self) + b"".join(table.tobytes() for table in self.tables)
+
+    def parse(self, data, offset=0):
+        """Validate state written by snapshot(); returns (state, next offset) without applying it."""
+        slot, offset = _read_header(self, data, offset)
+        tables, offset = _read_arrays(data, offset, "Q", self.width * self.depth, len(self.tables))
+        return (slot, tables), offset
+
+    def load(self, state):
+        """Apply state returned by parse()."""
+        slot, self.tables = state
+        self.window.current_slot = slot
+
+    def restore(self, data, offset=0):
+        """Load state written by snapshot(); returns the offset just past it."""
+        state, offset = self.parse(data, offset)
+        self.load(state)
+        return offset
+
+    @property
+    def memory_bytes(self):
+        return len(self.tables) * self.width * self.depth * 8
+
+
+class HeavyHitters:
+    """Bounded top-k list of the keys with the largest sketch estimates.
+
+    Stored estimates go stale as the sketch window slides: when it moves to a
+    new sub-window, the tracked keys are re-estimated and keys whose traffic has
+    expired are evicted. A new key is admitted against the re-estimated list.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.counts = {}
+        self._min_key = None
+        # Sketch window slot the stored estimates were taken in
+        self._slot = None
+
+    def refresh(self, sketch):
+        """Re-estimate the tracked keys against the sketch's current window, dropping expired ones."""
+        self._slot = sketch.window.current_slot
+        counts = {}
+        for key in self.counts:
+            estimate = sketch.estimate(key)
+            if estimate:
+                counts[key] = estimate
+        self.counts = counts
+        self._min_key = min(counts, key=counts.get) if counts else None
+
+    def offer(self, key, estimate, sketch):
+        """Offer a key with its current estimate in sketch; keeps at most k entries."""
+        if sketch.window.current_slot != self._slot:
+            self.refresh(sketch)
+        counts = self.counts
+        if key in counts:
+            counts[key] = estimate
+            if key == self._min_key:
+                self._min_key = min(counts, key=counts.get)
+            elif estimate < counts[self._min_key]:
+                self._min_key = key
+            return
+        if len(counts) >= self.k and estimate > counts[self._min_key]:
+            # Traffic of the other keys since they were last offered may have raised the minimum
+            self.refresh(sketch)
+        self._admit(key, estimate)
+
+    def _admit(self, key, estimate):
+        counts = self.counts
+        if len(counts) < self.k:
+            counts[key] = estimate
+            if self._min_key is None or estimate < counts[self._min_key]:
+                self._min_key = key
+        elif estimate > counts[self._min_key]:
+            del counts[self._min_key]
+            counts[key] = estimate
+            self._min_key = min(counts, key=counts.get)
+
+    def top(self, sketch, n=None):
+        """Return (key, estimate) pairs sorted by their current windowed estimate."""
+        current = [(key, sketch.estimate(key)) for key in self.counts]
+        current.sort(key=lambda item: item[1], reverse=True)
+        return current[:n] if n else current
+
+    def snapshot(self):
+        """Return the tracked keys and estimates as bytes."""
+        pairs = array("Q")
+        for key, estimate in self.counts.items():
+            pairs.append(key)
+            pairs.append(estimate)
+        return _COUNT.pack(len(self.counts)) + pairs.tobytes()
+
+    def parse(self, data, offset=0):
+        """Validate state written by snapshot(); returns (state, next offset) without applying it."""
+        if offset + _COUNT.size > len(data):
+            raise ValueError("Truncated heavy-hitter snapshot")
+        (count,) = _COUNT.unpack_from(data, offset)
+        [pairs], offset = _read_arrays(data, offset + _COUNT.size, "Q", 2 * count, 1)
+        counts = dict(zip(pairs[::2], pairs[1::2]))
+        # Keep the largest entries if k shrank since the snapshot
+        return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True)[:self.k]), offset
+
+    def load(self, counts):
+        """Apply state returned by parse()."""
+        self.counts = counts
+        self._min_key = min(counts, key=counts.get) if counts else None
+        # Re-estimate against the restored sketch on the next offer
+        self._slot = None
+
+    def restore(self, data, offset=0):
+        """Load state written by snapshot(); returns the offset just past it."""
+        state, offset = self.parse(data, offset)
+        self.load(state)
+        return offset
+
+
+class HostRateTracker:
+    """Per-source and per-destination rate features in fixed memory."""
+
+    def __init__(self, epsilon, delta, window_seconds, buckets, k):
+        self.window_seconds = float(window_seconds)
+        self.src_counts = WindowedCountMinSketch(epsilon, delta, window_seconds, buckets)
+        self.dst_counts = WindowedCountMinSketch(epsilon, delta, window_seconds, buckets)
+        self.src_ports = WindowedDistinctSketch(epsilon, delta, window_seconds, buckets)
+        self.dst_ports = WindowedDistinctSketch(epsilon, delta, window_seconds, buckets)
+        self.top_sources = HeavyHitters(k)
+        self.top_destinations = HeavyHitters(k)
+        # Packets accounted for; lets checkpoints skip an unchanged tracker
+        self.packets = 0
+
+    def update(self, src_ip, dst_ip, dst_port, timestamp):
+        """Account for one packet and return its HOST_RATE_COLUMNS feature values."""
+        self.packets += 1
+        src_key = ip_to_int(src_ip)
+        dst_key = ip_to_int(dst_ip)
+
+        src_count = self.src_counts.add(src_key, timestamp)
+        dst_count = self.dst_counts.add(dst_key, timestamp)
+        self.top_sources.offer(src_key, src_count, self.src_counts)
+        self.top_destinations.offer(dst_key, dst_count, self.dst_counts)
+
+        self.src_ports.add(src_key, dst_port, timestamp)
+        self.dst_ports.add(dst_key, dst_port, timestamp)
+
+        return [
+            src_count / self.window_seconds,
+            dst_count / self.window_seconds,
+            self.src_ports.estimate(src_key),
+            self.dst_ports.estimate(dst_key),
+        ]
+
+    def heavy_hitters(self, n=None):
+        """Return the top sources and destinations as (ip, packets in window) pairs."""
+        def as_ips(pairs):
+            return [(socket.inet_ntoa(key.to_bytes(4, "big")), count) for key, count in pairs]
+        return {
+            "sources": as_ips(self.top_sources.top(self.src_counts, n)),
+            "destinations": as_ips(self.top_destinations.top(self.dst_counts, n)),
+        }
+
+    def _parts(self):
+        return (self.src_counts, self.dst_counts, self.src_ports, self.dst_ports,
+                self.top_sources, self.top_destinations)
+
+    def snapshot(self):
+        """Return all sketches and heavy-hitter lists as one bytes blob."""
+        return b"".join(part.snapshot() for part in self._parts())
+
+    def restore(self, data):
+        """Load a blob written by snapshot(); on error the tracker is left unchanged."""
+        data = memoryview(data)
+        offset = 0
+        states = []
+        for part in self._parts():
+            state, offset = part.parse(data, offset)
+            states.append(state)
+        if offset != len(data):
+            raise ValueError("Unexpected trailing data in host rate snapshot")
+        for part, state in zip(self._parts(), states):
+            part.load(state)
+
+    @property
+    def memory_bytes(self):
+        return (self.src_counts.memory_bytes + self.dst_counts.memory_bytes +
+                self.src_ports.memory_bytes + self.dst_ports.memory_bytes)
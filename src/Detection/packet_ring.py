@@ -0,0 +1,208 @@
+"""
+Forensic pre-alert ring buffer of raw frames.
+
+Recent frames are copied into one preallocated byte arena and indexed by
+fixed-size metadata arrays (timestamp, offset, length, flow key), so memory use
+is fixed at start-up. Reading returns zero-copy memoryview slices of the arena.
+When the detector raises an alert, a dump request is queued; a background
+thread waits until the post-alert window has passed, then copies the offending
+flow's frames around the alert out of the arena and writes them to a pcap file.
+"""
+
+import hashlib
+import queue
+import socket
+import struct
+import threading
+import time
+from array import array
+from datetime import datetime
+from pathlib import Path
+
+from utils.logger import log_info, log_error
+from utils.pcap import PcapWriter
+
+_METADATA_BYTES_PER_SLOT = 8 + 8 + 4 + 8
+
+_FLOW = struct.Struct("!B4sH4sH")
+
+
+def flow_key(src_ip, dst_ip, proto, src_port=0, dst_port=0):
+    """Return a direction-independent key for the flow a packet belongs to.
+
+    The key is a signed 64-bit digest of the endpoints, so it is the same in
+    every process and run (unlike hash() of strings).
+    """
+    a, b = (socket.inet_aton(src_ip), src_port), (socket.inet_aton(dst_ip), dst_port)
+    if b < a:
+        a, b = b, a
+    digest = hashlib.blake2b(_FLOW.pack(proto, *a, *b), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class PacketRing:
+    """Fixed-size ring of raw frames stored in a contiguous byte arena."""
+
+    def __init__(self, capacity_bytes, max_frames):
+        self.arena = bytearray(capacity_bytes)
+        self.view = memoryview(self.arena)
+        self.capacity = capacity_bytes
+        self.max_frames = max_frames
+
+        self.timestamps = array("d", bytes(8 * max_frames))
+        self.offsets = array("Q", bytes(8 * max_frames))
+        self.lengths = array("I", bytes(4 * max_frames))
+        self.flows = array("q", bytes(8 * max_frames))
+
+        self.lock = threading.Lock()
+        self.oldest = 0      # Slot index of the oldest valid frame
+        self.count = 0       # Number of valid slots
+        self.next_offset = 0
+        self.stats = {"frames": 0, "bytes": 0, "evicted": 0, "oversized": 0}
+
+    @property
+    def memory_bytes(self):
+        return self.capacity + self.max_frames * _METADATA_BYTES_PER_SLOT
+
+    def _evict_oldest(self):
+        self.oldest = (self.oldest + 1) % self.max_frames
+        self.count -= 1
+        self.stats["evicted"] += 1
+
+    def add(self, timestamp, frame, flow):
+        """Copy one frame into the arena, evicting the oldest frames it overwrites."""
+        size = len(frame)
+        if size > self.capacity:
+            self.stats["oversized"] += 1
+            return
+        with self.lock:
+            start = self.next_offset
+            if start + size > self.capacity:
+                # Wrap around; frames left in the tail from the previous lap are the oldest
+                while self.count and self.offsets[self.oldest] >= start:
+                    self._evict_oldest()
+                start = 0
+            end = start + size
+
+            # Frames are laid out in slot order, so overwritten ones are always the oldest
+            while self.count and (self.count == self.max_frames or
+                                  (self.offsets[self.oldest] < end and
+                                   self.offsets[self.oldest] + self.lengths[self.oldest] > start)):
+                self._evict_oldest()
+
+            slot = (self.oldest + self.count) % self.max_frames
+            self.view[start:end] = frame
+            self.timestamps[slot] = timestamp
+            self.offsets[slot] = start
+            self.lengths[slot] = size
+            self.flows[slot] = flow
+            self.count += 1
+            self.next_offset = end
+            self.stats["frames"] += 1
+            self.stats["bytes"] += size
+
+    def frames(self, flow=None, since=None, until=None):
+        """Yield (timestamp, memoryview) for buffered frames, oldest first.
+
+        The views point into the arena and are only valid until the ring wraps;
+        callers that keep them must hold self.lock or copy them.
+        """
+        for i in range(self.count):
+            slot = (self.oldest + i) % self.max_frames
+            ts = self.timestamps[slot]
+            if since is not None and ts < since:
+                continue
+            if until is not None and ts > until:
+                continue
+            if flow is not None and self.flows[slot] != flow:
+                continue
+            start = self.offsets[slot]
+            yield ts, self.view[start:start + self.lengths[slot]]
+
+    def snapshot(self, flow=None, since=None, until=None):
+        """Return copies of the matching frames as (timestamp, bytes) pairs."""
+        with self.lock:
+            return [(ts, bytes(data)) for ts, data in self.frames(flow, since, until)]
+
+
+class ForensicDumper:
+    """Writes the frames around an alert to pcap files from a background thread."""
+
+    def __init__(self, ring, output_dir, pre_seconds, post_seconds, max_pending=64):
+        self.ring = ring
+        self.output_dir = Path(output_dir)
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.requests = queue.Queue(maxsize=max_pending)
+        self.covered_until = {}  # flow -> end of the last dump window, to avoid duplicate dumps
+        self.stopping = threading.Event()
+        self.thread = None
+        self.stats = {"requested": 0, "written": 0, "skipped": 0, "dropped": 0}
+
+    def start(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name="forensic-dumper", daemon=True)
+        self.thread.start()
+        return self
+
+    def request(self, flow, alert_ts, label):
+        """Ask for a dump of flow around alert_ts; never blocks the caller."""
+        if self.covered_until.get(flow, float("-inf")) >= alert_ts:
+            self.stats["skipped"] += 1
+            return False
+        window_end = alert_ts + self.post_seconds
+        try:
+            self.requests.put_nowait((time.monotonic() + self.post_seconds, flow, alert_ts, label))
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+        if len(self.covered_until) > 4096:
+            self.covered_until.clear()
+        self.covered_until[flow] = window_end
+        self.stats["requested"] += 1
+        return True
+
+    def close(self, timeout=None):
+        """Write outstanding dumps (without waiting for their post-alert window) and stop."""
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.requests.put(None)
+        self.thread.join(timeout)
+        self.thread = None
+
+    def _write(self, flow, alert_ts, label):
+        frames = self.ring.snapshot(flow, alert_ts - self.pre_seconds, alert_ts + self.post_seconds)
+        if not frames:
+            return
+        stamp = datetime.fromtimestamp(alert_ts).strftime("%Y%m%d-%H%M%S")
+        path, writer = self._create(f"{stamp}_{label}_{flow & 0xFFFFFFFFFFFFFFFF:016x}")
+        with writer:
+            for ts, data in frames:
+                writer.write(ts, data)
+        self.stats["written"] += 1
+        log_info(f"Forensic capture: wrote {len(frames)} frames to {path}")
+
+    def _create(self, name):
+        """Open a new pcap named after name, adding a counter rather than overwriting a dump."""
+        attempt = 0
+        while True:
+            path = self.output_dir / (f"{name}.pcap" if attempt == 0 else f"{name}_{attempt}.pcap")
+            try:
+                return path, PcapWriter(path, mode="xb")
+            except FileExistsError:
+                attempt += 1
+
+    def _run(self):
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            due, flow, alert_ts, label = item
+            delay = due - time.monotonic()
+            if delay > 0:
+                self.stopping.wait(delay)
+            try:
+                self._write(flow, alert_ts, label)
+            except Exception as e:
+                log_error(f"Forensic capture failed: {e}")
@@ -0,0 +1,64 @@
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from utils.config import ALERT_DB_PATH
+from src.Detection.alert_store import query_alerts, summarize_hosts
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value):
+    """Parse a relative duration ("90s", "15m", "1h", "7d") or ISO timestamp into epoch seconds."""
+    if value[-1:] in _UNITS and value[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(value[:-1]) * _UNITS[value[-1]]
+    return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    """Answer per-host and time-range questions from the alert database."""
+    parser = argparse.ArgumentParser(description="Query stored MITM detection alerts")
+    parser.add_argument("--db", default=str(ALERT_DB_PATH), help="Alert database path")
+    parser.add_argument("--ip", help="Alerts where this IP is source or destination")
+    parser.add_argument("--src", help="Alerts from this source IP")
+    parser.add_argument("--dst", help="Alerts to this destination IP")
+    parser.add_argument("--since", help="Start time: relative (1h, 30m, 7d) or ISO timestamp")
+    parser.add_argument("--until", help="End time: relative or ISO timestamp")
+    parser.add_argument("--all", action="store_true", help="Include non-malicious verdicts")
+    parser.add_argument("--limit", type=int, default=100, help="Maximum rows to print")
+    parser.add_argument("--top-hosts", action="store_true",
+                        help="Show the source IPs with the most malicious verdicts")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"Alert database not found: {args.db}")
+        return 1
+
+    since = parse_time(args.since) if args.since else None
+    until = parse_time(args.until) if args.until else None
+
+    start = time.perf_counter()
+    if args.top_hosts:
+        rows = summarize_hosts(args.db, since, until, args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        for ip, count in rows:
+            print(f"{ip:<16} {count}")
+    else:
+        rows = query_alerts(args.db, ip=args.ip, src_ip=args.src, dst_ip=args.dst,
+                            since=since, until=until, malicious_only=not args.all,
+                            limit=args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        for row in reversed(rows):
+            timestamp = datetime.fromtimestamp(row["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"[{timestamp}] {row['kind']} | {row['src_ip']}:{row['src_port']} → "
+                  f"{row['dst_ip']}:{row['dst_port']} | {row['detail']}")
+    print(f"{len(rows)} rows in {elapsed:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
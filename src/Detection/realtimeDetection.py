@@ -1,23 +1,79 @@
-from scapy.all import sniff, IP, TCP, UDP, get_if_list
 import pandas as pd
 import joblib
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from utils.config import MODEL_PATH, SCALER_PATH, FEATURE_COLUMNS, NETWORK_INTERFACE, PACKET_FILTER
-from utils.logger import log_info, log_error
+from utils.config import (
+    MODEL_PATH, SCALER_PATH, FEATURE_COLUMNS, PACKET_FILTER,
+    HOST_RATE_COLUMNS, SKETCH_EPSILON, SKETCH_DELTA, SKETCH_WINDOW_SECONDS,
+    SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K, DNS_QUERY_TIMEOUT, DNS_MAX_PENDING,
+    DNS_ANSWER_HOLD, DNS_MAX_ANSWER_TTL, DNS_IP_TTL_TOLERANCE, DNS_MAX_RESOLVERS,
+    LABELING_RULES_PATH, LABELED_DATA_PATH, RULE_PREFILTER, ALERT_DB_PATH, ALERT_BATCH_SIZE,
+    ALERT_FLUSH_INTERVAL, ALERT_QUEUE_SIZE, ALERT_RETENTION_DAYS, ALERT_STORE_ALL_VERDICTS,
+    FORENSIC_CAPTURE, FORENSIC_RING_BYTES, FORENSIC_RING_FRAMES, FORENSIC_PRE_SECONDS,
+    FORENSIC_POST_SECONDS, FORENSIC_DIR, SHADOW_MODE, SHADOW_MODEL_PATH, SHADOW_SCALER_PATH,
+    SHADOW_BATCH_SIZE, SHADOW_MAX_PENDING_BATCHES, SHADOW_REPORT_INTERVAL,
+    CAPTURE_TRAINING_CSV, CAPTURE_SINK_QUEUE_SIZE, CAPTURE_REPORT_INTERVAL, CHECKPOINT_ENABLED,
+    CHECKPOINT_DIR, CHECKPOINT_INTERVAL, CHECKPOINT_MAX_AGE, TRAFFIC_LISTS_ENABLED, TRAFFIC_LISTS_PATH,
+    ALERT_STREAM_ENABLED, ALERT_STREAM_HOST, ALERT_STREAM_PORT, ALERT_STREAM_CLIENT_BUFFER,
+    ALERT_STREAM_MAX_PENDING, ALERT_STREAM_MAX_CLIENTS, DRIFT_MONITOR, DRIFT_REFERENCE_PATH,
+    DRIFT_WINDOW_SECONDS, DRIFT_WINDOW_BUCKETS, DRIFT_BATCH_SIZE, DRIFT_MIN_SAMPLES,
+    DRIFT_PSI_THRESHOLD, DRIFT_MEAN_SHIFT
+)
+from utils.logger import log_info, log_error, log_warning
+from utils.rule_engine import RuleSet, load_malicious_label
+from utils.drift import DriftMonitor, load_reference
+from src.Detection.heavy_hitters import HostRateTracker
+from src.Detection.dns_monitor import DnsMonitor, DNS_PORT
+from src.Detection.alert_store import AlertStore
+from src.Detection.alert_stream import AlertStream
+from src.Detection.packet_ring import PacketRing, ForensicDumper, flow_key
+from src.Detection.shadow import ShadowScorer
+from src.Detection.checkpoint import Checkpointer
+from src.Detection.traffic_lists import TrafficLists, DENY
+from src.Sniffing.capture_engine import (
+    CaptureEngine, CsvSink, ENHANCED_CSV_COLUMNS, dissect, enhanced_csv_row, get_network_interface,
+    with_host_rates
+)
 
 # Global variables for model and scaler
 model = None
 scaler = None
+model_columns = FEATURE_COLUMNS
+# Model class reported as malicious (label_on_match of the labeling rules)
+malicious_label = None
+rule_set = None
+alert_store = None
+alert_stream = None
+packet_ring = None
+forensic_dumper = None
+shadow_scorer = None
+checkpointer = None
+traffic_lists = None
+drift_monitor = None
+
+# Production scoring latency, compared against shadow-mode overhead
+scoring_stats = {"packets": 0, "seconds": 0.0}
+
+# Per-host rate sketches (fixed memory, see heavy_hitters.py)
+host_tracker = HostRateTracker(
+    SKETCH_EPSILON, SKETCH_DELTA, SKETCH_WINDOW_SECONDS, SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K
+)
+
+# DNS transaction tracking (bounded, see dns_monitor.py)
+dns_monitor = DnsMonitor(
+    DNS_QUERY_TIMEOUT, DNS_MAX_PENDING, DNS_ANSWER_HOLD, DNS_MAX_ANSWER_TTL,
+    DNS_IP_TTL_TOLERANCE, DNS_MAX_RESOLVERS
+)
 
 
 def load_models():
     """Load the trained model and scaler with error handling."""
-    global model, scaler
+    global model, scaler, model_columns, malicious_label
     try:
         if not MODEL_PATH.exists():
             log_error(f"Model file not found: {MODEL_PATH}")
@@ -35,6 +91,13 @@ def load_models():
         log_info(f"Loading scaler from: {SCALER_PATH}")
         scaler = joblib.load(SCALER_PATH)
         
+        # Models trained with the host rate features record them in the scaler
+        model_columns = list(getattr(scaler, "feature_names_in_", FEATURE_COLUMNS))
+        log_info(f"Model features: {model_columns}")
+        
+        malicious_label = load_malicious_label(LABELING_RULES_PATH)
+        log_info(f"Model class {malicious_label} is reported as malicious")
+        
         log_info("Models loaded successfully")
         return True
     except Exception as e:
@@ -42,80 +105,232 @@ def load_models():
         return False
 
 
-def get_network_interface():
-    """Get network interface from config or detect automatically."""
-    if NETWORK_INTERFACE:
-        return NETWORK_INTERFACE
-    
-    # Try to auto-detect interface
-    interfaces = get_if_list()
-    if interfaces:
-        log_info(f"Available interfaces: {interfaces}")
-        # Prefer Ethernet interfaces
-        for iface in interfaces:
-            if 'eth' in iface.lower() or 'en' in iface.lower():
-                log_info(f"Auto-selected interface: {iface}")
-                return iface
-        # Fallback to first available
-        if interfaces:
-            log_info(f"Using first available interface: {interfaces[0]}")
-            return interfaces[0]
-    
-    log_error("No network interface found. Please set NETWORK_INTERFACE in config.py")
-    return None
+def load_rules():
+    """Compile the labeling rules for use as a live pre-filter."""
+    global rule_set
+    try:
+        rule_set = RuleSet.from_file(LABELING_RULES_PATH, FEATURE_COLUMNS)
+        # Order the short-circuit evaluation by how often each rule matched in training data
+        if LABELED_DATA_PATH.exists():
+            rule_set.calibrate(pd.read_csv(LABELED_DATA_PATH, usecols=FEATURE_COLUMNS))
+        log_info(f"Loaded {len(rule_set.rules)} rules from {LABELING_RULES_PATH} "
+                 f"(order: {[rule.name for rule in rule_set.ordered_rules]})")
+        return True
+    except Exception as e:
+        log_error(f"Error loading labeling rules: {e}")
+        rule_set = None
+        return False
 
 
-def extract_features(packet):
-    """Extract features from live packets."""
+def load_drift_monitor():
+    """Track live feature statistics against the scaler and the training histograms."""
+    global drift_monitor
     try:
-        if IP not in packet:
-            return None
-        
-        
-        src_port = 0
-        if TCP in packet:
-            src_port = packet[TCP].sport
-        elif UDP in packet:
-            src_port = packet[UDP].sport
-        
-        dst_port = 0
-        if TCP in packet:
-            dst_port = packet[TCP].dport
-        elif UDP in packet:
-            dst_port = packet[UDP].dport
+        reference = None
+        if DRIFT_REFERENCE_PATH.exists():
+            reference = load_reference(DRIFT_REFERENCE_PATH)
+        else:
+            log_warning(f"No training histograms at {DRIFT_REFERENCE_PATH}; "
+                        "drift is judged on the scaler mean/variance only")
+        drift_monitor = DriftMonitor(
+            model_columns, scaler.mean_, scaler.var_, reference, DRIFT_WINDOW_SECONDS,
+            DRIFT_WINDOW_BUCKETS, DRIFT_BATCH_SIZE, DRIFT_PSI_THRESHOLD, DRIFT_MEAN_SHIFT,
+            DRIFT_MIN_SAMPLES, positions=[(FEATURE_COLUMNS + HOST_RATE_COLUMNS).index(column)
+                                          for column in model_columns]
+        )
+        log_info(f"Drift monitor: {DRIFT_WINDOW_SECONDS:g}s window, PSI > {DRIFT_PSI_THRESHOLD} "
+                 f"or mean shift > {DRIFT_MEAN_SHIFT} std")
+        return True
+    except Exception as e:
+        log_error(f"Error starting drift monitor: {e}")
+        drift_monitor = None
+        return False
+
+
+def monitor_drift(features_list, timestamp):
+    """Feed one feature row to the drift monitor and log when the drifting features change."""
+    report = drift_monitor.add(features_list, timestamp)
+    if report is None or not report["changed"]:
+        return
+    if report["drifting"]:
+        details = ", ".join(
+            f"{column} (mean shift {report['features'][column]['shift']:.2f} std, "
+            f"PSI {report['features'][column].get('psi', float('nan')):.2f})"
+            for column in report["drifting"]
+        )
+        log_warning(f"Feature drift over the last {report['rows']} packets: {details}")
+    else:
+        log_info(f"Feature drift cleared over the last {report['rows']} packets")
+
+
+def load_traffic_lists():
+    """Build the allow/deny prefix index checked before feature extraction."""
+    global traffic_lists
+    try:
+        start = time.perf_counter()
+        traffic_lists = TrafficLists.from_file(TRAFFIC_LISTS_PATH)
+        log_info(f"Loaded traffic lists from {TRAFFIC_LISTS_PATH}: {len(traffic_lists.src)} source and "
+                 f"{len(traffic_lists.dst)} destination prefixes, {len(traffic_lists.ports)} port pairs "
+                 f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+        return True
+    except Exception as e:
+        log_error(f"Error loading traffic lists: {e}")
+        traffic_lists = None
+        return False
+
+
+def report_verdict(record, src_port, dst_port, kind, malicious, detail):
+    """Send a verdict to live subscribers and, if it is an alert, to the alert database."""
+    if alert_store is not None and (malicious or ALERT_STORE_ALL_VERDICTS):
+        alert_store.record(record.timestamp, record.src_ip, record.dst_ip,
+                           src_port, dst_port, kind, malicious, detail)
+    if alert_stream is not None:
+        alert_stream.publish(record.timestamp, record.src_ip, record.dst_ip,
+                             src_port, dst_port, kind, malicious, detail)
+
+
+def check_traffic_lists(record):
+    """Return the list action for a record (or None); deny-listed packets are alerted here."""
+    action, reason = traffic_lists.classify(record.src_ip, record.dst_ip,
+                                            record.src_port or 0, record.dst_port or 0)
+    if action == DENY:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        message = (f"[{timestamp}] Prediction: Malicious 🚨 | Deny-listed {reason} | "
+                   f"{record.src_ip}:{record.src_port} → {record.dst_ip}:{record.dst_port}")
+        log_info(message)
+        print(message)
+        request_forensics(record)
+        report_verdict(record, record.src_port or 0, record.dst_port or 0, "deny_list", True,
+                       f"deny-listed {reason}")
+    return action
+
+
+def extract_features(record):
+    """Extract features from a dissected live packet."""
+    try:
+        src_port = record.src_port or 0
+        dst_port = record.dst_port or 0
+        ttl = record.ttl
+        length = record.length
+        flags_numeric = record.df
         
-        ttl = packet[IP].ttl
-        length = len(packet)
-        flags_str = str(packet[IP].flags)
-        flags_numeric = 1 if 'DF' in flags_str else 0
+        host_features = host_tracker.update(record.src_ip, record.dst_ip, dst_port, record.timestamp)
         
-        return pd.DataFrame([[src_port, dst_port, ttl, length, flags_numeric]], 
-                          columns=FEATURE_COLUMNS)
+        return pd.DataFrame([[src_port, dst_port, ttl, length, flags_numeric] + host_features], 
+                          columns=FEATURE_COLUMNS + HOST_RATE_COLUMNS)
     except Exception as e:
         log_error(f"Error extracting features: {e}")
         return None
 
 
-def detect_packet(packet):
-    """Callback function for each sniffed packet."""
+def record_flow(record):
+    """Return the direction-independent flow key of a dissected packet."""
+    return flow_key(record.src_ip, record.dst_ip, record.proto,
+                    record.src_port or 0, record.dst_port or 0)
+
+
+def buffer_record(record):
+    """Keep the raw frame in the forensic ring buffer."""
+    if packet_ring is not None:
+        packet_ring.add(record.timestamp, record.raw, record_flow(record))
+
+
+def request_forensics(record):
+    """Queue a pcap dump of the record's flow around its capture time."""
+    if forensic_dumper is not None:
+        forensic_dumper.request(record_flow(record), record.timestamp,
+                                f"{record.src_ip}_{record.dst_ip}")
+
+
+def inspect_dns(record):
+    """Run UDP/53 packets through the DNS spoofing checks and log any alerts."""
+    if record.proto != 17 or DNS_PORT not in (record.src_port, record.dst_port):
+        return []
+    alerts = dns_monitor.observe(
+        record.timestamp, record.src_ip, record.dst_ip, record.src_port,
+        record.dst_port, record.ttl, record.payload
+    )
+    for alert in alerts:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        message = (f"[{timestamp}] DNS {alert.kind} 🚨 | {alert.server} → {alert.client} | "
+                   f"ID {alert.txid} | {alert.qname} | {alert.detail}")
+        log_warning(message)
+        print(message)
+        report_verdict(record, record.src_port, record.dst_port, f"dns_{alert.kind}", True,
+                       f"ID {alert.txid} {alert.qname}: {alert.detail}")
+    if alerts:
+        request_forensics(record)
+    return alerts
+
+
+def log_heavy_hitters():
+    """Log the current top talkers from the host rate sketches."""
+    top = host_tracker.heavy_hitters(5)
+    log_info(f"Top sources (packets/{SKETCH_WINDOW_SECONDS:g}s): {top['sources']}")
+    log_info(f"Top destinations (packets/{SKETCH_WINDOW_SECONDS:g}s): {top['destinations']}")
+
+
+def detect_record(record):
+    """Detector sink: score one dissected packet; returns True if it raised an alert."""
+    if checkpointer is not None:
+        checkpointer.maybe_capture()
     try:
-        features_df = extract_features(packet)
+        # DNS checks come first: a spoofed answer claims to be from a resolver that may be allow-listed
+        dns_alerts = inspect_dns(record)
+        if traffic_lists is not None:
+            action = check_traffic_lists(record)
+            if action is not None:
+                # Trusted traffic skips scoring; deny-listed traffic is already alerted
+                return action == DENY or bool(dns_alerts)
+        features_df = extract_features(record)
         if features_df is not None and model is not None and scaler is not None:
-            features_scaled = scaler.transform(features_df)
-            prediction = model.predict(features_scaled)[0]
+            features_list = features_df.values.flatten().tolist()
+            if drift_monitor is not None:
+                monitor_drift(features_list, record.timestamp)
+            matched_rule = rule_set.match_packet(features_list) if rule_set is not None else None
+            
+            if RULE_PREFILTER and rule_set is not None and matched_rule is None:
+                # No suspicious pattern matched, skip model scoring
+                malicious = False
+            else:
+                start = time.perf_counter()
+                features_scaled = scaler.transform(features_df[model_columns])
+                prediction = model.predict(features_scaled)[0]
+                malicious = prediction == malicious_label
+                scoring_stats["packets"] += 1
+                scoring_stats["seconds"] += time.perf_counter() - start
+                if shadow_scorer is not None:
+                    shadow_scorer.submit(features_list, malicious)
             
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            label = "Malicious 🚨" if prediction == 0 else "Normal ✅"
-            features_list = features_df.values.flatten().tolist()
+            label = "Malicious 🚨" if malicious else "Normal ✅"
+            rule_info = f" | Rule: {matched_rule}" if matched_rule else ""
+            
+            log_info(f"[{timestamp}] Prediction: {label} | Features: {features_list}{rule_info}")
+            print(f"[{timestamp}] Prediction: {label} | Features: {features_list}{rule_info}")
             
-            log_info(f"[{timestamp}] Prediction: {label} | Features: {features_list}")
-            print(f"[{timestamp}] Prediction: {label} | Features: {features_list}")
+            if malicious:
+                request_forensics(record)
+            report_verdict(record, features_list[0], features_list[1], "model", bool(malicious),
+                           f"features={features_list[:len(FEATURE_COLUMNS)]}{rule_info}")
+            return bool(malicious) or bool(dns_alerts)
+        return bool(dns_alerts)
     except Exception as e:
         log_error(f"Error in packet detection: {e}")
+        return False
+
+
+def detect_packet(packet):
+    """Callback function for a sniffed scapy packet (outside the capture engine)."""
+    record = dissect(packet)
+    if record is not None:
+        buffer_record(record)
+        detect_record(record)
 
 
 def main():
     """Main function to start real-time detection."""
+    global alert_store, alert_stream, packet_ring, forensic_dumper, shadow_scorer, checkpointer
     log_info("Starting MITM Attack Detection System")
     
     # Load models
@@ -123,6 +338,15 @@ def main():
         log_error("Failed to load models. Exiting.")
         sys.exit(1)
     
+    if not load_rules() and RULE_PREFILTER:
+        log_warning("Rule pre-filter disabled: labeling rules could not be loaded")
+    
+    if TRAFFIC_LISTS_ENABLED:
+        load_traffic_lists()
+    
+    if DRIFT_MONITOR:
+        load_drift_monitor()
+    
     # Get network interface
     iface = get_network_interface()
     if not iface:
@@ -131,12 +355,78 @@ def main():
     
     log_info(f"Using network interface: {iface}")
     log_info(f"Packet filter: {PACKET_FILTER}")
+    log_info(f"Host rate sketches: {host_tracker.memory_bytes / 1024:.0f} KiB "
+             f"(epsilon={SKETCH_EPSILON}, delta={SKETCH_DELTA}, window={SKETCH_WINDOW_SECONDS:g}s)")
+    
+    alert_store = AlertStore(
+        ALERT_DB_PATH, ALERT_BATCH_SIZE, ALERT_FLUSH_INTERVAL, ALERT_QUEUE_SIZE,
+        retention_seconds=ALERT_RETENTION_DAYS * 86400
+    ).start()
+    log_info(f"Storing alerts in: {ALERT_DB_PATH}")
+    
+    if ALERT_STREAM_ENABLED:
+        try:
+            alert_stream = AlertStream(ALERT_STREAM_HOST, ALERT_STREAM_PORT, ALERT_STREAM_CLIENT_BUFFER,
+                                       ALERT_STREAM_MAX_PENDING, ALERT_STREAM_MAX_CLIENTS).start()
+            log_info(f"Streaming verdicts to subscribers on {ALERT_STREAM_HOST}:{ALERT_STREAM_PORT}")
+        except OSError as e:
+            log_warning(f"Alert stream disabled: cannot listen on {ALERT_STREAM_HOST}:{ALERT_STREAM_PORT}: {e}")
+    
+    if FORENSIC_CAPTURE:
+        packet_ring = PacketRing(FORENSIC_RING_BYTES, FORENSIC_RING_FRAMES)
+        forensic_dumper = ForensicDumper(packet_ring, FORENSIC_DIR, FORENSIC_PRE_SECONDS,
+                                         FORENSIC_POST_SECONDS).start()
+        log_info(f"Forensic ring buffer: {packet_ring.memory_bytes / (1024 * 1024):.1f} MiB, "
+                 f"dumps to {FORENSIC_DIR}")
+    
+    if SHADOW_MODE:
+        if SHADOW_MODEL_PATH.exists() and SHADOW_SCALER_PATH.exists():
+            shadow_scorer = ShadowScorer(
+                SHADOW_MODEL_PATH, SHADOW_SCALER_PATH, FEATURE_COLUMNS + HOST_RATE_COLUMNS,
+                malicious_label, SHADOW_BATCH_SIZE, SHADOW_MAX_PENDING_BATCHES, SHADOW_REPORT_INTERVAL,
+                production_stats=scoring_stats
+            ).start()
+            log_info(f"Shadow mode: scoring candidate {SHADOW_MODEL_PATH} in a separate process")
+        else:
+            log_warning(f"Shadow mode requested but no candidate model at {SHADOW_MODEL_PATH}")
+    
+    if CHECKPOINT_ENABLED:
+        # Warm restart: pick up the sketches and DNS tables from the last run
+        checkpointer = Checkpointer(CHECKPOINT_DIR, CHECKPOINT_INTERVAL, CHECKPOINT_MAX_AGE)
+        checkpointer.register("host_rates", host_tracker, lambda: host_tracker.packets)
+        checkpointer.register("dns_monitor", dns_monitor,
+                              lambda: dns_monitor.stats["queries"] + dns_monitor.stats["responses"])
+        timings = checkpointer.restore()
+        if timings:
+            log_info(f"Warm restart: restored {len(timings)} components in "
+                     f"{sum(timings.values()) * 1000:.1f} ms")
+        checkpointer.start()
+    
+    # One capture, dissected once, fanned out to independent sinks
+    engine = CaptureEngine(iface, PACKET_FILTER, report_interval=CAPTURE_REPORT_INTERVAL)
+    engine.register_sink("detector", detect_record, CAPTURE_SINK_QUEUE_SIZE)
+    if packet_ring is not None:
+        engine.register_sink("ring_buffer", buffer_record, CAPTURE_SINK_QUEUE_SIZE)
+    if CAPTURE_TRAINING_CSV:
+        # The CSV sink runs on its own thread, so it keeps its own rate sketches
+        csv_tracker = HostRateTracker(SKETCH_EPSILON, SKETCH_DELTA, SKETCH_WINDOW_SECONDS,
+                                      SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K)
+        csv_sink = CsvSink(CAPTURE_TRAINING_CSV, ENHANCED_CSV_COLUMNS + HOST_RATE_COLUMNS,
+                           with_host_rates(enhanced_csv_row, csv_tracker))
+        engine.register_sink("training_csv", csv_sink, CAPTURE_SINK_QUEUE_SIZE, on_close=csv_sink.close)
+        log_info(f"Also capturing training data to: {CAPTURE_TRAINING_CSV}")
     log_info("Starting packet capture (Press Ctrl+C to stop)...")
     
     try:
-        sniff(filter=PACKET_FILTER, prn=detect_packet, store=False, iface=iface)
+        engine.run()
     except KeyboardInterrupt:
         log_info("Packet capture stopped by user")
+        log_heavy_hitters()
+        log_info(f"DNS monitor: {dns_monitor.stats}")
+        if traffic_lists is not None:
+            log_info(f"Traffic lists: {traffic_lists.summary()}")
+        if drift_monitor is not None:
+            log_info(f"Drift monitor: {drift_monitor.summary()}")
     except PermissionError:
         log_error("Permission denied. Please run with administrator/root privileges.")
         sys.exit(1)
@@ -144,6 +434,19 @@ def main():
         log_error(f"Error during sniffing: {e}")
         log_error("Make sure you have the correct interface name and necessary permissions.")
         sys.exit(1)
+    finally:
+        if checkpointer is not None:
+            checkpointer.close()
+        if shadow_scorer is not None:
+            shadow_scorer.close()
+        if forensic_dumper is not None:
+            forensic_dumper.close()
+            log_info(f"Forensic ring buffer: {packet_ring.stats}, dumps: {forensic_dumper.stats}")
+        if alert_stream is not None:
+            alert_stream.close()
+            log_info(f"Alert stream: {alert_stream.stats}")
+        alert_store.close()
+        log_info(f"Alert store: {alert_store.stats}")
 
 
 if __name__ == "__main__":
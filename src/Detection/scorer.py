@@ -0,0 +1,150 @@
+"""
+Central scorer for split-mode detection.
+
+Holds the model and scaler, accepts feature batches from any number of sensors
+(sensor.py) and answers each batch with a VERDICTS frame, which also serves as
+its acknowledgement. Batches are decoded straight into a NumPy record array.
+"""
+
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from utils.config import (
+    MODEL_PATH, SCALER_PATH, FEATURE_COLUMNS, HOST_RATE_COLUMNS, SCORER_BIND, SCORER_PORT,
+    LABELING_RULES_PATH
+)
+from utils.logger import log_info, log_error
+from utils.rule_engine import load_malicious_label
+from src.Detection import wire
+
+# Big-endian view of wire.FEATURE_RECORD
+RECORD_DTYPE = np.dtype([
+    ("timestamp", ">f8"), ("src_ip", ">u4"), ("dst_ip", ">u4"), ("src_port", ">u2"),
+    ("dst_port", ">u2"), ("proto", "u1"), ("ttl", "u1"), ("length", ">u2"), ("flags", "u1"),
+    ("src_rate", ">f4"), ("dst_rate", ">f4"), ("src_ports", ">u2"), ("dst_ports", ">u2"),
+])
+assert RECORD_DTYPE.itemsize == wire.FEATURE_RECORD.size
+
+_COLUMN_FIELDS = dict(zip(FEATURE_COLUMNS + HOST_RATE_COLUMNS, wire.MODEL_FIELDS))
+
+
+def decode_batch(payload):
+    """Return the records of a BATCH payload as a NumPy record array (no per-record copies)."""
+    (count,) = wire.COUNT.unpack_from(payload, 0)
+    if wire.COUNT.size + count * RECORD_DTYPE.itemsize != len(payload):
+        raise wire.ProtocolError(f"Batch of {count} records has {len(payload)} bytes")
+    return np.frombuffer(payload, dtype=RECORD_DTYPE, count=count, offset=wire.COUNT.size)
+
+
+def model_scorer(model, scaler, malicious_label):
+    """Return a batch scoring function for a trained model and scaler.
+
+    Predictions equal to malicious_label (see rule_engine.load_malicious_label)
+    are reported as malicious.
+    """
+    columns = list(getattr(scaler, "feature_names_in_", FEATURE_COLUMNS))
+
+    def score(records):
+        frame = pd.DataFrame({column: records[_COLUMN_FIELDS[column]] for column in columns},
+                             columns=columns)
+        predictions = model.predict(scaler.transform(frame))
+        return predictions == malicious_label
+
+    return score
+
+
+def rule_scorer(rule_set):
+    """Return a batch scoring function backed by the vectorized labeling rules."""
+    def score(records):
+        frame = {column: records[_COLUMN_FIELDS[column]] for column in rule_set.columns}
+        return rule_set.label_frame(frame) == rule_set.label_on_match
+    return score
+
+
+class ScorerServer(socketserver.ThreadingTCPServer):
+    """Threaded TCP server that scores sensor batches with a shared scoring function."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, score):
+        super().__init__(address, _SensorHandler)
+        self.score = score
+        self.lock = threading.Lock()
+        self.stats = {"sensors": 0, "batches": 0, "records": 0, "malicious": 0, "score_seconds": 0.0}
+
+    def record(self, records, malicious, seconds):
+        with self.lock:
+            self.stats["batches"] += 1
+            self.stats["records"] += records
+            self.stats["malicious"] += malicious
+            self.stats["score_seconds"] += seconds
+
+
+class _SensorHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        sock = self.request
+        name = f"{self.client_address[0]}:{self.client_address[1]}"
+        try:
+            frame_type, _, payload = wire.read_frame(sock)
+            if frame_type != wire.HELLO:
+                raise wire.ProtocolError("Expected HELLO")
+            name = payload.decode("utf-8", "replace") or name
+            log_info(f"Scorer: sensor '{name}' connected from {self.client_address[0]}")
+            with self.server.lock:
+                self.server.stats["sensors"] += 1
+
+            while True:
+                frame_type, sequence, payload = wire.read_frame(sock)
+                if frame_type != wire.BATCH:
+                    raise wire.ProtocolError(f"Unexpected frame type {frame_type}")
+                records = decode_batch(payload)
+                start = time.perf_counter()
+                verdicts = np.asarray(self.server.score(records), dtype=np.uint8)
+                self.server.record(len(records), int(verdicts.sum()), time.perf_counter() - start)
+                sock.sendall(wire.encode_frame(wire.VERDICTS, sequence, verdicts.tobytes()))
+        except ConnectionError:
+            log_info(f"Scorer: sensor '{name}' disconnected")
+        except (OSError, wire.ProtocolError) as e:
+            log_error(f"Scorer: dropping sensor '{name}': {e}")
+
+
+def main():
+    """Load the model and serve verdicts to sensors."""
+    log_info("Starting MITM detection scorer")
+    for path in (MODEL_PATH, SCALER_PATH):
+        if not path.exists():
+            log_error(f"Model file not found: {path}")
+            log_error("Please train the model first using: python src/ML_Model/Traning.py")
+            sys.exit(1)
+    try:
+        model = joblib.load(MODEL_PATH)
+        scaler = joblib.load(SCALER_PATH)
+        malicious_label = load_malicious_label(LABELING_RULES_PATH)
+    except Exception as e:
+        log_error(f"Error loading models: {e}")
+        sys.exit(1)
+
+    server = ScorerServer((SCORER_BIND, SCORER_PORT), model_scorer(model, scaler, malicious_label))
+    log_info(f"Scorer listening on {SCORER_BIND}:{SCORER_PORT} (Press Ctrl+C to stop)...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log_info("Scorer stopped by user")
+    finally:
+        server.server_close()
+        log_info(f"Scorer stats: {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
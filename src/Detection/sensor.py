@@ -0,0 +1,269 @@
+"""
+Lightweight capture sensor for split-mode detection.
+
+Runs only packet capture and feature extraction (no pandas, sklearn or model)
+and ships feature batches to the central scorer (scorer.py) over the binary
+framing in wire.py. Unacknowledged batches are kept in a bounded buffer and
+resent after reconnecting; when the buffer is full the oldest batch is dropped.
+"""
+
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from utils.config import (
+    PACKET_FILTER, SCORER_HOST, SCORER_PORT, SENSOR_NAME,
+    SENSOR_BATCH_SIZE, SENSOR_BATCH_INTERVAL, SENSOR_MAX_BUFFERED_BATCHES,
+    SENSOR_MAX_IN_FLIGHT, SENSOR_RECONNECT_MAX_DELAY, SKETCH_EPSILON, SKETCH_DELTA,
+    SKETCH_WINDOW_SECONDS, SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K, CAPTURE_SINK_QUEUE_SIZE,
+    CAPTURE_REPORT_INTERVAL
+)
+from utils.logger import log_info, log_error, log_warning
+from src.Detection import wire
+from src.Detection.heavy_hitters import HostRateTracker
+
+
+class SensorClient:
+    """Batches feature records and delivers them to the scorer with acknowledgements."""
+
+    def __init__(self, host, port, name, batch_size=256, batch_interval=0.5,
+                 max_buffered_batches=1024, max_in_flight=32, reconnect_max_delay=30.0,
+                 on_verdicts=None):
+        self.address = (host, port)
+        self.name = name
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_buffered_batches = max_buffered_batches
+        self.max_in_flight = max_in_flight
+        self.reconnect_max_delay = reconnect_max_delay
+        self.on_verdicts = on_verdicts
+
+        self.cond = threading.Condition()
+        self.current = []
+        self.current_started = None
+        self.pending = OrderedDict()  # sequence -> (records, frame bytes), oldest first
+        self.in_flight = set()
+        self.sequence = 0
+        self.running = False
+        self.connected = False
+        self.thread = None
+        self.stats = {"records": 0, "batches": 0, "acked_batches": 0, "acked_records": 0,
+                      "malicious": 0, "dropped_batches": 0, "dropped_records": 0,
+                      "reconnects": 0, "resent_batches": 0}
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="sensor-sender", daemon=True)
+        self.thread.start()
+        return self
+
+    def add(self, record):
+        """Add one FeatureRecord to the current batch."""
+        packed = wire.pack_record(record)
+        with self.cond:
+            if not self.current:
+                self.current_started = time.monotonic()
+            self.current.append((record, packed))
+            self.stats["records"] += 1
+            if len(self.current) >= self.batch_size:
+                self._seal_batch()
+
+    def flush(self):
+        """Seal the current partial batch so it is sent."""
+        with self.cond:
+            if self.current:
+                self._seal_batch()
+
+    def _seal_batch(self):
+        # Caller holds self.cond
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        records = [record for record, _ in self.current]
+        frame = wire.encode_batch(self.sequence, [packed for _, packed in self.current])
+        self.current = []
+        self.current_started = None
+        self.pending[self.sequence] = (records, frame)
+        self.stats["batches"] += 1
+        while len(self.pending) > self.max_buffered_batches:
+            sequence, (dropped, _) = self.pending.popitem(last=False)
+            self.in_flight.discard(sequence)
+            self.stats["dropped_batches"] += 1
+            self.stats["dropped_records"] += len(dropped)
+        self.cond.notify_all()
+
+    def wait_idle(self, timeout):
+        """Wait until every sealed batch has been acknowledged; returns True if so."""
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while self.pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+        return True
+
+    def close(self, timeout=5.0):
+        """Flush, wait briefly for acknowledgements and stop the sender."""
+        self.flush()
+        self.wait_idle(timeout)
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def _connect(self):
+        delay = 0.5
+        while self.running:
+            try:
+                sock = socket.create_connection(self.address, timeout=5.0)
+                sock.settimeout(None)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.sendall(wire.encode_frame(wire.HELLO, 0, self.name.encode("utf-8")))
+                log_info(f"Sensor {self.name}: connected to scorer {self.address[0]}:{self.address[1]}")
+                return sock
+            except OSError as e:
+                log_warning(f"Sensor {self.name}: scorer unavailable ({e}), retrying in {delay:.1f}s")
+                with self.cond:
+                    self.cond.wait(delay)
+                delay = min(delay * 2, self.reconnect_max_delay)
+        return None
+
+    def _read_verdicts(self, sock):
+        try:
+            while True:
+                frame_type, sequence, payload = wire.read_frame(sock)
+                if frame_type != wire.VERDICTS:
+                    raise wire.ProtocolError(f"Unexpected frame type {frame_type}")
+                with self.cond:
+                    entry = self.pending.pop(sequence, None)
+                    self.in_flight.discard(sequence)
+                    if entry is not None:
+                        self.stats["acked_batches"] += 1
+                        self.stats["acked_records"] += len(entry[0])
+                        self.stats["malicious"] += sum(payload)
+                    self.cond.notify_all()
+                if entry is not None and self.on_verdicts is not None:
+                    self.on_verdicts(entry[0], payload)
+        except (OSError, ConnectionError, wire.ProtocolError) as e:
+            if self.running and self.connected:
+                log_warning(f"Sensor {self.name}: connection lost ({e})")
+        finally:
+            with self.cond:
+                self.connected = False
+                self.cond.notify_all()
+
+    def _run(self):
+        while self.running:
+            sock = self._connect()
+            if sock is None:
+                return
+            with self.cond:
+                self.connected = True
+                # Anything sent on a previous connection without an ack is resent
+                self.stats["resent_batches"] += len(self.in_flight)
+                self.in_flight.clear()
+            reader = threading.Thread(target=self._read_verdicts, args=(sock,),
+                                      name="sensor-reader", daemon=True)
+            reader.start()
+            try:
+                while True:
+                    with self.cond:
+                        if self.current and time.monotonic() - self.current_started >= self.batch_interval:
+                            self._seal_batch()
+                        if not self.running or not self.connected:
+                            break
+                        room = self.max_in_flight - len(self.in_flight)
+                        frames = [(sequence, frame) for sequence, (_, frame) in self.pending.items()
+                                  if sequence not in self.in_flight][:max(room, 0)]
+                        if not frames:
+                            self.cond.wait(self.batch_interval / 2)
+                            continue
+                        self.in_flight.update(sequence for sequence, _ in frames)
+                    sock.sendall(b"".join(frame for _, frame in frames))
+            except OSError as e:
+                log_warning(f"Sensor {self.name}: send failed ({e})")
+            finally:
+                with self.cond:
+                    self.connected = False
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                sock.close()
+                reader.join()
+            if self.running:
+                self.stats["reconnects"] += 1
+
+
+def to_feature_record(record, tracker):
+    """Turn a capture-engine PacketRecord into a FeatureRecord, updating the host rates."""
+    src_port = record.src_port or 0
+    dst_port = record.dst_port or 0
+    host_features = tracker.update(record.src_ip, record.dst_ip, dst_port, record.timestamp)
+    return wire.FeatureRecord(
+        record.timestamp, record.src_ip, record.dst_ip, src_port, dst_port, record.proto,
+        record.ttl, record.length, record.df, *host_features
+    )
+
+
+def log_verdicts(records, verdicts):
+    """Print the scorer's malicious verdicts for a batch."""
+    for record, malicious in zip(records, verdicts):
+        if malicious:
+            timestamp = datetime.fromtimestamp(record.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            message = (f"[{timestamp}] Prediction: Malicious 🚨 | {record.src_ip}:{record.src_port} → "
+                       f"{record.dst_ip}:{record.dst_port} | TTL: {record.ttl} | Len: {record.length}")
+            log_info(message)
+            print(message)
+
+
+def main():
+    """Capture packets and forward feature batches to the central scorer."""
+    # Imported here so the wire/client parts stay usable without scapy
+    from src.Sniffing.capture_engine import CaptureEngine, get_network_interface
+
+    log_info(f"Starting MITM detection sensor '{SENSOR_NAME}'")
+    iface = get_network_interface()
+    if not iface:
+        log_error("No network interface available. Exiting.")
+        sys.exit(1)
+
+    tracker = HostRateTracker(SKETCH_EPSILON, SKETCH_DELTA, SKETCH_WINDOW_SECONDS,
+                              SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K)
+    client = SensorClient(SCORER_HOST, SCORER_PORT, SENSOR_NAME, SENSOR_BATCH_SIZE,
+                          SENSOR_BATCH_INTERVAL, SENSOR_MAX_BUFFERED_BATCHES,
+                          SENSOR_MAX_IN_FLIGHT, SENSOR_RECONNECT_MAX_DELAY,
+                          on_verdicts=log_verdicts).start()
+
+    def forward_record(record):
+        client.add(to_feature_record(record, tracker))
+
+    engine = CaptureEngine(iface, PACKET_FILTER, report_interval=CAPTURE_REPORT_INTERVAL)
+    engine.register_sink("sensor", forward_record, CAPTURE_SINK_QUEUE_SIZE)
+
+    log_info(f"Using network interface: {iface}")
+    log_info(f"Forwarding features to scorer at {SCORER_HOST}:{SCORER_PORT}")
+    try:
+        engine.run()
+    except KeyboardInterrupt:
+        log_info("Packet capture stopped by user")
+    except PermissionError:
+        log_error("Permission denied. Please run with administrator/root privileges.")
+        sys.exit(1)
+    except Exception as e:
+        log_error(f"Error during sniffing: {e}")
+        sys.exit(1)
+    finally:
+        client.close()
+        log_info(f"Sensor stats: {client.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Shadow scoring of a candidate model next to the production model.
+
+The detector hands every scored feature row and its production verdict to a
+ShadowScorer. Rows are buffered and sent in batches to a separate worker
+process that holds the candidate model, so shadow scoring never competes with
+production scoring for the GIL. If the worker falls behind, batches are dropped
+rather than queued without limit. The worker periodically reports disagreement
+rate, the production-vs-shadow confusion matrix and its scoring latency.
+
+Batches are pickled on the detector thread, inside the measured overhead, so the
+queue's feeder thread only copies bytes to the pipe. benchmarks/load_harness.py
+--shadow measures the end-to-end cost on detector throughput.
+"""
+
+import multiprocessing
+import pickle
+import queue
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from utils.logger import log_info, log_error, log_warning
+
+_STOP = "stop"
+
+
+def _shadow_worker(model_path, scaler_path, columns, malicious_label, requests, reports,
+                   report_interval):
+    """Score batches with the candidate model and compare them to production verdicts."""
+    try:
+        model = joblib.load(model_path)
+        scaler = joblib.load(scaler_path)
+    except Exception as e:
+        reports.put({"error": f"Could not load shadow model: {e}"})
+        return
+
+    model_columns = list(getattr(scaler, "feature_names_in_", columns[:scaler.n_features_in_]))
+    positions = [columns.index(column) for column in model_columns]
+    # confusion[production][shadow], 0 = normal, 1 = malicious
+    confusion = np.zeros((2, 2), dtype=np.int64)
+    stats = {"batches": 0, "rows": 0, "seconds": 0.0}
+    next_report = time.monotonic() + report_interval
+
+    def snapshot():
+        rows = stats["rows"]
+        return {
+            "rows": rows,
+            "batches": stats["batches"],
+            "disagreement_rate": (confusion[0, 1] + confusion[1, 0]) / rows if rows else 0.0,
+            "confusion": confusion.tolist(),
+            "shadow_us_per_row": stats["seconds"] / rows * 1e6 if rows else 0.0,
+            "shadow_ms_per_batch": stats["seconds"] / stats["batches"] * 1000 if stats["batches"] else 0.0,
+        }
+
+    while True:
+        try:
+            item = requests.get(timeout=1.0)
+        except queue.Empty:
+            item = None
+        if item == _STOP:
+            reports.put(dict(snapshot(), final=True))
+            return
+        if item is not None:
+            features, production = pickle.loads(item)
+            start = time.perf_counter()
+            frame = pd.DataFrame(features[:, positions], columns=model_columns)
+            shadow = model.predict(scaler.transform(frame)) == malicious_label
+            stats["seconds"] += time.perf_counter() - start
+            stats["batches"] += 1
+            stats["rows"] += len(features)
+            np.add.at(confusion, (production.astype(np.intp), shadow.astype(np.intp)), 1)
+        if time.monotonic() >= next_report:
+            reports.put(snapshot())
+            next_report = time.monotonic() + report_interval
+
+
+class ShadowScorer:
+    """Feeds production-scored rows to a candidate model running in its own process."""
+
+    def __init__(self, model_path, scaler_path, columns, malicious_label, batch_size=256,
+                 max_pending_batches=32, report_interval=60.0, production_stats=None):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.columns = list(columns)
+        # Candidate class reported as malicious, as for the production model
+        self.malicious_label = malicious_label
+        self.batch_size = batch_size
+        self.report_interval = report_interval
+        # {"packets", "seconds"} maintained by the detector, for overhead comparisons
+        self.production_stats = production_stats
+        self.requests = multiprocessing.Queue(maxsize=max_pending_batches)
+        self.reports = multiprocessing.Queue()
+        self.rows = []
+        self.verdicts = []
+        self.process = None
+        self.collector = None
+        self.last_report = None
+        self.stats = {"submitted": 0, "dropped": 0, "overhead_seconds": 0.0}
+
+    def start(self):
+        self.process = multiprocessing.Process(
+            target=_shadow_worker, name="shadow-scorer", daemon=True,
+            args=(self.model_path, self.scaler_path, self.columns, self.malicious_label,
+                  self.requests, self.reports, self.report_interval))
+        self.process.start()
+        self.collector = threading.Thread(target=self._collect, name="shadow-reports", daemon=True)
+        self.collector.start()
+        return self
+
+    def submit(self, features, malicious):
+        """Record one production-scored row; returns immediately."""
+        start = time.perf_counter()
+        self.rows.append(features)
+        self.verdicts.append(malicious)
+        if len(self.rows) >= self.batch_size:
+            self._flush()
+        self.stats["overhead_seconds"] += time.perf_counter() - start
+
+    def _flush(self):
+        if not self.rows:
+            return
+        batch = pickle.dumps((np.asarray(self.rows, dtype=np.float64),
+                              np.asarray(self.verdicts, dtype=bool)), pickle.HIGHEST_PROTOCOL)
+        try:
+            self.requests.put_nowait(batch)
+            self.stats["submitted"] += len(self.rows)
+        except queue.Full:
+            self.stats["dropped"] += len(self.rows)
+        self.rows = []
+        self.verdicts = []
+
+    def _collect(self):
+        while True:
+            report = self.reports.get()
+            if "error" in report:
+                log_error(f"Shadow scoring disabled: {report['error']}")
+                return
+            self.last_report = report
+            if report.get("final"):
+                return
+            self.log_report(report)
+
+    def log_report(self, report):
+        """Log a worker report together with the production-side overhead."""
+        log_info(f"Shadow model: {report['rows']} rows, disagreement {report['disagreement_rate']:.2%}, "
+                 f"confusion [prod][shadow] {report['confusion']}, "
+                 f"{report['shadow_us_per_row']:.1f} us/row ({report['shadow_ms_per_batch']:.2f} ms/batch)")
+        packets = self.stats["submitted"] + self.stats["dropped"] + len(self.rows)
+        if packets:
+            overhead = self.stats["overhead_seconds"] / packets * 1e6
+            message = f"Shadow submit() cost on production path: {overhead:.2f} us/packet"
+            production = self.production_stats
+            if production and production.get("packets"):
+                production_us = production["seconds"] / production["packets"] * 1e6
+                message += (f" vs {production_us:.1f} us/packet production scoring "
+                            f"({overhead / production_us:.1%})")
+            log_info(message + f", dropped {self.stats['dropped']} rows")
+
+    def close(self, timeout=30.0):
+        """Send remaining rows, stop the worker and log its final report."""
+        if self.process is None:
+            return None
+        self._flush()
+        try:
+            self.requests.put(_STOP, timeout=timeout)
+        except queue.Full:
+            log_warning("Shadow scorer did not drain its queue in time")
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        if self.collector is not None:
+            self.collector.join(5.0)
+        if self.last_report is not None:
+            self.log_report(self.last_report)
+        self.process = None
+        return self.last_report
@@ -0,0 +1,176 @@
+"""
+Two-process real-time detection over a shared-memory ring.
+
+The capture process runs the capture engine, computes the feature record of
+every packet (ports, TTL, length, DF flag and host rates) and packs it into a
+SharedRing. A separate inference process holds the model, reads the ring in
+batches as zero-copy record arrays and scores them, so scapy dissection and
+sklearn scoring no longer compete for one GIL. Malicious verdicts are logged
+and stored in the alert database by the inference process.
+
+    python src/Detection/shm_detector.py
+"""
+
+import multiprocessing
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from utils.config import (
+    MODEL_PATH, SCALER_PATH, PACKET_FILTER, SKETCH_EPSILON, SKETCH_DELTA, SKETCH_WINDOW_SECONDS,
+    SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K, CAPTURE_SINK_QUEUE_SIZE, CAPTURE_REPORT_INTERVAL,
+    SHM_RING_RECORDS, SHM_BATCH_SIZE, SHM_POLL_INTERVAL, ALERT_DB_PATH, ALERT_BATCH_SIZE,
+    ALERT_FLUSH_INTERVAL, ALERT_QUEUE_SIZE, ALERT_RETENTION_DAYS, LABELING_RULES_PATH
+)
+from utils.logger import log_info, log_error, log_warning
+from src.Detection.heavy_hitters import HostRateTracker
+from src.Detection.sensor import to_feature_record
+from src.Detection.shm_ring import SharedRing
+
+
+def _ip(value):
+    return socket.inet_ntoa(int(value).to_bytes(4, "big"))
+
+
+def inference_worker(ring_name, batch_size, poll_interval, stopping, report_interval,
+                     alert_db_path=ALERT_DB_PATH):
+    """Inference process: score ring records in batches until stopping is set and the ring is empty."""
+    # Only this process needs the model stack
+    import joblib
+    import numpy as np
+    from src.Detection.alert_store import AlertStore
+    from src.Detection.scorer import RECORD_DTYPE, model_scorer
+    from utils.rule_engine import load_malicious_label
+
+    try:
+        score = model_scorer(joblib.load(MODEL_PATH), joblib.load(SCALER_PATH),
+                             load_malicious_label(LABELING_RULES_PATH))
+    except Exception as e:
+        log_error(f"Inference process could not load the model: {e}")
+        return
+
+    ring = SharedRing.attach(ring_name)
+    alert_store = None
+    if alert_db_path is not None:
+        alert_store = AlertStore(alert_db_path, ALERT_BATCH_SIZE, ALERT_FLUSH_INTERVAL, ALERT_QUEUE_SIZE,
+                                 retention_seconds=ALERT_RETENTION_DAYS * 86400).start()
+    stats = {"batches": 0, "records": 0, "malicious": 0, "seconds": 0.0}
+
+    def report():
+        per_record = stats["seconds"] / stats["records"] * 1e6 if stats["records"] else 0.0
+        log_info(f"Inference: {stats['records']} records in {stats['batches']} batches, "
+                 f"{stats['malicious']} malicious, {per_record:.1f} us/record | ring {ring.stats()}")
+
+    next_report = time.monotonic() + report_interval
+    try:
+        while True:
+            segment = ring.acquire(batch_size)
+            if segment is None:
+                if stopping.is_set():
+                    break
+                time.sleep(poll_interval)
+            else:
+                view, count = segment
+                start = time.perf_counter()
+                records = np.frombuffer(view, dtype=RECORD_DTYPE, count=count)
+                verdicts = np.asarray(score(records), dtype=bool)
+                # Boolean indexing copies just the malicious records out of the ring
+                malicious = records[verdicts]
+                del records, view
+                ring.release(count)
+                stats["seconds"] += time.perf_counter() - start
+                stats["batches"] += 1
+                stats["records"] += count
+                stats["malicious"] += len(malicious)
+                for record in malicious:
+                    src_ip, dst_ip = _ip(record["src_ip"]), _ip(record["dst_ip"])
+                    timestamp = datetime.fromtimestamp(record["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
+                    log_info(f"[{timestamp}] Prediction: Malicious 🚨 | {src_ip}:{record['src_port']} → "
+                             f"{dst_ip}:{record['dst_port']} | TTL: {record['ttl']} | Len: {record['length']}")
+                    if alert_store is not None:
+                        alert_store.record(float(record["timestamp"]), src_ip, dst_ip,
+                                           int(record["src_port"]), int(record["dst_port"]),
+                                           "model", True, "two-process mode")
+            if time.monotonic() >= next_report:
+                report()
+                next_report = time.monotonic() + report_interval
+    finally:
+        report()
+        if alert_store is not None:
+            alert_store.close()
+        ring.close()
+
+
+def main():
+    """Capture in this process and score in a separate inference process."""
+    # Imported here so the inference side never loads scapy
+    from src.Sniffing.capture_engine import CaptureEngine, get_network_interface
+
+    log_info("Starting MITM Attack Detection System (two-process mode)")
+    for path in (MODEL_PATH, SCALER_PATH):
+        if not path.exists():
+            log_error(f"Model file not found: {path}")
+            log_error("Please train the model first using: python src/ML_Model/Traning.py")
+            sys.exit(1)
+    iface = get_network_interface()
+    if not iface:
+        log_error("No network interface available. Exiting.")
+        sys.exit(1)
+
+    ring = SharedRing.create(SHM_RING_RECORDS)
+    stopping = multiprocessing.Event()
+    worker = multiprocessing.Process(
+        target=inference_worker, name="inference", daemon=True,
+        args=(ring.name, SHM_BATCH_SIZE, SHM_POLL_INTERVAL, stopping, CAPTURE_REPORT_INTERVAL))
+    worker.start()
+    log_info(f"Shared feature ring: {SHM_RING_RECORDS} records "
+             f"({SHM_RING_RECORDS * ring.record_size / (1024 * 1024):.1f} MiB), inference pid {worker.pid}")
+
+    tracker = HostRateTracker(SKETCH_EPSILON, SKETCH_DELTA, SKETCH_WINDOW_SECONDS,
+                              SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K)
+
+    def push_features(record):
+        ring.push(to_feature_record(record, tracker))
+
+    engine = CaptureEngine(iface, PACKET_FILTER, report_interval=CAPTURE_REPORT_INTERVAL)
+    engine.register_sink("feature_ring", push_features, CAPTURE_SINK_QUEUE_SIZE)
+
+    reporting = threading.Event()
+
+    def report_ring():
+        while not reporting.wait(CAPTURE_REPORT_INTERVAL):
+            stats = ring.stats()
+            log_info(f"Feature ring: {stats['occupancy']}/{stats['capacity']} records "
+                     f"({stats['fill']:.1%}), {stats['overruns']} overruns")
+
+    threading.Thread(target=report_ring, name="ring-report", daemon=True).start()
+    log_info(f"Using network interface: {iface}")
+    log_info("Starting packet capture (Press Ctrl+C to stop)...")
+    try:
+        engine.run()
+    except KeyboardInterrupt:
+        log_info("Packet capture stopped by user")
+    except PermissionError:
+        log_error("Permission denied. Please run with administrator/root privileges.")
+        sys.exit(1)
+    except Exception as e:
+        log_error(f"Error during sniffing: {e}")
+        sys.exit(1)
+    finally:
+        reporting.set()
+        stopping.set()
+        worker.join(30)
+        if worker.is_alive():
+            log_warning("Inference process did not drain the ring in time")
+            worker.terminate()
+        log_info(f"Feature ring: {ring.stats()}")
+        ring.close()
+
+
+if __name__ == "__main__":
+    main()
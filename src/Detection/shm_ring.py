@@ -0,0 +1,111 @@
+"""
+Single-producer/single-consumer ring of fixed-width records in shared memory.
+
+The capture process packs each FeatureRecord (wire.FEATURE_RECORD layout)
+straight into its slot; the inference process gets contiguous runs of slots as
+memoryviews over the shared block (np.frombuffer with scorer.RECORD_DTYPE gives
+a record array without copying) and releases them once scored. Nothing is
+pickled or copied per record.
+
+Layout: head counter | tail counter | overrun counter | capacity, record size |
+slots. head and tail are monotonically increasing record counts, each on its own
+cache line and written by one side only. When the ring is full the producer
+drops the new record and counts an overrun instead of blocking capture.
+"""
+
+import struct
+from multiprocessing import shared_memory
+
+from src.Detection import wire
+
+_U64 = struct.Struct("<Q")
+_GEOMETRY = struct.Struct("<QQ")
+_HEAD = 0
+_OVERRUNS = 8
+_TAIL = 64
+_GEOMETRY_OFFSET = 128
+_DATA = 192
+
+
+class SharedRing:
+    """Shared-memory ring of wire.FEATURE_RECORD slots."""
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.buf = shm.buf
+        self.capacity, self.record_size = _GEOMETRY.unpack_from(self.buf, _GEOMETRY_OFFSET)
+        # Each side caches the counter it owns and only reads the other one
+        self._head = _U64.unpack_from(self.buf, _HEAD)[0]
+        self._tail = _U64.unpack_from(self.buf, _TAIL)[0]
+        self._overruns = _U64.unpack_from(self.buf, _OVERRUNS)[0]
+
+    @classmethod
+    def create(cls, capacity, name=None):
+        """Allocate a new ring of capacity records; the creator unlinks it on close()."""
+        record_size = wire.FEATURE_RECORD.size
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_DATA + capacity * record_size)
+        shm.buf[:_DATA] = bytes(_DATA)
+        _GEOMETRY.pack_into(shm.buf, _GEOMETRY_OFFSET, capacity, record_size)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """Open a ring created by another process."""
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    # Producer side
+
+    def push(self, record):
+        """Write one FeatureRecord; returns False (and counts an overrun) if the ring is full."""
+        head = self._head
+        if head - self._tail >= self.capacity:
+            self._tail = _U64.unpack_from(self.buf, _TAIL)[0]
+            if head - self._tail >= self.capacity:
+                self._overruns += 1
+                _U64.pack_into(self.buf, _OVERRUNS, self._overruns)
+                return False
+        wire.pack_record_into(self.buf, _DATA + (head % self.capacity) * self.record_size, record)
+        # Publish only after the slot is written
+        self._head = head + 1
+        _U64.pack_into(self.buf, _HEAD, self._head)
+        return True
+
+    # Consumer side
+
+    def acquire(self, max_records):
+        """Return (memoryview, count) for the next contiguous run of unread records, or None.
+
+        The view points into shared memory; release(count) once done with it.
+        """
+        available = _U64.unpack_from(self.buf, _HEAD)[0] - self._tail
+        if available <= 0:
+            return None
+        start = self._tail % self.capacity
+        count = min(available, self.capacity - start, max_records)
+        offset = _DATA + start * self.record_size
+        return self.buf[offset:offset + count * self.record_size], count
+
+    def release(self, count):
+        """Hand count records back to the producer."""
+        self._tail += count
+        _U64.pack_into(self.buf, _TAIL, self._tail)
+
+    def stats(self):
+        """Occupancy and counters as seen from shared memory (valid in either process)."""
+        head = _U64.unpack_from(self.buf, _HEAD)[0]
+        tail = _U64.unpack_from(self.buf, _TAIL)[0]
+        return {"written": head, "read": tail, "occupancy": head - tail,
+                "capacity": self.capacity, "fill": (head - tail) / self.capacity,
+                "overruns": _U64.unpack_from(self.buf, _OVERRUNS)[0]}
+
+    def close(self):
+        """Detach; the creating process also frees the shared block."""
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,140 @@
+"""
+Allow/deny lists of CIDR prefixes and port pairs, checked before feature extraction.
+
+Prefixes are flattened once at startup into a sorted interval index: nested
+CIDRs are split into disjoint address ranges, each carrying the action of the
+longest prefix that covers it. A lookup is then one bisect plus one list index,
+whatever the number of prefixes. Port pairs are a set lookup, with 0 as a
+wildcard for either port.
+
+Decision per packet: deny if the source, destination or port pair is denied;
+otherwise allow if any of them is allowed; otherwise the packet is scored as usual.
+"""
+
+import ipaddress
+import json
+from bisect import bisect_right
+from collections import Counter
+
+from src.Detection.heavy_hitters import ip_to_int
+
+ALLOW = "allow"
+DENY = "deny"
+_SIDES = ("src", "dst", "either")
+
+
+class PrefixIndex:
+    """Longest-prefix-match over IPv4 CIDRs as a flat interval index."""
+
+    def __init__(self, entries):
+        """entries: iterable of (cidr, action); on an exact duplicate, deny wins."""
+        prefixes = {}
+        for cidr, action in entries:
+            network = ipaddress.ip_network(cidr, strict=False)
+            if network.version != 4:
+                raise ValueError(f"Only IPv4 prefixes are supported: {cidr}")
+            key = (int(network.network_address), network.prefixlen)
+            if prefixes.get(key) != DENY:
+                prefixes[key] = action
+        self.size = len(prefixes)
+        self.starts, self.actions = self._flatten(prefixes)
+
+    @staticmethod
+    def _flatten(prefixes):
+        # Parents sort before their children; CIDRs are either nested or disjoint
+        points = []
+        stack = []  # (last address, action) of the prefixes containing the cursor
+        for (start, length), action in sorted(prefixes.items()):
+            while stack and stack[-1][0] < start:
+                last, _ = stack.pop()
+                points.append((last + 1, stack[-1][1] if stack else None))
+            points.append((start, action))
+            stack.append((start + (1 << (32 - length)) - 1, action))
+        while stack:
+            last, _ = stack.pop()
+            points.append((last + 1, stack[-1][1] if stack else None))
+
+        starts, actions = [], []
+        for position, action in points:
+            if position > 0xFFFFFFFF:
+                continue
+            if starts and starts[-1] == position:
+                # A later point at the same address overrides (child closing, sibling opening)
+                actions[-1] = action
+            else:
+                starts.append(position)
+                actions.append(action)
+            if len(actions) > 1 and actions[-1] == actions[-2]:
+                starts.pop()
+                actions.pop()
+        return starts, actions
+
+    def lookup(self, address):
+        """Return the action of the longest prefix containing address (int), or None."""
+        i = bisect_right(self.starts, address) - 1
+        return self.actions[i] if i >= 0 else None
+
+    def __len__(self):
+        return self.size
+
+
+class TrafficLists:
+    """Allow/deny decisions for packets from CIDR lists and port pairs."""
+
+    def __init__(self, config):
+        src, dst, ports = [], [], {}
+        for action in (ALLOW, DENY):
+            lists = config.get(action, {})
+            unknown = set(lists) - set(_SIDES) - {"ports"}
+            if unknown:
+                raise ValueError(f"Unknown keys in '{action}' list: {sorted(unknown)}")
+            for cidr in lists.get("src", []) + lists.get("either", []):
+                src.append((cidr, action))
+            for cidr in lists.get("dst", []) + lists.get("either", []):
+                dst.append((cidr, action))
+            for pair in lists.get("ports", []):
+                src_port, dst_port = pair
+                key = (int(src_port), int(dst_port))
+                if ports.get(key) != DENY:
+                    ports[key] = action
+        self.src = PrefixIndex(src)
+        self.dst = PrefixIndex(dst)
+        self.ports = ports
+        self.stats = Counter()
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def _port_action(self, src_port, dst_port):
+        ports = self.ports
+        if not ports:
+            return None
+        action = ports.get((src_port, dst_port))
+        wildcard = ports.get((0, dst_port)), ports.get((src_port, 0))
+        if action == DENY or DENY in wildcard:
+            return DENY
+        return action or (ALLOW if ALLOW in wildcard else None)
+
+    def classify(self, src_ip, dst_ip, src_port=0, dst_port=0):
+        """Return (ALLOW | DENY | None, reason) and count the decision."""
+        matches = (("src", self.src.lookup(ip_to_int(src_ip))),
+                   ("dst", self.dst.lookup(ip_to_int(dst_ip))),
+                   ("ports", self._port_action(src_port, dst_port)))
+        for wanted in (DENY, ALLOW):
+            for reason, action in matches:
+                if action == wanted:
+                    self.stats[f"{wanted}:{reason}"] += 1
+                    return wanted, reason
+        self.stats["scored"] += 1
+        return None, None
+
+    def summary(self):
+        """Counts of bypassed (allow), fast-tracked (deny) and scored packets."""
+        allowed = sum(count for key, count in self.stats.items() if key.startswith(ALLOW))
+        denied = sum(count for key, count in self.stats.items() if key.startswith(DENY))
+        total = allowed + denied + self.stats["scored"]
+        share = allowed / total if total else 0.0
+        return (f"{allowed} bypassed ({share:.1%}), {denied} deny-listed, "
+                f"{self.stats['scored']} scored | {dict(self.stats)}")
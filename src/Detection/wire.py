@@ -0,0 +1,120 @@
+"""
+Compact binary framing between capture sensors and the central scorer.
+
+Every frame starts with a fixed header followed by its payload:
+
+    magic "MITM" | version u8 | type u8 | reserved u16 | sequence u32 | payload length u32
+
+- HELLO:    payload is the sensor name (UTF-8)
+- BATCH:    payload is a u32 record count followed by fixed-width FEATURE_RECORDs
+- VERDICTS: one u8 per record of the batch with the same sequence number
+            (1 = malicious); doubles as the acknowledgement for that batch
+
+Only the standard library is used so sensors stay lightweight.
+"""
+
+import socket
+import struct
+from collections import namedtuple
+
+MAGIC = b"MITM"
+VERSION = 1
+
+HELLO = 1
+BATCH = 2
+VERDICTS = 3
+
+HEADER = struct.Struct("!4sBBHII")
+COUNT = struct.Struct("!I")
+
+# timestamp, src ip, dst ip, src port, dst port, proto, ttl, length, DF flag,
+# src packet rate, dst packet rate, src distinct ports, dst distinct ports
+FEATURE_RECORD = struct.Struct("!dIIHHBBHBffHH")
+
+MAX_PAYLOAD = 16 * 1024 * 1024
+
+FeatureRecord = namedtuple("FeatureRecord", [
+    "timestamp", "src_ip", "dst_ip", "src_port", "dst_port", "proto", "ttl", "length", "flags",
+    "src_rate", "dst_rate", "src_ports", "dst_ports"
+])
+
+# Positions of FEATURE_COLUMNS + HOST_RATE_COLUMNS within a FeatureRecord
+MODEL_FIELDS = ["src_port", "dst_port", "ttl", "length", "flags",
+                "src_rate", "dst_rate", "src_ports", "dst_ports"]
+
+
+class ProtocolError(Exception):
+    """Raised when a peer sends a malformed frame."""
+
+
+def _ip_to_int(ip):
+    return int.from_bytes(socket.inet_aton(ip), "big")
+
+
+def _int_to_ip(value):
+    return socket.inet_ntoa(value.to_bytes(4, "big"))
+
+
+def _record_fields(record):
+    return (record.timestamp, _ip_to_int(record.src_ip), _ip_to_int(record.dst_ip),
+            record.src_port, record.dst_port, record.proto, record.ttl, min(record.length, 0xFFFF),
+            record.flags, record.src_rate, record.dst_rate,
+            min(record.src_ports, 0xFFFF), min(record.dst_ports, 0xFFFF))
+
+
+def pack_record(record):
+    """Pack a FeatureRecord (with dotted IP strings) into its fixed-width form."""
+    return FEATURE_RECORD.pack(*_record_fields(record))
+
+
+def pack_record_into(buffer, offset, record):
+    """Pack a FeatureRecord directly into a writable buffer at offset."""
+    FEATURE_RECORD.pack_into(buffer, offset, *_record_fields(record))
+
+
+def unpack_records(payload):
+    """Decode a BATCH payload into a list of FeatureRecords."""
+    (count,) = COUNT.unpack_from(payload, 0)
+    if COUNT.size + count * FEATURE_RECORD.size != len(payload):
+        raise ProtocolError(f"Batch of {count} records has {len(payload)} bytes")
+    records = []
+    for fields in FEATURE_RECORD.iter_unpack(memoryview(payload)[COUNT.size:]):
+        fields = list(fields)
+        fields[1] = _int_to_ip(fields[1])
+        fields[2] = _int_to_ip(fields[2])
+        records.append(FeatureRecord(*fields))
+    return records
+
+
+def encode_frame(frame_type, sequence, payload=b""):
+    """Return header + payload bytes for one frame."""
+    return HEADER.pack(MAGIC, VERSION, frame_type, 0, sequence, len(payload)) + payload
+
+
+def encode_batch(sequence, packed_records):
+    """Return a BATCH frame for a list of already packed records."""
+    payload = COUNT.pack(len(packed_records)) + b"".join(packed_records)
+    return encode_frame(BATCH, sequence, payload)
+
+
+def _recv_exact(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise ConnectionError("Connection closed by peer")
+        received += n
+    return bytes(buffer)
+
+
+def read_frame(sock):
+    """Read one frame from a socket; returns (type, sequence, payload)."""
+    magic, version, frame_type, _, sequence, length = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ProtocolError(f"Bad frame header {magic!r} v{version}")
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"Frame payload too large: {length} bytes")
+    payload = _recv_exact(sock, length) if length else b""
+    return frame_type, sequence, payload
@@ -10,10 +10,13 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from utils.config import (
-    LABELED_DATA_PATH, FEATURE_COLUMNS, TARGET_COLUMN,
-    TEST_SIZE, RANDOM_STATE, LEGACY_MODEL_PATH, LEGACY_SCALER_PATH, MODEL_DIR
+    LABELED_DATA_PATH, FEATURE_COLUMNS, HOST_RATE_COLUMNS, TARGET_COLUMN, SAMPLE_WEIGHT_COLUMN,
+    TRAIN_SAMPLE_WEIGHTS, TEST_SIZE, RANDOM_STATE, LEGACY_MODEL_PATH, LEGACY_SCALER_PATH, MODEL_DIR,
+    TRAIN_AS_CANDIDATE, SHADOW_MODEL_PATH, SHADOW_SCALER_PATH, DRIFT_REFERENCE_PATH,
+    SHADOW_DRIFT_REFERENCE_PATH, DRIFT_HISTOGRAM_BINS
 )
 from utils.logger import log_info, log_error
+from utils.drift import build_reference, save_reference
 
 
 def train_model():
@@ -39,23 +42,39 @@ def train_model():
             log_error(f"Available columns: {df.columns.tolist()}")
             return False
         
+        # Captures from enhanced_packet.py also carry the per-host rate features;
+        # the detector picks up whichever columns the scaler was fitted on
+        feature_columns = list(FEATURE_COLUMNS)
+        if all(col in df.columns for col in HOST_RATE_COLUMNS):
+            feature_columns += HOST_RATE_COLUMNS
+        else:
+            log_info(f"Host rate columns not in the data, training without them: {HOST_RATE_COLUMNS}")
+        
         # Prepare features and target
-        X = df[FEATURE_COLUMNS]
+        X = df[feature_columns]
         y = df[TARGET_COLUMN]
         
+        # Rows from a stratified capture sample stand for (weight) captured packets each
+        if TRAIN_SAMPLE_WEIGHTS and SAMPLE_WEIGHT_COLUMN in df.columns:
+            weights = pd.to_numeric(df[SAMPLE_WEIGHT_COLUMN], errors='coerce').fillna(1.0)
+            log_info(f"Weighting rows by '{SAMPLE_WEIGHT_COLUMN}': {len(df)} sampled rows "
+                     f"represent {weights.sum():.0f} captured packets")
+        else:
+            weights = pd.Series(1.0, index=df.index)
+        
         log_info(f"Dataset shape: {df.shape}")
-        log_info(f"Features: {FEATURE_COLUMNS}")
+        log_info(f"Features: {feature_columns}")
         log_info(f"Target distribution:\n{y.value_counts()}")
         
         # Scale the features
         log_info("Scaling features...")
         scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
+        X_scaled = scaler.fit_transform(X, sample_weight=weights)
         
         # Split into train/test sets
         log_info(f"Splitting data: {int((1-TEST_SIZE)*100)}% train, {int(TEST_SIZE*100)}% test")
-        X_train, X_test, y_train, y_test = train_test_split(
-            X_scaled, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
+        X_train, X_test, y_train, y_test, w_train, w_test = train_test_split(
+            X_scaled, y, weights, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
         )
         
         log_info(f"Training set: {X_train.shape[0]} samples")
@@ -64,7 +83,7 @@ def train_model():
         # Train the Logistic Regression model
         log_info("Training Logistic Regression model...")
         log_reg = LogisticRegression(random_state=RANDOM_STATE, max_iter=1000)
-        log_reg.fit(X_train, y_train)
+        log_reg.fit(X_train, y_train, sample_weight=w_train)
         log_info("Model training completed!")
         
         # Predict on test set
@@ -72,28 +91,43 @@ def train_model():
         y_pred_log = log_reg.predict(X_test)
         
         # Evaluation metrics
-        accuracy = accuracy_score(y_test, y_pred_log)
+        accuracy = accuracy_score(y_test, y_pred_log, sample_weight=w_test)
         log_info("=" * 50)
         log_info("Model Evaluation Results")
         log_info("=" * 50)
         log_info(f"Accuracy: {accuracy:.4f}")
         log_info("\nClassification Report:")
-        log_info(classification_report(y_test, y_pred_log))
+        log_info(classification_report(y_test, y_pred_log, sample_weight=w_test))
         log_info("\nConfusion Matrix:")
-        log_info(str(confusion_matrix(y_test, y_pred_log)))
+        log_info(str(confusion_matrix(y_test, y_pred_log, sample_weight=w_test)))
         log_info("=" * 50)
         
         # Save the trained model and scaler
         MODEL_DIR.mkdir(exist_ok=True)
         
-        log_info(f"Saving model to: {LEGACY_MODEL_PATH}")
-        joblib.dump(log_reg, LEGACY_MODEL_PATH)
+        if TRAIN_AS_CANDIDATE:
+            # Candidates are evaluated in shadow mode before being promoted
+            model_path, scaler_path = SHADOW_MODEL_PATH, SHADOW_SCALER_PATH
+            reference_path = SHADOW_DRIFT_REFERENCE_PATH
+        else:
+            model_path, scaler_path = LEGACY_MODEL_PATH, LEGACY_SCALER_PATH
+            reference_path = DRIFT_REFERENCE_PATH
+        
+        log_info(f"Saving model to: {model_path}")
+        joblib.dump(log_reg, model_path)
+        
+        log_info(f"Saving scaler to: {scaler_path}")
+        joblib.dump(scaler, scaler_path)
         
-        log_info(f"Saving scaler to: {LEGACY_SCALER_PATH}")
-        joblib.dump(scaler, LEGACY_SCALER_PATH)
+        # Training feature histograms, compared with live traffic by the detector's drift monitor
+        log_info(f"Saving training feature histograms to: {reference_path}")
+        save_reference(reference_path, build_reference(X, feature_columns, DRIFT_HISTOGRAM_BINS, weights))
         
         log_info("Model and scaler saved successfully!")
-        log_info("Note: Run 'python convert_models.py' to convert to production format")
+        if TRAIN_AS_CANDIDATE:
+            log_info("Note: Run the detector with SHADOW_MODE=true to compare it with the production model")
+        else:
+            log_info("Note: Run 'python convert_models.py' to convert to production format")
         
         return True
         
@@ -1,56 +1,34 @@
-from scapy.all import sniff, IP, get_if_list
 from datetime import datetime
-import csv
 import sys
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from utils.config import NETWORK_INTERFACE, PACKET_FILTER, PACKET_LIMIT, CAPTURED_PACKETS_PATH
+from utils.config import (
+    PACKET_FILTER, PACKET_LIMIT, CAPTURED_PACKETS_PATH, CAPTURE_SAMPLE_SIZE, CAPTURE_REPORT_INTERVAL,
+    LABELING_RULES_PATH, FEATURE_COLUMNS
+)
 from utils.logger import log_info, log_error
+from src.Sniffing.capture_engine import CaptureEngine, CsvSink, get_network_interface
+from src.Sniffing.sampling import SampledCsvSink, load_sampling_rules
 
-captured_packets = []
+CAPTURED_CSV_COLUMNS = ["Timestamp", "Source IP", "Destination IP", "Protocol", "TTL", "Length"]
 
 
-def get_network_interface():
-    """Get network interface from config or detect automatically."""
-    if NETWORK_INTERFACE:
-        return NETWORK_INTERFACE
-    
-    # Try to auto-detect interface
-    interfaces = get_if_list()
-    if interfaces:
-        log_info(f"Available interfaces: {interfaces}")
-        # Prefer Ethernet interfaces
-        for iface in interfaces:
-            if 'eth' in iface.lower() or 'en' in iface.lower():
-                log_info(f"Auto-selected interface: {iface}")
-                return iface
-        # Fallback to first available
-        if interfaces:
-            log_info(f"Using first available interface: {interfaces[0]}")
-            return interfaces[0]
-    
-    log_error("No network interface found. Please set NETWORK_INTERFACE in config.py")
-    return None
+def captured_csv_row(record):
+    """Row for CAPTURED_CSV_COLUMNS."""
+    timestamp = datetime.fromtimestamp(record.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+    return [timestamp, record.src_ip, record.dst_ip, record.proto, record.ttl, record.length]
 
 
-def packet_callback(packet):
-    """Callback function to process each captured packet."""
-    try:
-        if IP in packet:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            src = packet[IP].src
-            dst = packet[IP].dst
-            proto = packet[IP].proto
-            ttl = packet[IP].ttl
-            length = len(packet)
-            
-            log_info(f"[{timestamp}] {src} → {dst} | Proto: {proto} | TTL: {ttl} | Len: {length}")
-            print(f"[{timestamp}] {src} → {dst} | Proto: {proto} | TTL: {ttl} | Len: {length}")
-            captured_packets.append([timestamp, src, dst, proto, ttl, length])
-    except Exception as e:
-        log_error(f"Error processing packet: {e}")
+def packet_row(record):
+    """Log a captured packet and return its CSV row."""
+    row = captured_csv_row(record)
+    timestamp, src, dst, proto, ttl, length = row
+    
+    log_info(f"[{timestamp}] {src} → {dst} | Proto: {proto} | TTL: {ttl} | Len: {length}")
+    print(f"[{timestamp}] {src} → {dst} | Proto: {proto} | TTL: {ttl} | Len: {length}")
+    return row
 
 
 def main():
@@ -64,31 +42,28 @@ def main():
     
     log_info(f"Using network interface: {iface}")
     log_info(f"Packet filter: {PACKET_FILTER}")
-    log_info(f"Packet limit: {PACKET_LIMIT}")
+    if CAPTURE_SAMPLE_SIZE:
+        log_info(f"Sampling mode: keeping a stratified sample of {CAPTURE_SAMPLE_SIZE} packets "
+                 "(Press Ctrl+C to stop)")
+    else:
+        log_info(f"Packet limit: {PACKET_LIMIT}")
+    log_info(f"Saving captured packets to: {CAPTURED_PACKETS_PATH}")
+    
+    if CAPTURE_SAMPLE_SIZE:
+        # Run until stopped; only the sample is kept, saved periodically and on exit
+        engine = CaptureEngine(iface, PACKET_FILTER, report_interval=CAPTURE_REPORT_INTERVAL)
+        csv_sink = SampledCsvSink(CAPTURED_PACKETS_PATH, CAPTURED_CSV_COLUMNS, captured_csv_row,
+                                  CAPTURE_SAMPLE_SIZE, load_sampling_rules(LABELING_RULES_PATH, FEATURE_COLUMNS),
+                                  save_interval=CAPTURE_REPORT_INTERVAL)
+    else:
+        engine = CaptureEngine(iface, PACKET_FILTER, count=PACKET_LIMIT)
+        csv_sink = CsvSink(CAPTURED_PACKETS_PATH, CAPTURED_CSV_COLUMNS, packet_row)
+    engine.register_sink("csv", csv_sink, on_close=csv_sink.close)
     
     try:
-        # Start sniffing
-        sniff(iface=iface, prn=packet_callback, filter=PACKET_FILTER, 
-              store=False, count=PACKET_LIMIT)
-        
-        # Save to CSV
-        log_info(f"Saving captured packets to: {CAPTURED_PACKETS_PATH}")
-        with open(CAPTURED_PACKETS_PATH, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(["Timestamp", "Source IP", "Destination IP", "Protocol", "TTL", "Length"])
-            writer.writerows(captured_packets)
-        
-        log_info(f"Successfully captured and saved {len(captured_packets)} packets")
-        
+        engine.run()
     except KeyboardInterrupt:
         log_info("Packet capture stopped by user")
-        if captured_packets:
-            log_info(f"Saving {len(captured_packets)} captured packets...")
-            with open(CAPTURED_PACKETS_PATH, "w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(["Timestamp", "Source IP", "Destination IP", "Protocol", "TTL", "Length"])
-                writer.writerows(captured_packets)
-            log_info(f"Saved to: {CAPTURED_PACKETS_PATH}")
     except PermissionError:
         log_error("Permission denied. Please run with administrator/root privileges.")
         sys.exit(1)
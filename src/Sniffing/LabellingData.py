@@ -4,26 +4,29 @@ from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from utils.config import CLEANED_DATA_PATH, LABELED_DATA_PATH, FEATURE_COLUMNS
+from utils.config import CLEANED_DATA_PATH, LABELED_DATA_PATH, FEATURE_COLUMNS, LABELING_RULES_PATH
 from utils.logger import log_info, log_error
+from utils.rule_engine import RuleSet
+
+_rule_set = None
+
+
+def get_rule_set():
+    """Load and compile the labeling rules from LABELING_RULES_PATH (cached)."""
+    global _rule_set
+    if _rule_set is None:
+        _rule_set = RuleSet.from_file(LABELING_RULES_PATH, FEATURE_COLUMNS)
+    return _rule_set
 
 
 def label_packet(row):
     """
     Labeling logic for MITM attack detection.
     Returns 0 for Normal, 1 for Suspicious/Attack.
+    The suspicious patterns are defined in config/labeling_rules.json.
     """
-    # Suspicious patterns:
-    # - High destination port (> 50000) - often used in attacks
-    # - Low TTL (< 30) - may indicate spoofing
-    # - Large packet length (> 1000) - potential data exfiltration
-    # - Flags == 0 - unusual flag combination
-    if (row['Destination Port'] > 50000 or
-        row['TTL'] < 30 or
-        row['Length'] > 1000 or
-        row['Flags'] == 0):
-        return 1  # Suspicious / Attack
-    return 0  # Normal
+    rule_set = get_rule_set()
+    return rule_set.label_packet([row[col] for col in rule_set.columns])
 
 
 def label_data():
@@ -64,8 +67,12 @@ def label_data():
             df['Flags'] = 0
         
         # Apply labeling logic
-        log_info("Applying labeling logic...")
-        df['Label'] = df.apply(label_packet, axis=1)
+        log_info(f"Applying labeling rules from: {LABELING_RULES_PATH}")
+        rule_set = get_rule_set()
+        selectivity = rule_set.calibrate(df)
+        for name, rate in selectivity.items():
+            log_info(f"Rule {name}: matches {rate:.1%} of packets")
+        df['Label'] = rule_set.label_frame(df)
         
         # Show label distribution
         label_counts = df['Label'].value_counts()
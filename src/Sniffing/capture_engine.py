@@ -0,0 +1,263 @@
+"""
+Shared capture engine.
+
+One sniffer dissects each packet once into a PacketRecord and fans it out to
+registered sinks (CSV writer, detector, ring buffer, ...). Every sink has its
+own bounded queue and worker thread, so a slow sink drops its own records
+instead of stalling capture or the other sinks. Per-sink throughput, drops
+and lag (time from capture to processing) are logged periodically and at exit.
+"""
+
+import csv
+import queue
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+from scapy.all import sniff, IP, TCP, UDP, get_if_list
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from utils.logger import log_info, log_error
+from utils.config import NETWORK_INTERFACE
+from utils.pcap import decode_frame, PROTO_TCP, PROTO_UDP
+
+# A dissected IPv4 packet. Ports are None for protocols without ports,
+# payload holds the UDP payload (for DNS inspection) and raw the original frame.
+PacketRecord = namedtuple("PacketRecord", [
+    "timestamp", "src_ip", "dst_ip", "proto", "src_port", "dst_port", "ttl", "length",
+    "flags", "df", "payload", "raw"
+])
+
+ENHANCED_CSV_COLUMNS = [
+    "Timestamp", "Source IP", "Destination IP", "Source Port",
+    "Destination Port", "Protocol", "TTL", "Length", "Flags"
+]
+
+_STOP = object()
+
+
+def get_network_interface():
+    """Get network interface from config or detect automatically."""
+    if NETWORK_INTERFACE:
+        return NETWORK_INTERFACE
+
+    # Try to auto-detect interface
+    interfaces = get_if_list()
+    if interfaces:
+        log_info(f"Available interfaces: {interfaces}")
+        # Prefer Ethernet interfaces
+        for iface in interfaces:
+            if 'eth' in iface.lower() or 'en' in iface.lower():
+                log_info(f"Auto-selected interface: {iface}")
+                return iface
+        # Fallback to first available
+        if interfaces:
+            log_info(f"Using first available interface: {interfaces[0]}")
+            return interfaces[0]
+
+    log_error("No network interface found. Please set NETWORK_INTERFACE in config.py")
+    return None
+
+
+def dissect(packet):
+    """Extract everything the sinks need from a scapy packet, or None for non-IP traffic."""
+    if IP not in packet:
+        return None
+    ip = packet[IP]
+    src_port = dst_port = None
+    payload = b""
+    if TCP in packet:
+        src_port, dst_port = packet[TCP].sport, packet[TCP].dport
+    elif UDP in packet:
+        udp = packet[UDP]
+        src_port, dst_port = udp.sport, udp.dport
+        payload = bytes(udp.payload)
+    flags = str(ip.flags)
+    raw = getattr(packet, "original", None) or bytes(packet)
+    return PacketRecord(float(packet.time), ip.src, ip.dst, ip.proto, src_port, dst_port,
+                        ip.ttl, len(packet), flags, 1 if 'DF' in flags else 0, payload, raw)
+
+
+def record_from_frame(timestamp, frame):
+    """Build a PacketRecord from a raw Ethernet frame (pcap replay), or None for non-IP traffic."""
+    packet = decode_frame(frame)
+    if packet is None:
+        return None
+    src_port = dst_port = None
+    payload = b""
+    if packet.proto in (PROTO_TCP, PROTO_UDP):
+        src_port, dst_port = packet.src_port, packet.dst_port
+        if packet.proto == PROTO_UDP:
+            payload = bytes(packet.payload)
+    return PacketRecord(timestamp, packet.src_ip, packet.dst_ip, packet.proto, src_port, dst_port,
+                        packet.ttl, packet.length, "DF" if packet.df else "", packet.df, payload,
+                        bytes(frame))
+
+
+def enhanced_csv_row(record):
+    """Row for ENHANCED_CSV_COLUMNS (the enhanced_packets.csv training format)."""
+    timestamp = datetime.fromtimestamp(record.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+    src_port = 'N/A' if record.src_port is None else record.src_port
+    dst_port = 'N/A' if record.dst_port is None else record.dst_port
+    return [timestamp, record.src_ip, record.dst_ip, src_port, dst_port,
+            record.proto, record.ttl, record.length, record.flags]
+
+
+def with_host_rates(row_fn, tracker):
+    """Extend row_fn's rows with the HOST_RATE_COLUMNS values of a HostRateTracker.
+
+    The tracker must see every captured packet in order, so wrap the row
+    function of a single sink rather than sharing one tracker between sinks.
+    """
+    def row(record):
+        return list(row_fn(record)) + tracker.update(record.src_ip, record.dst_ip,
+                                                     record.dst_port or 0, record.timestamp)
+    return row
+
+
+class CsvSink:
+    """Sink that appends one CSV row per record and flushes periodically."""
+
+    def __init__(self, path, columns, row_fn, flush_every=100):
+        self.path = Path(path)
+        self.file = open(self.path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+        self.row_fn = row_fn
+        self.flush_every = flush_every
+        self.rows = 0
+
+    def __call__(self, record):
+        self.writer.writerow(self.row_fn(record))
+        self.rows += 1
+        if self.rows % self.flush_every == 0:
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+        log_info(f"Saved {self.rows} packets to: {self.path}")
+
+
+class Sink:
+    """A registered consumer with its own bounded queue and worker thread."""
+
+    def __init__(self, name, handler, queue_size, on_close=None):
+        self.name = name
+        self.handler = handler
+        self.on_close = on_close
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = None
+        self.stats = {"processed": 0, "dropped": 0, "errors": 0,
+                      "lag_total": 0.0, "lag_max": 0.0, "busy_seconds": 0.0}
+
+    def offer(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"sink-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        if self.thread is None:
+            return
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+        self.thread = None
+        if self.on_close is not None:
+            try:
+                self.on_close()
+            except Exception as e:
+                log_error(f"Error closing sink {self.name}: {e}")
+
+    def _run(self):
+        stats = self.stats
+        while True:
+            record = self.queue.get()
+            if record is _STOP:
+                return
+            start = time.perf_counter()
+            lag = time.time() - record.timestamp
+            stats["lag_total"] += lag
+            if lag > stats["lag_max"]:
+                stats["lag_max"] = lag
+            try:
+                self.handler(record)
+            except Exception as e:
+                stats["errors"] += 1
+                log_error(f"Error in sink {self.name}: {e}")
+            stats["processed"] += 1
+            stats["busy_seconds"] += time.perf_counter() - start
+
+
+class CaptureEngine:
+    """Sniffs once and fans dissected records out to registered sinks."""
+
+    def __init__(self, iface, bpf_filter, count=0, report_interval=60.0):
+        self.iface = iface
+        self.bpf_filter = bpf_filter
+        self.count = count
+        self.report_interval = report_interval
+        self.sinks = []
+        self.captured = 0
+        self.started = None
+        self._stop_reports = threading.Event()
+
+    def register_sink(self, name, handler, queue_size=10000, on_close=None):
+        """Register handler(record) to receive every dissected packet on its own worker."""
+        sink = Sink(name, handler, queue_size, on_close)
+        self.sinks.append(sink)
+        return sink
+
+    def handle_packet(self, packet):
+        """sniff() callback: dissect once and enqueue for every sink."""
+        try:
+            record = dissect(packet)
+        except Exception as e:
+            log_error(f"Error dissecting packet: {e}")
+            return
+        if record is None:
+            return
+        self.captured += 1
+        for sink in self.sinks:
+            sink.offer(record)
+
+    def report(self):
+        """Log per-sink throughput, drops, lag and queue depth."""
+        elapsed = max(time.monotonic() - self.started, 1e-9) if self.started else 0.0
+        log_info(f"Capture engine: {self.captured} packets in {elapsed:.1f}s")
+        for sink in self.sinks:
+            stats = sink.stats
+            processed = stats["processed"]
+            rate = processed / elapsed if elapsed else 0.0
+            avg_lag = stats["lag_total"] / processed * 1000 if processed else 0.0
+            log_info(f"  sink {sink.name}: {processed} processed ({rate:.0f}/s), "
+                     f"{stats['dropped']} dropped, {stats['errors']} errors, "
+                     f"lag avg {avg_lag:.1f} ms / max {stats['lag_max'] * 1000:.1f} ms, "
+                     f"queue {sink.queue.qsize()}/{sink.queue.maxsize}")
+
+    def _report_loop(self):
+        while not self._stop_reports.wait(self.report_interval):
+            self.report()
+
+    def run(self):
+        """Capture until count packets, Ctrl+C or an error; sinks are drained and closed on exit."""
+        for sink in self.sinks:
+            sink.start()
+        self.started = time.monotonic()
+        reporter = threading.Thread(target=self._report_loop, name="capture-report", daemon=True)
+        reporter.start()
+        try:
+            sniff(iface=self.iface, prn=self.handle_packet, filter=self.bpf_filter,
+                  store=False, count=self.count)
+        finally:
+            self._stop_reports.set()
+            for sink in self.sinks:
+                sink.stop()
+            self.report()
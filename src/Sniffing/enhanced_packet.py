@@ -1,70 +1,34 @@
-from scapy.all import sniff, IP, TCP, UDP, get_if_list
-from datetime import datetime
-import csv
 import sys
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from utils.config import NETWORK_INTERFACE, PACKET_FILTER, PACKET_LIMIT, ENHANCED_PACKETS_PATH
+from utils.config import (
+    PACKET_FILTER, PACKET_LIMIT, ENHANCED_PACKETS_PATH, CAPTURE_SAMPLE_SIZE, CAPTURE_REPORT_INTERVAL,
+    LABELING_RULES_PATH, FEATURE_COLUMNS, HOST_RATE_COLUMNS, SKETCH_EPSILON, SKETCH_DELTA,
+    SKETCH_WINDOW_SECONDS, SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K
+)
 from utils.logger import log_info, log_error
+from src.Sniffing.capture_engine import (
+    CaptureEngine, CsvSink, ENHANCED_CSV_COLUMNS, enhanced_csv_row, get_network_interface,
+    with_host_rates
+)
+from src.Sniffing.sampling import SampledCsvSink, load_sampling_rules
+from src.Detection.heavy_hitters import HostRateTracker
 
-packet_data = []
+# Per-host rate features, computed the same way as in the real-time detector
+CSV_COLUMNS = ENHANCED_CSV_COLUMNS + HOST_RATE_COLUMNS
 
 
-def get_network_interface():
-    """Get network interface from config or detect automatically."""
-    if NETWORK_INTERFACE:
-        return NETWORK_INTERFACE
+def packet_row(record):
+    """Log a captured packet and return its enhanced CSV row."""
+    row = enhanced_csv_row(record)
+    timestamp, src_ip, dst_ip, src_port, dst_port, proto, ttl, length, flags = row
     
-    # Try to auto-detect interface
-    interfaces = get_if_list()
-    if interfaces:
-        log_info(f"Available interfaces: {interfaces}")
-        # Prefer Ethernet interfaces
-        for iface in interfaces:
-            if 'eth' in iface.lower() or 'en' in iface.lower():
-                log_info(f"Auto-selected interface: {iface}")
-                return iface
-        # Fallback to first available
-        if interfaces:
-            log_info(f"Using first available interface: {interfaces[0]}")
-            return interfaces[0]
-    
-    log_error("No network interface found. Please set NETWORK_INTERFACE in config.py")
-    return None
-
-
-def packet_callback(packet):
-    """Callback function to process each captured packet."""
-    try:
-        if IP in packet:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            src_ip = packet[IP].src
-            dst_ip = packet[IP].dst
-            proto = packet[IP].proto
-            ttl = packet[IP].ttl
-            length = len(packet)
-            flags = str(packet[IP].flags)  # e.g., DF, MF
-
-            # Default values
-            src_port = dst_port = 'N/A'
-            if TCP in packet:
-                src_port = packet[TCP].sport
-                dst_port = packet[TCP].dport
-            elif UDP in packet:
-                src_port = packet[UDP].sport
-                dst_port = packet[UDP].dport
-
-            # Log & store
-            log_info(f"[{timestamp}] {src_ip}:{src_port} → {dst_ip}:{dst_port} | Proto: {proto} | TTL: {ttl} | Len: {length} | Flags: {flags}")
-            print(f"[{timestamp}] {src_ip}:{src_port} → {dst_ip}:{dst_port} | Proto: {proto} | TTL: {ttl} | Len: {length} | Flags: {flags}")
-            packet_data.append([
-                timestamp, src_ip, dst_ip, src_port, dst_port,
-                proto, ttl, length, flags
-            ])
-    except Exception as e:
-        log_error(f"Error processing packet: {e}")
+    # Log & store
+    log_info(f"[{timestamp}] {src_ip}:{src_port} → {dst_ip}:{dst_port} | Proto: {proto} | TTL: {ttl} | Len: {length} | Flags: {flags}")
+    print(f"[{timestamp}] {src_ip}:{src_port} → {dst_ip}:{dst_port} | Proto: {proto} | TTL: {ttl} | Len: {length} | Flags: {flags}")
+    return row
 
 
 def main():
@@ -78,37 +42,31 @@ def main():
     
     log_info(f"Using network interface: {iface}")
     log_info(f"Packet filter: {PACKET_FILTER}")
-    log_info(f"Packet limit: {PACKET_LIMIT}")
+    if CAPTURE_SAMPLE_SIZE:
+        log_info(f"Sampling mode: keeping a stratified sample of {CAPTURE_SAMPLE_SIZE} packets")
+    else:
+        log_info(f"Packet limit: {PACKET_LIMIT}")
+    log_info(f"Saving captured packets to: {ENHANCED_PACKETS_PATH}")
     log_info("🚀 Capturing enhanced packet data (Press Ctrl+C to stop)...")
     
+    tracker = HostRateTracker(SKETCH_EPSILON, SKETCH_DELTA, SKETCH_WINDOW_SECONDS,
+                              SKETCH_WINDOW_BUCKETS, HEAVY_HITTER_K)
+    if CAPTURE_SAMPLE_SIZE:
+        # Run until stopped; rates are computed over every packet, not just the sample
+        engine = CaptureEngine(iface, PACKET_FILTER, report_interval=CAPTURE_REPORT_INTERVAL)
+        csv_sink = SampledCsvSink(ENHANCED_PACKETS_PATH, CSV_COLUMNS,
+                                  with_host_rates(enhanced_csv_row, tracker), CAPTURE_SAMPLE_SIZE,
+                                  load_sampling_rules(LABELING_RULES_PATH, FEATURE_COLUMNS),
+                                  save_interval=CAPTURE_REPORT_INTERVAL)
+    else:
+        engine = CaptureEngine(iface, PACKET_FILTER, count=PACKET_LIMIT + 1)
+        csv_sink = CsvSink(ENHANCED_PACKETS_PATH, CSV_COLUMNS, with_host_rates(packet_row, tracker))
+    engine.register_sink("csv", csv_sink, on_close=csv_sink.close)
+    
     try:
-        sniff(iface=iface, prn=packet_callback, filter=PACKET_FILTER, 
-              store=False, count=PACKET_LIMIT + 1)
-        
-        # Save to CSV
-        log_info(f"Saving captured packets to: {ENHANCED_PACKETS_PATH}")
-        with open(ENHANCED_PACKETS_PATH, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                "Timestamp", "Source IP", "Destination IP", "Source Port",
-                "Destination Port", "Protocol", "TTL", "Length", "Flags"
-            ])
-            writer.writerows(packet_data)
-        
-        log_info(f"Successfully captured and saved {len(packet_data)} packets")
-        
+        engine.run()
     except KeyboardInterrupt:
         log_info("Packet capture stopped by user")
-        if packet_data:
-            log_info(f"Saving {len(packet_data)} captured packets...")
-            with open(ENHANCED_PACKETS_PATH, "w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    "Timestamp", "Source IP", "Destination IP", "Source Port",
-                    "Destination Port", "Protocol", "TTL", "Length", "Flags"
-                ])
-                writer.writerows(packet_data)
-            log_info(f"Saved to: {ENHANCED_PACKETS_PATH}")
     except PermissionError:
         log_error("Permission denied. Please run with administrator/root privileges.")
         sys.exit(1)
@@ -0,0 +1,255 @@
+"""
+Parallel offline converter from archived pcaps to a training feature matrix.
+
+Each pcap is cut into byte ranges of roughly PCAP_CHUNK_BYTES. Every cut is
+moved forward to the next record boundary, found by checking that a chain of
+consecutive record headers is plausible. Worker processes mmap the file and
+parse the Ethernet/IPv4/TCP/UDP headers of their range straight from the raw
+bytes (no scapy). They return one typed array per column. The parent streams
+the columns, in input order, into a single uncompressed .npz (one .npy per
+column), so memory stays bounded by the number of ranges in flight.
+
+Columns: FEATURE_COLUMNS (same values the live detector extracts) plus
+Timestamp, Source IP / Destination IP (IPv4 as uint32) and Protocol. Length
+is the captured frame length (caplen), which is what len(packet) gives the
+live detector and decode_frame gives pcap replay. In a capture truncated by
+its snaplen it is the truncated size, not the original length on the wire.
+
+    python src/Sniffing/pcap_features.py archive/*.pcap -o datasets/pcap_features.npz
+"""
+
+import argparse
+import mmap
+import multiprocessing
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+from array import array
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from utils.config import PCAP_FEATURES_PATH, PCAP_CHUNK_BYTES, PCAP_WORKERS
+from utils.logger import log_info, log_error
+from utils.pcap import (
+    GLOBAL_HEADER, LINKTYPE_ETHERNET, ETH_P_IP, ETH_P_VLAN, PROTO_TCP, PROTO_UDP,
+    parse_global_header
+)
+
+# Output column -> array typecode; names match FEATURE_COLUMNS where they overlap
+COLUMNS = {
+    "Timestamp": "d",
+    "Source IP": "I",
+    "Destination IP": "I",
+    "Protocol": "B",
+    "Source Port": "H",
+    "Destination Port": "H",
+    "TTL": "B",
+    "Length": "I",
+    "Flags": "B",
+}
+_NPY_DESCR = {"d": "f8", "I": "u4", "H": "u2", "B": "u1"}
+
+# version/IHL, flags + fragment offset, TTL, protocol, source, destination
+_IPV4 = struct.Struct("!B5xHBB2xII")
+_FRAGMENT_OFFSET = 0x1FFF
+_PORTS = struct.Struct("!HH")
+_MAX_FRAME = 262144
+# Consecutive plausible headers required to accept a record boundary
+_CHAIN = 16
+_MAX_GAP_SECONDS = 366 * 86400
+
+
+def _plausible_chain(mm, pos, size, record, snaplen, divisor, first_seconds):
+    """True if _CHAIN record headers starting at pos look valid (or reach EOF exactly)."""
+    previous = first_seconds
+    for _ in range(_CHAIN):
+        if pos == size:
+            return True
+        if pos + record.size > size:
+            return False
+        seconds, fraction, caplen, length = record.unpack_from(mm, pos)
+        # Frames are at least an Ethernet header, and captures rarely span more than a year
+        if (fraction >= divisor or not 14 <= caplen <= snaplen or caplen > length or
+                length > _MAX_FRAME or abs(seconds - previous) > _MAX_GAP_SECONDS):
+            return False
+        previous = seconds
+        pos += record.size + caplen
+    return True
+
+
+def split_ranges(path, chunk_bytes):
+    """Return [(start, end)] byte ranges of whole records covering the pcap."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        record, divisor, linktype = parse_global_header(mm[:GLOBAL_HEADER.size])
+        if linktype != LINKTYPE_ETHERNET:
+            raise ValueError(f"{path}: only Ethernet captures are supported (linktype {linktype})")
+        snaplen = max(struct.unpack(record.format[0] + "I", mm[16:20])[0], 1)
+        size = len(mm)
+        if size < GLOBAL_HEADER.size + record.size:
+            return [(GLOBAL_HEADER.size, size)]
+        first_seconds = record.unpack_from(mm, GLOBAL_HEADER.size)[0]
+        starts = [GLOBAL_HEADER.size]
+        cut = GLOBAL_HEADER.size + chunk_bytes
+        while cut < size:
+            pos = cut
+            while pos < size and not _plausible_chain(mm, pos, size, record, snaplen,
+                                                      divisor, first_seconds):
+                pos += 1
+            if pos >= size:
+                break
+            starts.append(pos)
+            cut = pos + chunk_bytes
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def parse_range(task):
+    """Parse the records starting in [start, end) of one pcap; returns ({column: array}, stats)."""
+    path, start, end = task
+    columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+    timestamps, src_ips, dst_ips, protos = (columns["Timestamp"], columns["Source IP"],
+                                            columns["Destination IP"], columns["Protocol"])
+    src_ports, dst_ports, ttls, lengths, flags = (columns["Source Port"], columns["Destination Port"],
+                                                  columns["TTL"], columns["Length"], columns["Flags"])
+    skipped = 0
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        record, divisor, _ = parse_global_header(mm[:GLOBAL_HEADER.size])
+        unpack_record = record.unpack_from
+        unpack_ip = _IPV4.unpack_from
+        unpack_ports = _PORTS.unpack_from
+        header_size = record.size
+        size = len(mm)
+        pos = start
+        while pos < end and pos + header_size <= size:
+            seconds, fraction, caplen, _ = unpack_record(mm, pos)
+            frame = pos + header_size
+            pos = frame + caplen
+            if pos > size:
+                break
+            if caplen < 34:
+                skipped += 1
+                continue
+            ip = frame + 14
+            ethertype = (mm[frame + 12] << 8) | mm[frame + 13]
+            if ethertype == ETH_P_VLAN and caplen >= 18:
+                ethertype = (mm[frame + 16] << 8) | mm[frame + 17]
+                ip += 4
+            if ethertype != ETH_P_IP or ip + 20 > pos:
+                skipped += 1
+                continue
+            version_ihl, fragment, ttl, proto, src, dst = unpack_ip(mm, ip)
+            l4 = ip + (version_ihl & 0x0F) * 4
+            # Only the first fragment carries the L4 header; scapy leaves the rest portless too
+            if proto in (PROTO_TCP, PROTO_UDP) and not fragment & _FRAGMENT_OFFSET and l4 + 4 <= pos:
+                src_port, dst_port = unpack_ports(mm, l4)
+            else:
+                src_port = dst_port = 0
+            timestamps.append(seconds + fraction / divisor)
+            src_ips.append(src)
+            dst_ips.append(dst)
+            protos.append(proto)
+            src_ports.append(src_port)
+            dst_ports.append(dst_port)
+            ttls.append(ttl)
+            lengths.append(caplen)
+            flags.append(1 if fragment & 0x4000 else 0)
+    return columns, {"bytes": min(end, size) - start, "skipped": skipped}
+
+
+def _npy_header(typecode, count):
+    """Header of a little-endian 1-D .npy array (format version 1.0)."""
+    descr = ("<" if sys.byteorder == "little" else ">") + _NPY_DESCR[typecode]
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': ({count},), }}"
+    padding = 64 - (10 + len(header) + 1) % 64
+    header = (header + " " * padding + "\n").encode("latin1")
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header
+
+
+class NpzColumnWriter:
+    """Appends column chunks to temporary files and packs them into one .npz on close."""
+
+    def __init__(self, path, columns=COLUMNS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.columns = columns
+        self.tmpdir = tempfile.TemporaryDirectory(dir=self.path.parent, prefix=".pcap_features_")
+        self.files = {name: open(Path(self.tmpdir.name) / f"{index}.bin", "wb")
+                      for index, name in enumerate(columns)}
+        self.count = 0
+
+    def append(self, chunk):
+        for name, values in chunk.items():
+            values.tofile(self.files[name])
+        self.count += len(chunk["Timestamp"])
+
+    def close(self):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for name, typecode in self.columns.items():
+                column = self.files[name]
+                column.close()
+                with open(column.name, "rb") as source, \
+                        archive.open(f"{name}.npy", "w", force_zip64=True) as target:
+                    target.write(_npy_header(typecode, self.count))
+                    shutil.copyfileobj(source, target, 1024 * 1024)
+        os.replace(tmp, self.path)
+        self.tmpdir.cleanup()
+
+
+def convert(paths, output, workers=0, chunk_bytes=PCAP_CHUNK_BYTES):
+    """Convert pcaps into one columnar .npz; returns a stats dict including GB/s per core."""
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    tasks = [(str(path), begin, end) for path in paths for begin, end in split_ranges(path, chunk_bytes)]
+    writer = NpzColumnWriter(output)
+    stats = {"files": len(paths), "ranges": len(tasks), "bytes": 0, "packets": 0, "skipped": 0}
+    with multiprocessing.Pool(workers) as pool:
+        # imap keeps input order, so packets stay in capture order
+        for columns, range_stats in pool.imap(parse_range, tasks):
+            writer.append(columns)
+            stats["bytes"] += range_stats["bytes"]
+            stats["skipped"] += range_stats["skipped"]
+    writer.close()
+    stats["packets"] = writer.count
+    stats["seconds"] = time.perf_counter() - start
+    stats["workers"] = workers
+    stats["gb_per_second"] = stats["bytes"] / 1e9 / stats["seconds"]
+    stats["gb_per_second_per_core"] = stats["gb_per_second"] / workers
+    return stats
+
+
+def load_feature_matrix(path):
+    """Load a converted .npz as a DataFrame with FEATURE_COLUMNS and the metadata columns."""
+    import numpy as np
+    import pandas as pd
+
+    with np.load(path) as data:
+        return pd.DataFrame({name: data[name] for name in COLUMNS if name in data.files})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("pcaps", nargs="+", type=Path)
+    parser.add_argument("-o", "--output", type=Path, default=PCAP_FEATURES_PATH)
+    parser.add_argument("--workers", type=int, default=PCAP_WORKERS, help="0 = one per CPU")
+    parser.add_argument("--chunk-mb", type=float, default=PCAP_CHUNK_BYTES / (1024 * 1024))
+    args = parser.parse_args()
+
+    try:
+        stats = convert(args.pcaps, args.output, args.workers, int(args.chunk_mb * 1024 * 1024))
+    except (OSError, ValueError) as e:
+        log_error(f"Conversion failed: {e}")
+        sys.exit(1)
+    log_info(f"Converted {stats['packets']} packets from {stats['files']} pcaps "
+             f"({stats['bytes'] / 1e9:.2f} GB in {stats['ranges']} ranges, "
+             f"{stats['skipped']} non-IPv4 frames skipped) to {args.output}")
+    log_info(f"{stats['seconds']:.1f}s with {stats['workers']} workers: "
+             f"{stats['gb_per_second']:.3f} GB/s, {stats['gb_per_second_per_core']:.3f} GB/s per core")
+
+
+if __name__ == "__main__":
+    main()
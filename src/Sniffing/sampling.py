@@ -0,0 +1,160 @@
+"""
+Fixed-size, stratified packet sampling for long training captures.
+
+Every packet is assigned a stratum: protocol (tcp/udp/icmp/other) x
+destination port class x the class the labeling rules predict for it. Each
+stratum keeps a reservoir sample (Algorithm R). The total capacity is split
+evenly across the strata seen so far. When a new stratum appears, the existing
+reservoirs are randomly thinned to the smaller share, which keeps each one a
+uniform sample of its stratum. Memory is bounded by the capacity however long
+the capture runs, and rare suspicious strata get the same share as bulk
+traffic. Strata with fewer packets than their share keep all of them.
+
+Each kept packet's sample weight is (packets seen in its stratum) / (packets
+kept from it), the inverse of its inclusion probability. Traning.py uses it to
+correct for the stratification.
+"""
+
+import csv
+import os
+import random
+import time
+from pathlib import Path
+
+from utils.config import SAMPLE_WEIGHT_COLUMN
+from utils.logger import log_info, log_warning, log_error
+
+SAMPLE_COLUMNS = [SAMPLE_WEIGHT_COLUMN, "Stratum"]
+
+_PROTOCOLS = {6: "tcp", 17: "udp", 1: "icmp"}
+
+
+def port_class(port):
+    if not port:
+        return "none"
+    if port < 1024:
+        return "well_known"
+    if port < 49152:
+        return "registered"
+    return "dynamic"
+
+
+def stratum_key(record, rule_set=None):
+    """Stratum of a dissected packet: protocol / destination port class / predicted class."""
+    predicted = 0
+    if rule_set is not None:
+        predicted = rule_set.label_packet([record.src_port or 0, record.dst_port or 0,
+                                           record.ttl, record.length, record.df])
+    return f"{_PROTOCOLS.get(record.proto, 'other')}/{port_class(record.dst_port)}/{predicted}"
+
+
+def load_sampling_rules(path, columns):
+    """Labeling rules used for the predicted-class part of the stratum, or None."""
+    try:
+        from utils.rule_engine import RuleSet
+        return RuleSet.from_file(path, columns)
+    except Exception as e:
+        log_warning(f"Sampling without the predicted class: could not load labeling rules: {e}")
+        return None
+
+
+class StratifiedReservoir:
+    """Reservoir samples per stratum sharing one fixed capacity."""
+
+    def __init__(self, capacity, seed=None):
+        self.capacity = capacity
+        self.rng = random.Random(seed)
+        self.quota = capacity
+        self.reservoirs = {}
+        self.seen = {}
+
+    def offer(self, key, item):
+        """Consider one item of stratum key; returns True if it was kept."""
+        reservoir = self.reservoirs.get(key)
+        if reservoir is None:
+            reservoir = self.reservoirs[key] = []
+            self.seen[key] = 0
+            self._rebalance()
+        self.seen[key] += 1
+        # Below quota the reservoir still holds every item of its stratum
+        if len(reservoir) < self.quota:
+            reservoir.append(item)
+            return True
+        slot = self.rng.randrange(self.seen[key])
+        if slot < self.quota:
+            reservoir[slot] = item
+            return True
+        return False
+
+    def _rebalance(self):
+        self.quota = max(1, self.capacity // len(self.reservoirs))
+        for reservoir in self.reservoirs.values():
+            if len(reservoir) > self.quota:
+                # A uniform subset of a uniform sample is still uniform
+                reservoir[:] = self.rng.sample(reservoir, self.quota)
+
+    def weight(self, key):
+        """Packets represented by each kept item of the stratum."""
+        kept = len(self.reservoirs[key])
+        return self.seen[key] / kept if kept else 0.0
+
+    def items(self):
+        """Yield (key, item, weight) for every kept item."""
+        for key, reservoir in self.reservoirs.items():
+            weight = self.weight(key)
+            for item in reservoir:
+                yield key, item, weight
+
+    def __len__(self):
+        return sum(len(reservoir) for reservoir in self.reservoirs.values())
+
+
+class SampledCsvSink:
+    """Capture sink that keeps a stratified sample and writes it as CSV.
+
+    Rows get SAMPLE_COLUMNS appended and are written in capture order. With a
+    save_interval the CSV is also rewritten every save_interval seconds (to a
+    temporary file, then renamed), so a capture that is killed rather than
+    stopped with Ctrl+C still leaves the last saved sample behind.
+    """
+
+    def __init__(self, path, columns, row_fn, capacity, rule_set=None, seed=None, save_interval=None):
+        self.path = Path(path)
+        self.columns = list(columns) + SAMPLE_COLUMNS
+        self.row_fn = row_fn
+        self.rule_set = rule_set
+        self.reservoir = StratifiedReservoir(capacity, seed)
+        self.packets = 0
+        self.save_interval = save_interval
+        self.next_save = None if save_interval is None else time.monotonic() + save_interval
+
+    def __call__(self, record):
+        self.packets += 1
+        # Keep the compact CSV row, not the record with its raw frame
+        key = stratum_key(record, self.rule_set)
+        self.reservoir.offer(key, (self.packets, self.row_fn(record)))
+        if self.next_save is not None and time.monotonic() >= self.next_save:
+            try:
+                self.save()
+            except OSError as e:
+                log_error(f"Error saving sample to {self.path}: {e}")
+            self.next_save = time.monotonic() + self.save_interval
+
+    def save(self):
+        """Write the current sample, replacing the CSV atomically; returns the number of rows."""
+        rows = sorted(self.reservoir.items(), key=lambda entry: entry[1][0])
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.columns)
+            for key, (_, row), weight in rows:
+                writer.writerow(list(row) + [round(weight, 6), key])
+        os.replace(tmp, self.path)
+        return len(rows)
+
+    def close(self):
+        saved = self.save()
+        log_info(f"Saved a sample of {saved} of {self.packets} packets to: {self.path}")
+        for key in sorted(self.reservoir.reservoirs):
+            log_info(f"  {key}: kept {len(self.reservoir.reservoirs[key])} of "
+                     f"{self.reservoir.seen[key]} (weight {self.reservoir.weight(key):.2f})")
@@ -0,0 +1,41 @@
+## File: tests/test_alert_store.py
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.Detection.alert_store import AlertStore, connect, query_alerts
+
+
+def test_batched_writes_queries_and_retention(tmp_path):
+    db = tmp_path / "alerts.db"
+    now = time.time()
+    store = AlertStore(db, batch_size=100, flush_interval=0.05, retention_seconds=3600).start()
+    for i in range(1000):
+        store.record(now - 7200 + i * 7.2, f"10.0.0.{i % 10}", "10.0.1.1", 4000 + i, 80,
+                     "model", i % 2 == 0)
+    store.close()
+    assert store.stats["written"] == 1000 and store.stats["dropped"] == 0
+
+    # The writer's first retention pass ran before these rows arrived
+    conn = connect(db)
+    store.prune(conn, now)
+    conn.close()
+
+    rows = query_alerts(db, ip="10.0.0.2", since=now - 1800, malicious_only=True)
+    assert rows and all(row["src_ip"] == "10.0.0.2" and row["malicious"] == 1 for row in rows)
+    assert all(row["ts"] >= now - 1800 for row in rows)
+    assert not query_alerts(db, until=now - 3600)
+    assert connect(db).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_close_does_not_hang_when_the_writer_died_with_a_full_queue(tmp_path):
+    store = AlertStore(tmp_path / "missing" / "alerts.db", max_queue=5).start()
+    store.thread.join(5)
+    for i in range(8):
+        store.record(float(i), "10.0.0.1", "10.0.0.2", 1, 2, "model", True)
+    start = time.monotonic()
+    store.close(timeout=1.0)
+    assert time.monotonic() - start < 1.0
+    assert store.stats["written"] == 0
+    assert store.stats["dropped"] == 8
@@ -0,0 +1,96 @@
+import json
+import socket
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.Detection.alert_stream import AlertStream, parse_filter
+
+
+def connect(stream, spec, rcvbuf=None):
+    sock = socket.socket()
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.connect(stream.address)
+    sock.sendall((json.dumps(spec) + "\n").encode())
+    reader = sock.makefile("r", encoding="utf-8")
+    assert "subscribed" in json.loads(reader.readline())
+    return sock, reader
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_fan_out_to_hundreds_of_filtered_subscribers():
+    stream = AlertStream("127.0.0.1", 0).start()
+    specs = [{}, {"malicious_only": True}, {"ips": ["10.0.0.3"]}, {"kinds": ["dns_spoofed"]},
+             {"ips": ["10.0.0.3", "10.0.1.1"], "malicious_only": True}]
+    clients = [(spec, *connect(stream, spec)) for spec in specs * 40]
+    wait_for(lambda: len(stream.subscribers) == len(clients))
+
+    events = [(1000.0 + i, f"10.0.0.{i % 5}", "10.0.0.3" if i % 11 == 0 else "10.0.1.1", 40000 + i, 443,
+               "dns_spoofed" if i % 7 == 0 else "model", i % 3 == 0, f"event {i}") for i in range(60)]
+    for event in events:
+        stream.publish(*event)
+    for spec, sock, reader in clients:
+        malicious_only, ips, kinds = parse_filter(json.dumps(spec))
+        expected = [event[7] for event in events
+                    if (event[6] or not malicious_only)
+                    and (ips is None or event[1] in ips or event[2] in ips)
+                    and (kinds is None or event[5] in kinds)]
+        received = [json.loads(reader.readline())["detail"] for _ in expected]
+        assert received == expected
+    assert stream.stats["published"] == 60 and stream.stats["dropped"] == 0
+    for _, sock, _ in clients:
+        sock.close()
+    stream.close()
+
+
+def test_slow_subscriber_is_dropped_without_blocking_publish():
+    stream = AlertStream("127.0.0.1", 0, client_buffer=16384).start()
+    stalled, _ = connect(stream, {}, rcvbuf=4096)
+    wait_for(lambda: len(stream.subscribers) == 1)
+    start = time.perf_counter()
+    for i in range(5000):
+        stream.publish(float(i), "10.0.0.1", "10.0.0.2", 1, 2, "model", True, "x" * 500)
+    assert time.perf_counter() - start < 1.0
+    wait_for(lambda: stream.stats["slow_disconnects"] == 1)
+    assert not stream.subscribers
+
+    # Others can still subscribe and receive
+    sock, reader = connect(stream, {"malicious_only": True})
+    wait_for(lambda: len(stream.subscribers) == 1)
+    stream.publish(1.0, "10.0.0.1", "10.0.0.2", 1, 2, "model", True, "after")
+    assert json.loads(reader.readline())["detail"] == "after"
+    sock.close()
+    stalled.close()
+    stream.close()
+
+
+@pytest.mark.parametrize("spec", [
+    {"kinds": 5}, {"ips": "10.0.0.5"}, {"ips": ["10.0.0.999"]}, {"ips": [5]},
+    {"kinds": ["model", None]}, {"malicious_only": "yes"}, {"port": 80}, [1, 2],
+])
+def test_malformed_filters_are_rejected_with_an_error_reply(spec):
+    with pytest.raises(ValueError):
+        parse_filter(json.dumps(spec))
+
+    stream = AlertStream("127.0.0.1", 0).start()
+    with socket.create_connection(stream.address) as sock:
+        sock.sendall((json.dumps(spec) + "\n").encode())
+        reply = json.loads(sock.makefile("r", encoding="utf-8").readline())
+    assert reply["error"].startswith("bad subscription")
+    assert stream.stats["rejected"] == 1 and not stream.subscribers
+    stream.close()
+
+
+def test_filter_normalizes_addresses():
+    assert parse_filter('{"ips": ["10.0.0.5"], "kinds": []}') == (False, frozenset({"10.0.0.5"}), None)
+    assert parse_filter("") == (False, None, None)
@@ -0,0 +1,70 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("scapy")
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.Detection.heavy_hitters import HostRateTracker
+from src.Sniffing.capture_engine import PacketRecord, Sink, enhanced_csv_row, with_host_rates
+
+
+def make_record(timestamp, src_ip, dst_ip, dst_port):
+    return PacketRecord(timestamp, src_ip, dst_ip, 6, 40000, dst_port, 64, 60, "DF", 1, b"", b"")
+
+
+def test_host_rate_columns_match_the_detector_features():
+    """CSV rows carry the same host rate values the detector computes for the packet."""
+    row_fn = with_host_rates(enhanced_csv_row, HostRateTracker(0.001, 0.01, 60, 6, 5))
+    detector = HostRateTracker(0.001, 0.01, 60, 6, 5)
+    for port in range(50):
+        record = make_record(100.0 + port * 0.1, "10.0.0.66", "10.0.0.1", port)
+        row = row_fn(record)
+        expected = detector.update(record.src_ip, record.dst_ip, port, record.timestamp)
+    assert row[:9] == enhanced_csv_row(record)
+    assert row[9:] == expected
+    assert row[9] == 50 / 60
+
+
+def test_blocked_sink_drops_and_counts_instead_of_stalling_capture():
+    entered, release = threading.Event(), threading.Event()
+    handled = []
+
+    def blocking(record):
+        entered.set()
+        release.wait(10)
+        handled.append(record)
+
+    slow, fast = Sink("slow", blocking, queue_size=2), Sink("fast", handled.append, queue_size=100)
+    slow.start()
+    fast.start()
+    slow.offer(make_record(time.time(), "10.0.0.1", "10.0.0.2", 0))
+    assert entered.wait(10)
+    start = time.perf_counter()
+    for port in range(1, 11):
+        record = make_record(time.time(), "10.0.0.1", "10.0.0.2", port)
+        slow.offer(record)
+        fast.offer(record)
+    assert time.perf_counter() - start < 1.0
+    # One record is in the handler and two fill the queue; the rest are dropped
+    assert slow.stats["dropped"] == 8
+    fast.stop(10)
+    assert fast.stats["processed"] == 10 and fast.stats["dropped"] == 0
+    release.set()
+    slow.stop(10)
+    assert slow.stats["processed"] == 3
+
+
+def test_stop_drains_the_queue_before_on_close():
+    events = []
+    sink = Sink("drain", lambda record: (time.sleep(0.01), events.append(record.dst_port)),
+                queue_size=50, on_close=lambda: events.append("closed"))
+    for port in range(20):
+        sink.offer(make_record(time.time(), "10.0.0.1", "10.0.0.2", port))
+    sink.start()
+    sink.stop(10)
+    assert events == list(range(20)) + ["closed"]
+    assert sink.stats["processed"] == 20 and sink.stats["dropped"] == 0
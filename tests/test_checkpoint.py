@@ -0,0 +1,87 @@
+import marshal
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.Detection.checkpoint import Checkpointer
+from src.Detection.heavy_hitters import HostRateTracker
+from src.Detection.dns_monitor import DnsMonitor, build_dns_query, build_dns_response
+
+
+def make_state():
+    return HostRateTracker(0.01, 0.01, 60, 6, 5), DnsMonitor(5, 1000, 10, 604800, 5, 100)
+
+
+def checkpointer_for(directory, tracker, monitor):
+    checkpointer = Checkpointer(directory, interval=3600)
+    checkpointer.register("host_rates", tracker, lambda: tracker.packets)
+    checkpointer.register("dns_monitor", monitor, lambda: monitor.stats["queries"])
+    return checkpointer
+
+
+def test_warm_restart_restores_rates_and_pending_queries(tmp_path):
+    tracker, monitor = make_state()
+    for i in range(500):
+        tracker.update(f"10.0.0.{i % 5}", "10.0.1.1", 1000 + i, 100.0 + i * 0.01)
+    monitor.observe(104.0, "10.0.0.1", "9.9.9.9", 40000, 53, 64, build_dns_query(7, "bank.example"))
+    checkpointer = checkpointer_for(tmp_path, tracker, monitor).start()
+    checkpointer.close()
+    assert checkpointer.stats["files_written"] == 2
+
+    restored_tracker, restored_monitor = make_state()
+    timings = checkpointer_for(tmp_path, restored_tracker, restored_monitor).restore()
+    assert set(timings) == {"host_rates", "dns_monitor"}
+    assert restored_tracker.heavy_hitters() == tracker.heavy_hitters()
+    assert (restored_tracker.update("10.0.0.1", "10.0.1.1", 80, 105.5) ==
+            tracker.update("10.0.0.1", "10.0.1.1", 80, 105.5))
+    # The query sent before the restart still matches its answer
+    answer = build_dns_response(7, "bank.example", ["93.184.216.34"])
+    assert restored_monitor.observe(104.1, "9.9.9.9", "10.0.0.1", 53, 40000, 52, answer) == []
+
+
+def test_unchanged_components_are_not_rewritten(tmp_path):
+    tracker, monitor = make_state()
+    checkpointer = checkpointer_for(tmp_path, tracker, monitor).start()
+    checkpointer.capture(block=True)
+    tracker.update("10.0.0.1", "10.0.0.2", 80, 1.0)
+    checkpointer.close()
+    assert checkpointer.stats["files_written"] == 3 and checkpointer.stats["unchanged"] == 1
+
+
+def test_corrupt_or_mismatched_checkpoint_starts_cold(tmp_path):
+    tracker, monitor = make_state()
+    tracker.update("10.0.0.1", "10.0.0.2", 80, 1.0)
+    checkpointer_for(tmp_path, tracker, monitor).start().close()
+    (tmp_path / "dns_monitor.ckpt").write_bytes(b"garbage")
+
+    other = HostRateTracker(0.001, 0.01, 60, 6, 5)
+    fresh_monitor = DnsMonitor(5, 1000, 10, 604800, 5, 100)
+    assert checkpointer_for(tmp_path, other, fresh_monitor).restore() == {}
+    assert other.packets == 0 and not other.heavy_hitters()["sources"]
+
+
+def test_failed_restore_leaves_state_unchanged():
+    """A truncated blob or a bad part fails before any sketch or table is replaced."""
+    source, _ = make_state()
+    for i in range(300):
+        source.update(f"10.0.0.{i % 7}", "10.0.1.1", 1000 + i, 100.0 + i * 0.01)
+    blob = source.snapshot()
+
+    tracker, monitor = make_state()
+    for i in range(50):
+        tracker.update("10.0.2.1", "10.0.2.2", 80, 200.0 + i)
+    before = tracker.snapshot()
+    # blob[:-3] only damages the last heavy-hitter list, after every sketch parsed fine
+    for bad in (blob[:len(blob) // 2], blob[:-3], blob + b"\0", b""):
+        with pytest.raises(ValueError):
+            tracker.restore(bad)
+        assert tracker.snapshot() == before
+
+    monitor.observe(104.0, "10.0.0.1", "9.9.9.9", 40000, 53, 64, build_dns_query(7, "bank.example"))
+    pending = dict(monitor.pending)
+    for bad in (marshal.dumps(([], [], [], "stats")), marshal.dumps(([], 5, [], {})), b"\xff"):
+        with pytest.raises(ValueError):
+            monitor.restore(bad)
+        assert dict(monitor.pending) == pending
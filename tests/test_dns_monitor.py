@@ -0,0 +1,79 @@
+## File: tests/test_dns_monitor.py
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.pcap import write_pcap, read_pcap, decode_frame, build_ipv4_frame, build_udp, PROTO_UDP
+from src.Detection.dns_monitor import (
+    DnsMonitor, parse_dns, build_dns_query, build_dns_response
+)
+
+CLIENT = "192.168.1.10"
+RESOLVER = "192.168.1.1"
+
+
+def query(ts, txid, name, port=40000):
+    payload = build_dns_query(txid, name)
+    return ts, build_ipv4_frame(CLIENT, RESOLVER, PROTO_UDP, build_udp(port, 53, payload))
+
+
+def answer(ts, txid, name, addresses, ttl=64, record_ttl=300, port=40000):
+    payload = build_dns_response(txid, name, addresses, ttl=record_ttl)
+    return ts, build_ipv4_frame(RESOLVER, CLIENT, PROTO_UDP, build_udp(53, port, payload), ttl=ttl)
+
+
+def replay(path, monitor=None):
+    """Feed a pcap trace through a DnsMonitor and return the alert kinds."""
+    monitor = monitor or DnsMonitor(5, 1000, 10, 604800, 5, 100)
+    kinds = []
+    for ts, frame in read_pcap(path):
+        pkt = decode_frame(frame)
+        alerts = monitor.observe(ts, pkt.src_ip, pkt.dst_ip, pkt.src_port, pkt.dst_port,
+                                 pkt.ttl, pkt.payload)
+        kinds.extend(alert.kind for alert in alerts)
+    return kinds
+
+
+def test_parse_response():
+    message = parse_dns(build_dns_response(0x1234, "Example.COM", ["93.184.216.34"], ttl=120))
+    assert message.txid == 0x1234 and message.is_response
+    assert message.qname == "example.com"
+    assert message.answers == [(1, 120, "93.184.216.34")]
+    assert parse_dns(b"\x00\x01garbage") is None
+
+
+def test_clean_trace_has_no_alerts(tmp_path):
+    trace = tmp_path / "clean.pcap"
+    write_pcap(trace, [
+        query(1.0, 1, "example.com"), answer(1.02, 1, "example.com", ["93.184.216.34"]),
+        query(2.0, 2, "example.org", port=40001),
+        answer(2.03, 2, "example.org", ["93.184.216.35"], port=40001),
+    ])
+    assert replay(trace) == []
+
+
+def test_spoofed_race_trace(tmp_path):
+    """Attacker answers first from a different hop distance; real answer conflicts."""
+    trace = tmp_path / "spoofed.pcap"
+    write_pcap(trace, [
+        query(1.0, 1, "example.com"), answer(1.02, 1, "example.com", ["93.184.216.34"]),
+        query(2.0, 7, "bank.example"),
+        answer(2.001, 7, "bank.example", ["10.6.6.6"], ttl=128, record_ttl=0),
+        answer(2.05, 7, "bank.example", ["203.0.113.5"]),
+        answer(3.0, 99, "mail.example", ["10.6.6.6"]),
+    ])
+    kinds = replay(trace)
+    assert "answer_ttl_anomaly" in kinds
+    assert "ip_ttl_anomaly" in kinds
+    assert "conflicting_answer" in kinds
+    assert kinds[-1] == "unsolicited_answer"
+
+
+def test_pending_table_is_bounded(tmp_path):
+    monitor = DnsMonitor(5, 100, 10, 604800, 5, 100)
+    trace = tmp_path / "flood.pcap"
+    write_pcap(trace, [query(1.0 + i * 1e-4, i, f"h{i}.example", port=1024 + i)
+                       for i in range(1000)])
+    replay(trace, monitor)
+    assert len(monitor.pending) == 100
+    assert monitor.stats["evicted"] == 900
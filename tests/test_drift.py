@@ -0,0 +1,76 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.drift import DriftMonitor, build_reference, histogram, psi
+
+COLUMNS = ["Destination Port", "TTL", "Length"]
+
+
+def training_frame(rng, rows=20000):
+    return pd.DataFrame({
+        "Destination Port": rng.choice([53, 80, 443, 8080], size=rows, p=[0.2, 0.2, 0.5, 0.1]),
+        "TTL": rng.choice([64, 128], size=rows),
+        "Length": rng.normal(600, 150, size=rows).clip(60, 1500),
+    })
+
+
+def monitor_for(train, **kwargs):
+    reference = build_reference(train, COLUMNS, bins=10)
+    return DriftMonitor(COLUMNS, train[COLUMNS].mean().to_numpy(), train[COLUMNS].var(ddof=0).to_numpy(),
+                        reference, window_seconds=60, buckets=6, batch_size=100, min_samples=500, **kwargs)
+
+
+def test_reference_histogram_sums_to_one():
+    train = training_frame(np.random.default_rng(1))
+    reference = build_reference(train, COLUMNS, bins=10)
+    for column in COLUMNS:
+        feature = reference["features"][column]
+        assert len(feature["proportions"]) == len(feature["edges"]) + 1
+        assert sum(feature["proportions"]) == pytest.approx(1.0)
+    assert psi(feature["proportions"], feature["proportions"]) == pytest.approx(0.0)
+    assert histogram(np.array([1.0, 2.0, 3.0]), np.array([2.0])).tolist() == [1, 2]
+
+
+def test_batched_window_statistics_match_numpy():
+    rng = np.random.default_rng(2)
+    rows = rng.normal([1000, 64, 500], [300, 10, 200], size=(3000, 3))
+    monitor = DriftMonitor(COLUMNS, [0, 0, 0], [1, 1, 1], window_seconds=60, buckets=6, batch_size=128)
+    for i, row in enumerate(rows):
+        monitor.add(row.tolist(), 1000.0 + i * 0.01)
+    monitor.flush()
+    count, mean, var = monitor.window()
+    assert count == len(rows)
+    assert np.allclose(mean, rows.mean(axis=0))
+    assert np.allclose(var, rows.var(axis=0))
+
+
+def test_drift_is_signalled_and_clears_when_window_slides():
+    rng = np.random.default_rng(3)
+    train = training_frame(rng)
+    monitor = monitor_for(train)
+
+    reports = [monitor.add(row, 0.0 + i * 0.001)
+               for i, row in enumerate(training_frame(rng, 2000)[COLUMNS].values.tolist())]
+    assert [r for r in reports if r is not None and r["drifting"]] == []
+
+    # Scan traffic: high ports, a new TTL and tiny packets
+    shifted = pd.DataFrame({"Destination Port": rng.integers(1024, 65535, size=6000),
+                            "TTL": np.full(6000, 255), "Length": np.full(6000, 60)})
+    reports = [monitor.add(row, 30.0 + i * 0.001) for i, row in enumerate(shifted[COLUMNS].values.tolist())]
+    assert any(r is not None and r["changed"] and r["drifting"] for r in reports)
+    final = [r for r in reports if r is not None][-1]
+    assert set(final["drifting"]) == set(COLUMNS)
+    assert final["features"]["TTL"]["psi"] > 0.25 and final["features"]["Length"]["psi"] > 0.25
+    assert monitor.stats["signals"] == 1
+
+    # Normal traffic again, long after the scan has left the window
+    reports = [monitor.add(row, 200.0 + i * 0.001)
+               for i, row in enumerate(training_frame(rng, 2000)[COLUMNS].values.tolist())]
+    final = [r for r in reports if r is not None][-1]
+    assert final["drifting"] == []
@@ -0,0 +1,60 @@
+## File: tests/test_heavy_hitters.py
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.Detection.heavy_hitters import HostRateTracker, WindowedCountMinSketch
+
+
+def test_count_min_error_bound():
+    """Estimates never undercount and stay within epsilon * N."""
+    sketch = WindowedCountMinSketch(0.01, 0.01, 60, 6)
+    for key in range(2000):
+        sketch.add(key, 100.0, count=1 + key % 3)
+    total = sum(1 + key % 3 for key in range(2000))
+    for key in range(0, 2000, 97):
+        estimate = sketch.estimate(key)
+        assert 1 + key % 3 <= estimate <= 1 + key % 3 + 0.01 * total
+
+
+def test_window_expiry():
+    """Counts drop out once the sliding window has passed."""
+    sketch = WindowedCountMinSketch(0.01, 0.01, 60, 6)
+    for i in range(50):
+        sketch.add(7, 100.0 + i * 0.1)
+    assert sketch.estimate(7) == 50
+    sketch.add(8, 200.0)
+    assert sketch.estimate(7) == 0
+
+
+def test_host_rate_features_and_heavy_hitters():
+    """A scanning host shows a high rate, many distinct ports and tops the list."""
+    tracker = HostRateTracker(0.001, 0.01, 60, 6, 5)
+    for port in range(200):
+        features = tracker.update("10.0.0.66", "10.0.0.1", port, 100.0 + port * 0.01)
+    for i in range(20):
+        tracker.update(f"10.0.1.{i}", "10.0.0.1", 443, 105.0)
+    assert features[0] == 200 / 60
+    assert features[2] > 100
+    assert tracker.heavy_hitters(1)["sources"][0] == ("10.0.0.66", 200)
+
+
+def test_heavy_hitters_follow_the_window():
+    """Hosts whose traffic expired are replaced by the current heavy hitters."""
+    tracker = HostRateTracker(0.001, 0.01, 60, 6, 2)
+    for host in ("10.0.0.1", "10.0.0.2"):
+        for i in range(1000):
+            tracker.update(host, "10.0.1.1", 443, 100.0 + i * 0.001)
+    for i in range(500):
+        tracker.update("10.0.0.3", "10.0.1.1", 443, 4000.0 + i * 0.001)
+    assert tracker.heavy_hitters()["sources"] == [("10.0.0.3", 500)]
+
+    # Partly overlapping window: the loud host at t=100 has expired by t=165, the one at t=150 has not
+    tracker = HostRateTracker(0.001, 0.01, 60, 6, 2)
+    for i in range(1000):
+        tracker.update("10.0.0.1", "10.0.1.1", 443, 100.0)
+    for i in range(100):
+        tracker.update("10.0.0.2", "10.0.1.1", 443, 150.0)
+    for i in range(200):
+        tracker.update("10.0.0.3", "10.0.1.1", 443, 165.0)
+    assert tracker.heavy_hitters()["sources"] == [("10.0.0.3", 200), ("10.0.0.2", 100)]
@@ -0,0 +1,93 @@
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.Detection.packet_ring import ForensicDumper, PacketRing, flow_key
+from utils.pcap import read_pcap
+
+
+def frame(i, size=100):
+    return i.to_bytes(4, "big") + bytes(size - 4)
+
+
+def test_wraparound_evicts_oldest_frames_only():
+    """Frames stay in arrival order across wraps; only the oldest are evicted."""
+    ring = PacketRing(1000, 50)
+    for i in range(25):
+        ring.add(float(i), frame(i), 1)
+    kept = [int.from_bytes(data[:4], "big") for _, data in ring.frames()]
+    # 1000 bytes hold ten 100-byte frames
+    assert kept == list(range(15, 25))
+    assert ring.stats["evicted"] == 15
+    assert [ts for ts, _ in ring.snapshot()] == [float(i) for i in range(15, 25)]
+
+
+def test_frame_slots_bound_the_ring():
+    ring = PacketRing(100000, 8)
+    for i in range(20):
+        ring.add(float(i), frame(i, 60), i % 2)
+    assert ring.count == 8
+    assert [ts for ts, _ in ring.snapshot()] == [float(i) for i in range(12, 20)]
+    assert [ts for ts, _ in ring.snapshot(flow=1)] == [13.0, 15.0, 17.0, 19.0]
+
+
+def test_uneven_frames_never_return_overwritten_bytes():
+    ring = PacketRing(1024, 1000)
+    sizes = [60, 1500, 300, 700, 90, 1000, 64, 512] * 20
+    for i, size in enumerate(sizes):
+        ring.add(float(i), frame(i, max(size, 4)), 0)
+    snapshot = ring.snapshot()
+    assert ring.stats["oversized"] == 20
+    assert snapshot[-1][0] == float(len(sizes) - 1)
+    for ts, data in snapshot:
+        assert int.from_bytes(data[:4], "big") == int(ts)
+    assert sum(len(data) for _, data in snapshot) <= 1024
+
+
+def test_dump_holds_the_flow_within_the_pre_and_post_window(tmp_path):
+    ring = PacketRing(1 << 20, 1000)
+    alert_flow = flow_key("10.0.0.5", "10.0.0.1", 6, 40000, 80)
+    other_flow = flow_key("10.0.0.6", "10.0.0.1", 6, 40001, 80)
+    for i in range(100):
+        ring.add(1000.0 + i, frame(i), alert_flow if i % 2 == 0 else other_flow)
+    dumper = ForensicDumper(ring, tmp_path, pre_seconds=10, post_seconds=5)
+    dumper.output_dir.mkdir(parents=True, exist_ok=True)
+    dumper._write(alert_flow, 1050.0, "10.0.0.5_10.0.0.1")
+
+    (path,) = tmp_path.glob("*.pcap")
+    assert f"{alert_flow & 0xFFFFFFFFFFFFFFFF:016x}" in path.name
+    dumped = list(read_pcap(path))
+    assert [ts for ts, _ in dumped] == [1040.0 + i for i in range(0, 16, 2)]
+    assert [int.from_bytes(data[:4], "big") for _, data in dumped] == list(range(40, 56, 2))
+
+
+def test_dumps_in_the_same_second_never_overwrite_each_other(tmp_path):
+    """A port scan raises alerts for many flows between one host pair within a second."""
+    ring = PacketRing(1 << 20, 1000)
+    flows = [flow_key("10.0.0.66", "10.0.0.1", 6, 40000, port) for port in range(20, 30)]
+    for i, flow in enumerate(flows):
+        ring.add(1000.0 + i / 100, frame(i), flow)
+    dumper = ForensicDumper(ring, tmp_path, pre_seconds=1, post_seconds=1)
+    dumper.output_dir.mkdir(parents=True, exist_ok=True)
+    for flow in flows:
+        dumper._write(flow, 1000.0, "10.0.0.66_10.0.0.1")
+    # Same flow and second again: a counter is added instead of overwriting
+    dumper._write(flows[0], 1000.0, "10.0.0.66_10.0.0.1")
+    assert len(list(tmp_path.glob("*.pcap"))) == 11
+    assert dumper.stats["written"] == 11
+
+
+def test_flow_key_is_direction_independent_and_stable_across_processes():
+    key = flow_key("10.0.0.5", "10.0.0.1", 6, 40000, 80)
+    assert key == flow_key("10.0.0.1", "10.0.0.5", 6, 80, 40000)
+    assert key != flow_key("10.0.0.5", "10.0.0.1", 17, 40000, 80)
+    assert -(1 << 63) <= key < (1 << 63)
+    script = ("import sys; sys.path.append(sys.argv[1]); "
+              "from src.Detection.packet_ring import flow_key; "
+              "print(flow_key('10.0.0.5', '10.0.0.1', 6, 40000, 80))")
+    for seed in ("1", "2"):
+        output = subprocess.run([sys.executable, "-c", script, str(Path(__file__).parent.parent)],
+                                env={"PYTHONHASHSEED": seed}, capture_output=True, text=True,
+                                check=True).stdout
+        assert int(output) == key
@@ -0,0 +1,87 @@
+import socket
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.pcap import (
+    RECORD_HEADER, build_ipv4_frame, build_tcp, build_udp, decode_frame, pcap_global_header, read_pcap,
+    write_pcap
+)
+from src.Sniffing.pcap_features import convert, parse_range, split_ranges, load_feature_matrix
+from benchmarks.scenarios import generate, write_scenario
+
+
+@pytest.fixture
+def capture(tmp_path):
+    pcap_path, _ = write_scenario(tmp_path, "mixed", generate("mixed", duration=5, pps=300))
+    return pcap_path
+
+
+def expected_rows(pcap_path):
+    rows = []
+    for ts, frame in read_pcap(pcap_path):
+        pkt = decode_frame(frame)
+        if pkt is not None:
+            rows.append((pkt.src_ip, pkt.dst_ip, pkt.src_port, pkt.dst_port, pkt.ttl, pkt.length, pkt.df))
+    return rows
+
+
+def test_ranges_split_on_record_boundaries_and_parse_identically(capture):
+    ranges = split_ranges(capture, 4096)
+    assert len(ranges) > 10
+    assert ranges[0][0] == 24 and ranges[-1][1] == capture.stat().st_size
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+    rows = []
+    for start, end in ranges:
+        columns, _ = parse_range((str(capture), start, end))
+        rows.extend(zip(
+            (socket.inet_ntoa(ip.to_bytes(4, "big")) for ip in columns["Source IP"]),
+            (socket.inet_ntoa(ip.to_bytes(4, "big")) for ip in columns["Destination IP"]),
+            columns["Source Port"], columns["Destination Port"], columns["TTL"],
+            columns["Length"], columns["Flags"]))
+    assert rows == expected_rows(capture)
+
+
+def test_convert_writes_loadable_columns(capture, tmp_path):
+    pytest.importorskip("pandas")
+    output = tmp_path / "features.npz"
+    stats = convert([capture], output, workers=2, chunk_bytes=16384)
+    frame = load_feature_matrix(output)
+    assert len(frame) == stats["packets"] == len(expected_rows(capture))
+    assert list(frame["TTL"]) == [row[4] for row in expected_rows(capture)]
+
+
+def test_only_first_fragments_have_ports(tmp_path):
+    def fragment(flags_and_offset):
+        frame = bytearray(build_ipv4_frame("10.0.0.1", "10.0.0.2", 17, build_udp(5353, 53, b"x" * 40),
+                                           df=False))
+        struct.pack_into("!H", frame, 20, flags_and_offset)
+        return bytes(frame)
+
+    # More-fragments with offset 0, a middle fragment, the last fragment, offset 0x100 with DF
+    frames = [fragment(0x2000), fragment(0x2000 | 185), fragment(370), fragment(0x4000 | 0x100)]
+    path = tmp_path / "fragments.pcap"
+    write_pcap(path, [(1.0 + i, frame) for i, frame in enumerate(frames)])
+    columns, _ = parse_range((str(path), 24, path.stat().st_size))
+    assert list(zip(columns["Source Port"], columns["Destination Port"])) == [(5353, 53), (0, 0), (0, 0), (0, 0)]
+    assert list(columns["Flags"]) == [0, 0, 0, 1]
+    assert [decode_frame(frame).dst_port for frame in frames] == [53, 0, 0, 0]
+
+
+def test_truncated_frames_report_the_captured_length(tmp_path):
+    """Length is caplen, as the live detector and pcap replay see it, not the original length."""
+    frames = [build_ipv4_frame("10.0.0.1", "10.0.0.2", 6, build_tcp(40000, 443, b"x" * size))
+              for size in (10, 500, 1400)]
+    path = tmp_path / "truncated.pcap"
+    with open(path, "wb") as f:
+        f.write(pcap_global_header(snaplen=96))
+        for i, frame in enumerate(frames):
+            f.write(RECORD_HEADER.pack(1 + i, 0, min(len(frame), 96), len(frame)) + frame[:96])
+    columns, _ = parse_range((str(path), 24, path.stat().st_size))
+    assert list(columns["Length"]) == [len(frames[0]), 96, 96]
+    assert list(columns["Length"]) == [decode_frame(frame).length for _, frame in read_pcap(path)]
+    assert list(columns["Destination Port"]) == [443, 443, 443]
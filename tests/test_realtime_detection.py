@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pytest.importorskip("joblib")
+pytest.importorskip("scapy")
+
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.config import FEATURE_COLUMNS, LABELING_RULES_PATH
+from utils.rule_engine import RuleSet, load_malicious_label
+from src.Detection import realtimeDetection as detector
+from src.Sniffing.capture_engine import PacketRecord
+
+
+class PassThroughScaler:
+    def transform(self, frame):
+        return frame.to_numpy()
+
+
+class StubModel:
+    """Predicts class 1 (suspicious, as the rules label it) unless the length is 666."""
+
+    def __init__(self):
+        self.rows = 0
+
+    def predict(self, features):
+        self.rows += len(features)
+        return np.where(features[:, FEATURE_COLUMNS.index("Length")] == 666, 0, 1)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = StubModel()
+    monkeypatch.setattr(detector, "model", model)
+    monkeypatch.setattr(detector, "scaler", PassThroughScaler())
+    monkeypatch.setattr(detector, "model_columns", FEATURE_COLUMNS)
+    monkeypatch.setattr(detector, "malicious_label", load_malicious_label(LABELING_RULES_PATH))
+    monkeypatch.setattr(detector, "rule_set", RuleSet.from_file(LABELING_RULES_PATH, FEATURE_COLUMNS))
+    monkeypatch.setattr(detector, "RULE_PREFILTER", True)
+    return model
+
+
+def packet(ttl, length=60):
+    return PacketRecord(1700000000.0, "10.0.0.1", "10.0.0.2", 6, 40000, 443, ttl, length, "DF", 1,
+                        b"", b"")
+
+
+def test_prefilter_keeps_model_alerts_on_rule_matched_packets(model):
+    assert detector.malicious_label == 1
+    # TTL 20 matches low_ttl, and the model labels it like the rules do
+    assert detector.detect_record(packet(20)) is True
+    assert detector.detect_record(packet(20, length=666)) is False
+    assert model.rows == 2
+    # No rule matches: reported normal without scoring
+    assert detector.detect_record(packet(64)) is False
+    assert model.rows == 2
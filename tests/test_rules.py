@@ -0,0 +1,59 @@
+## File: tests/test_rules.py
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.config import FEATURE_COLUMNS, LABELING_RULES_PATH
+from utils.rule_engine import RuleSet
+
+
+def random_packets(rows=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Source Port': rng.integers(0, 65536, rows),
+        'Destination Port': rng.integers(0, 65536, rows),
+        'TTL': rng.integers(1, 256, rows),
+        'Length': rng.integers(40, 1515, rows),
+        'Flags': rng.integers(0, 2, rows),
+    }, columns=FEATURE_COLUMNS)
+
+
+def test_vectorized_and_packet_evaluators_agree():
+    """Both compiled forms give the same label for every row, before and after reordering."""
+    rule_set = RuleSet.from_file(LABELING_RULES_PATH, FEATURE_COLUMNS)
+    df = random_packets()
+    for _ in range(2):
+        vectorized = rule_set.label_frame(df)
+        per_packet = [rule_set.label_packet(row) for row in df[FEATURE_COLUMNS].values.tolist()]
+        assert vectorized.tolist() == per_packet
+        rule_set.calibrate(df)
+
+
+def test_calibration_orders_by_match_rate():
+    rule_set = RuleSet.from_file(LABELING_RULES_PATH, FEATURE_COLUMNS)
+    selectivity = rule_set.calibrate(random_packets())
+    rates = [selectivity[rule.name] for rule in rule_set.ordered_rules]
+    assert rates == sorted(rates, reverse=True)
+
+
+def test_matches_original_thresholds():
+    rule_set = RuleSet.from_file(LABELING_RULES_PATH, FEATURE_COLUMNS)
+    assert rule_set.label_packet([5353, 5353, 1, 94, 0]) == 1
+    assert rule_set.label_packet([5353, 5353, 255, 152, 1]) == 0
+    assert rule_set.match_packet([1234, 60000, 64, 100, 1]) == "high_destination_port"
+
+
+def test_non_finite_thresholds_are_rejected(tmp_path):
+    """NaN/Infinity parse as JSON but are refused when the rules are loaded."""
+    for value in ("NaN", "Infinity", "[1, NaN]"):
+        op = "in" if value.startswith("[") else ">"
+        path = tmp_path / "rules.json"
+        path.write_text('{"rules": [{"name": "bad", "column": "TTL", "op": "%s", "value": %s}]}'
+                        % (op, value))
+        with pytest.raises(ValueError):
+            RuleSet.from_file(path, FEATURE_COLUMNS)
@@ -0,0 +1,81 @@
+import csv
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.Sniffing.sampling import StratifiedReservoir, SampledCsvSink, port_class
+
+
+def test_strata_share_a_fixed_capacity_and_weights_add_up():
+    reservoir = StratifiedReservoir(300, seed=1)
+    for i in range(100000):
+        reservoir.offer("tcp/well_known/0", i)
+        if i % 100 == 0:
+            reservoir.offer("udp/well_known/0", i)
+        if i % 2000 == 0:
+            reservoir.offer("tcp/dynamic/1", i)
+    kept = {key: len(items) for key, items in reservoir.reservoirs.items()}
+    assert kept == {"tcp/well_known/0": 100, "udp/well_known/0": 100, "tcp/dynamic/1": 50}
+    assert len(reservoir) <= 300
+    assert reservoir.weight("tcp/dynamic/1") == 1.0
+    assert sum(weight for _, _, weight in reservoir.items()) == pytest.approx(100000 + 1000 + 50)
+
+
+def test_sample_stays_uniform_across_rebalancing():
+    reservoir = StratifiedReservoir(2000, seed=7)
+    for i in range(10000):
+        reservoir.offer("bulk", i)
+        if i >= 5000:
+            # A second stratum appearing halfway halves the bulk quota
+            reservoir.offer("rare", i)
+    sample = reservoir.reservoirs["bulk"]
+    assert len(sample) == 1000
+    # Uniform over 0..9999: mean 5000 (std of the sample mean ~90), half from each half
+    assert abs(sum(sample) / len(sample) - 4999.5) < 400
+    assert 400 < sum(1 for i in sample if i < 5000) < 600
+
+
+def test_port_classes():
+    assert [port_class(p) for p in (None, 0, 53, 8080, 50000)] == \
+        ["none", "none", "well_known", "registered", "dynamic"]
+
+
+def test_sampled_csv_is_written_in_capture_order_with_weights(tmp_path):
+    capture_engine = pytest.importorskip("src.Sniffing.capture_engine")
+    path = tmp_path / "sample.csv"
+    sink = SampledCsvSink(path, capture_engine.ENHANCED_CSV_COLUMNS, capture_engine.enhanced_csv_row,
+                          capacity=20, seed=3)
+    for i in range(1000):
+        port = 443 if i % 50 else 60000
+        sink(capture_engine.PacketRecord(1700000000.0 + i, "10.0.0.1", "10.0.0.2", 6, 40000, port,
+                                         64, 60, "S", 1, b"", b""))
+    sink.close()
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 20
+    assert [row["Timestamp"] for row in rows] == sorted(row["Timestamp"] for row in rows)
+    weights = {row["Stratum"]: float(row["Sample Weight"]) for row in rows}
+    assert weights == {"tcp/well_known/0": 98.0, "tcp/dynamic/0": 2.0}
+
+
+def test_sample_is_saved_periodically_before_close(tmp_path):
+    capture_engine = pytest.importorskip("src.Sniffing.capture_engine")
+    path = tmp_path / "sample.csv"
+    sink = SampledCsvSink(path, capture_engine.ENHANCED_CSV_COLUMNS, capture_engine.enhanced_csv_row,
+                          capacity=20, seed=3, save_interval=0.05)
+
+    def offer(count):
+        for i in range(count):
+            sink(capture_engine.PacketRecord(1700000000.0 + i, "10.0.0.1", "10.0.0.2", 6, 40000, 443,
+                                             64, 60, "S", 1, b"", b""))
+
+    offer(5)
+    assert not path.exists()
+    time.sleep(0.06)
+    offer(1)
+    with open(path, newline="") as f:
+        assert len(list(csv.DictReader(f))) == 6
+    assert not path.with_name(path.name + ".tmp").exists()
@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.pcap import read_pcap, decode_frame
+from src.Detection.dns_monitor import DnsMonitor
+from benchmarks.scenarios import SCENARIOS, generate, write_scenario, read_labels
+
+
+def dns_alert_labels(pcap_path):
+    """Ground-truth labels of the packets the DNS monitor alerts on."""
+    monitor = DnsMonitor(5, 10000, 10, 604800, 5, 100)
+    flagged = []
+    for index, (ts, frame) in enumerate(read_pcap(pcap_path)):
+        pkt = decode_frame(frame)
+        if pkt is not None and monitor.observe(ts, pkt.src_ip, pkt.dst_ip, pkt.src_port,
+                                               pkt.dst_port, pkt.ttl, pkt.payload):
+            flagged.append(index)
+    return flagged
+
+
+def test_scenarios_write_one_label_per_packet(tmp_path):
+    for name in SCENARIOS:
+        packets = generate(name, duration=5, pps=100)
+        pcap_path, labels_path = write_scenario(tmp_path, name, packets)
+        labels = read_labels(labels_path)
+        assert len(labels) == len(list(read_pcap(pcap_path))) == len(packets)
+        attacks = {attack for label, attack in labels if label}
+        if name == "baseline":
+            assert not attacks
+        elif name == "mixed":
+            assert attacks == set(SCENARIOS) - {"baseline", "mixed"}
+        else:
+            assert attacks == {name}
+
+
+def test_dns_spoofing_ground_truth(tmp_path):
+    baseline, _ = write_scenario(tmp_path, "baseline", generate("baseline", duration=10))
+    assert dns_alert_labels(baseline) == []
+
+    pcap_path, labels_path = write_scenario(tmp_path, "dns_spoofing", generate("dns_spoofing", duration=10))
+    labels = read_labels(labels_path)
+    flagged = set(dns_alert_labels(pcap_path))
+    spoofed = {index for index, (label, _) in enumerate(labels) if label}
+    # Every forged answer is caught; the genuine answers losing a race are flagged too
+    assert spoofed and spoofed <= flagged
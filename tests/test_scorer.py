@@ -0,0 +1,75 @@
+import socket
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pytest.importorskip("joblib")
+
+sys.path.append(str(Path(__file__).parent.parent))
+from utils.config import LABELING_RULES_PATH
+from utils.rule_engine import load_malicious_label
+from src.Detection import wire
+from src.Detection.scorer import ScorerServer, decode_batch, model_scorer
+
+
+class RecordingScaler:
+    feature_names_in_ = np.array(["TTL", "Length", "Src Packet Rate", "Dst Distinct Ports"])
+
+    def __init__(self):
+        self.frames = []
+
+    def transform(self, frame):
+        self.frames.append(frame)
+        return frame.to_numpy()
+
+
+class LowTtlModel:
+    """Predicts class 1 (suspicious, as labeled by the rules) for TTL below 10."""
+
+    def predict(self, features):
+        return np.where(features[:, 0] < 10, 1, 0)
+
+
+def make_record(i, ttl):
+    return wire.FeatureRecord(1700000000.0 + i, "10.0.0.1", "10.0.0.2", 40000 + i, 443,
+                              6, ttl, 60 + i, 1, 1.5, 0.25, i, 3)
+
+
+def batch(sequence, ttls):
+    return wire.encode_batch(sequence, [wire.pack_record(make_record(i, ttl)) for i, ttl in enumerate(ttls)])
+
+
+def test_decoded_batch_is_scored_on_the_scaler_columns():
+    scaler = RecordingScaler()
+    score = model_scorer(LowTtlModel(), scaler, load_malicious_label(LABELING_RULES_PATH))
+    records = decode_batch(batch(1, [64, 5, 64, 3])[wire.HEADER.size:])
+    assert np.asarray(score(records)).tolist() == [False, True, False, True]
+
+    frame = scaler.frames[0]
+    assert list(frame.columns) == list(RecordingScaler.feature_names_in_)
+    assert frame["TTL"].tolist() == [64, 5, 64, 3]
+    assert frame["Length"].tolist() == [60, 61, 62, 63]
+    assert frame["Src Packet Rate"].tolist() == [1.5] * 4
+    assert frame["Dst Distinct Ports"].tolist() == [3] * 4
+
+
+def test_server_answers_each_batch_with_per_record_verdicts():
+    score = model_scorer(LowTtlModel(), RecordingScaler(), load_malicious_label(LABELING_RULES_PATH))
+    server = ScorerServer(("127.0.0.1", 0), score)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with socket.create_connection(server.server_address) as sock:
+            sock.sendall(wire.encode_frame(wire.HELLO, 0, b"test-sensor"))
+            sock.sendall(batch(9, [64, 5, 64, 3]))
+            assert wire.read_frame(sock) == (wire.VERDICTS, 9, bytes([0, 1, 0, 1]))
+            sock.sendall(batch(10, [2]))
+            assert wire.read_frame(sock) == (wire.VERDICTS, 10, b"\x01")
+        assert server.stats["records"] == 5 and server.stats["malicious"] == 3
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,77 @@
+import pickle
+import queue
+import sys
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+joblib = pytest.importorskip("joblib")
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.Detection.shadow import ShadowScorer, _STOP, _shadow_worker
+
+COLUMNS = ["Source Port", "Destination Port", "TTL", "Length", "Flags"]
+
+
+class PassThroughScaler:
+    feature_names_in_ = np.array(["TTL", "Length"])
+
+    def transform(self, frame):
+        return frame.to_numpy()
+
+
+class LowTtlModel:
+    """Predicts class 1 (suspicious, as labeled by the rules) for TTL below 10."""
+
+    def predict(self, features):
+        return np.where(features[:, 0] < 10, 1, 0)
+
+
+@pytest.fixture
+def candidate(tmp_path):
+    model_path, scaler_path = tmp_path / "model.pkl", tmp_path / "scaler.pkl"
+    joblib.dump(LowTtlModel(), model_path)
+    joblib.dump(PassThroughScaler(), scaler_path)
+    return model_path, scaler_path
+
+
+def rows(ttls):
+    return [[40000, 443, ttl, 60, 1] for ttl in ttls]
+
+
+def test_rows_are_batched_and_full_queue_drops_whole_batches(candidate):
+    # Not started: nothing drains the two-batch queue
+    scorer = ShadowScorer(*candidate, COLUMNS, 1, batch_size=4, max_pending_batches=2)
+    for row in rows(range(10)):
+        scorer.submit(row, False)
+    assert scorer.stats["submitted"] == 8 and len(scorer.rows) == 2
+    for row in rows(range(2)):
+        scorer.submit(row, False)
+    assert scorer.stats["submitted"] == 8 and scorer.stats["dropped"] == 4
+    assert scorer.rows == [] and scorer.stats["overhead_seconds"] > 0
+
+
+def test_worker_reports_agreement_against_production(candidate):
+    requests, reports = queue.Queue(), queue.Queue()
+    features = np.asarray(rows([5, 5, 5, 64, 64, 64, 64, 3]), dtype=np.float64)
+    production = np.array([True, True, False, False, False, True, False, False])
+    requests.put(pickle.dumps((features, production)))
+    requests.put(_STOP)
+    _shadow_worker(*candidate, COLUMNS, 1, requests, reports, report_interval=3600)
+
+    report = reports.get_nowait()
+    assert report["final"] and report["rows"] == 8 and report["batches"] == 1
+    # confusion[production][shadow]: shadow flags TTL 5, 5, 5 and 3
+    assert report["confusion"] == [[3, 2], [1, 2]]
+    assert report["disagreement_rate"] == pytest.approx(3 / 8)
+
+
+def test_end_to_end_through_the_worker_process(candidate):
+    scorer = ShadowScorer(*candidate, COLUMNS, 1, batch_size=16, report_interval=3600).start()
+    for row in rows([5] * 20 + [64] * 30):
+        scorer.submit(row, row[2] < 10)
+    report = scorer.close(timeout=30)
+    assert report["rows"] == 50 and report["disagreement_rate"] == 0.0
+    assert report["confusion"] == [[30, 0], [0, 20]]
@@ -0,0 +1,63 @@
+import multiprocessing
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.Detection import wire
+from src.Detection.shm_ring import SharedRing
+
+
+def record(i):
+    return wire.FeatureRecord(float(i), "10.0.0.1", "10.0.0.2", i % 65536, 80, 6, 64, 60, 1,
+                              1.0, 2.0, 3, 4)
+
+
+def read_all(ring, batch):
+    """Drain the ring; returns the timestamps read."""
+    seen = []
+    while (segment := ring.acquire(batch)) is not None:
+        view, count = segment
+        seen.extend(fields[0] for fields in wire.FEATURE_RECORD.iter_unpack(view))
+        view.release()
+        ring.release(count)
+    return seen
+
+
+def test_wraparound_and_overruns():
+    ring = SharedRing.create(8)
+    try:
+        assert all(ring.push(record(i)) for i in range(6))
+        assert read_all(ring, 4) == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+        # Slots 6..13 wrap around the end; two more than fit are dropped
+        results = [ring.push(record(i)) for i in range(6, 16)]
+        assert results.count(False) == 2
+        assert ring.stats()["occupancy"] == 8 and ring.stats()["overruns"] == 2
+        assert read_all(ring, 100) == [float(i) for i in range(6, 14)]
+        assert ring.stats()["occupancy"] == 0
+    finally:
+        ring.close()
+
+
+def _consume(name, expected, results):
+    ring = SharedRing.attach(name)
+    seen = []
+    while len(seen) < expected:
+        seen.extend(read_all(ring, 64))
+    ring.close()
+    results.put(seen == [float(i) for i in range(expected)])
+
+
+def test_cross_process_delivery_in_order():
+    ring = SharedRing.create(128)
+    results = multiprocessing.Queue()
+    consumer = multiprocessing.Process(target=_consume, args=(ring.name, 5000, results))
+    consumer.start()
+    try:
+        i = 0
+        while i < 5000:
+            if ring.push(record(i)):
+                i += 1
+        assert results.get(timeout=30)
+        consumer.join(10)
+    finally:
+        ring.close()
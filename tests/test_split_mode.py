@@ -0,0 +1,152 @@
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.Detection import wire
+from src.Detection.sensor import SensorClient
+
+
+def make_record(i):
+    # Rates are sent as float32, so use values it represents exactly
+    return wire.FeatureRecord(1700000000.25 + i, f"10.0.{i % 256}.1", "192.168.1.10", 40000 + i, 443,
+                              6, 64, 60 + i, i % 2, 1.5, 0.25, i, 3)
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+class FakeScorer:
+    """Acknowledges every batch with all-normal verdicts; can hang up after some batches."""
+
+    def __init__(self, port=0, hang_up_after=None):
+        self.listener = socket.create_server(("127.0.0.1", port))
+        self.port = self.listener.getsockname()[1]
+        self.hang_up_after = hang_up_after
+        self.sequences = []
+        self.records = []
+        self.connections = 0
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            with sock:
+                try:
+                    frame_type, _, name = wire.read_frame(sock)
+                    assert frame_type == wire.HELLO and name == b"test-sensor"
+                    while True:
+                        frame_type, sequence, payload = wire.read_frame(sock)
+                        if self.hang_up_after is not None and self.connections == 1 \
+                                and len(self.sequences) >= self.hang_up_after:
+                            # Drop the connection without acknowledging this batch
+                            break
+                        records = wire.unpack_records(payload)
+                        self.sequences.append(sequence)
+                        self.records.extend(records)
+                        sock.sendall(wire.encode_frame(wire.VERDICTS, sequence, bytes(len(records))))
+                except (ConnectionError, OSError):
+                    pass
+
+    def close(self):
+        self.listener.close()
+
+
+def unused_port():
+    with socket.create_server(("127.0.0.1", 0)) as sock:
+        return sock.getsockname()[1]
+
+
+def test_batch_frame_round_trip():
+    records = [make_record(i) for i in range(50)]
+    frame = wire.encode_batch(7, [wire.pack_record(record) for record in records])
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(frame + wire.encode_frame(wire.VERDICTS, 7, bytes([0, 1])))
+        frame_type, sequence, payload = wire.read_frame(right)
+        assert (frame_type, sequence) == (wire.BATCH, 7)
+        assert wire.unpack_records(payload) == records
+        assert wire.read_frame(right) == (wire.VERDICTS, 7, b"\x00\x01")
+
+    buffer = bytearray(wire.FEATURE_RECORD.size)
+    wire.pack_record_into(buffer, 0, records[3])
+    assert bytes(buffer) == wire.pack_record(records[3])
+
+
+def test_truncated_frame_raises_instead_of_returning_partial_data():
+    frame = wire.encode_batch(1, [wire.pack_record(make_record(i)) for i in range(4)])
+    for cut in (wire.HEADER.size - 3, wire.HEADER.size + 10, len(frame) - 1):
+        left, right = socket.socketpair()
+        with left, right:
+            left.sendall(frame[:cut])
+            left.shutdown(socket.SHUT_WR)
+            with pytest.raises(ConnectionError):
+                wire.read_frame(right)
+
+
+def test_garbled_frames_are_protocol_errors():
+    frame = wire.encode_batch(1, [wire.pack_record(make_record(0))])
+    bad_magic = b"XXXX" + frame[4:]
+    too_large = wire.HEADER.pack(wire.MAGIC, wire.VERSION, wire.BATCH, 0, 1, wire.MAX_PAYLOAD + 1)
+    for data in (bad_magic, too_large):
+        left, right = socket.socketpair()
+        with left, right:
+            left.sendall(data)
+            with pytest.raises(wire.ProtocolError):
+                wire.read_frame(right)
+    # Record count that does not match the payload size
+    payload = frame[wire.HEADER.size:]
+    with pytest.raises(wire.ProtocolError):
+        wire.unpack_records(wire.COUNT.pack(2) + payload[wire.COUNT.size:])
+
+
+def test_buffer_overflow_while_scorer_is_down_drops_oldest_then_delivers_the_rest():
+    port = unused_port()
+    client = SensorClient("127.0.0.1", port, "test-sensor", batch_size=2, batch_interval=0.05,
+                          max_buffered_batches=3, reconnect_max_delay=0.1).start()
+    for i in range(20):
+        client.add(make_record(i))
+    assert client.stats["batches"] == 10
+    assert client.stats["dropped_batches"] == 7 and client.stats["dropped_records"] == 14
+    assert list(client.pending) == [8, 9, 10]
+
+    scorer = FakeScorer(port)
+    try:
+        assert client.wait_idle(10.0)
+        assert sorted(scorer.sequences) == [8, 9, 10]
+        assert [record.src_port for record in scorer.records] == [40000 + i for i in range(14, 20)]
+        assert client.stats["acked_records"] == 6
+    finally:
+        client.close()
+        scorer.close()
+
+
+def test_unacknowledged_batches_are_resent_after_reconnect():
+    scorer = FakeScorer(hang_up_after=2)
+    client = SensorClient("127.0.0.1", scorer.port, "test-sensor", batch_size=5, batch_interval=0.05,
+                          max_in_flight=1, reconnect_max_delay=0.1).start()
+    try:
+        for i in range(30):
+            client.add(make_record(i))
+        assert client.wait_idle(10.0)
+        wait_for(lambda: client.stats["reconnects"] >= 1)
+        assert scorer.connections >= 2
+        assert client.stats["resent_batches"] >= 1
+        assert sorted(set(scorer.sequences)) == list(range(1, 7))
+        assert client.stats["acked_batches"] == 6 and client.stats["dropped_batches"] == 0
+    finally:
+        client.close()
+        scorer.close()
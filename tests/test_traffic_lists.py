@@ -0,0 +1,65 @@
+import ipaddress
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from src.Detection.traffic_lists import PrefixIndex, TrafficLists, ALLOW, DENY
+
+
+def brute_force_lookup(prefixes, address):
+    best = None
+    for cidr, action in prefixes.items():
+        network = ipaddress.ip_network(cidr)
+        if ipaddress.ip_address(address) in network and (best is None or network.prefixlen > best[0]):
+            best = (network.prefixlen, action)
+    return best[1] if best else None
+
+
+def test_longest_prefix_wins_over_nested_prefixes():
+    prefixes = {"10.0.0.0/8": ALLOW, "10.6.0.0/16": DENY, "10.6.6.6/32": ALLOW,
+                "10.6.7.0/24": ALLOW, "0.0.0.0/0": DENY, "255.255.255.255/32": ALLOW}
+    index = PrefixIndex(prefixes.items())
+    rng = random.Random(5)
+    probes = [rng.randrange(1 << 32) for _ in range(2000)]
+    probes += [int(ipaddress.ip_network(cidr).network_address) + delta
+               for cidr in prefixes for delta in (0, 1, 255)]
+    probes += [0x0A060605, 0x0A060607, 0x0A0608FF, 0xFFFFFFFF]
+    for address in probes:
+        address &= 0xFFFFFFFF
+        assert index.lookup(address) == brute_force_lookup(prefixes, address), hex(address)
+
+
+def test_random_prefix_sets_match_brute_force():
+    rng = random.Random(11)
+    prefixes = {}
+    for _ in range(300):
+        network = ipaddress.ip_network((rng.randrange(1 << 32), rng.choice([8, 16, 20, 24, 30, 32])),
+                                       strict=False)
+        prefixes[str(network)] = rng.choice([ALLOW, DENY])
+    index = PrefixIndex(prefixes.items())
+    for cidr in list(prefixes)[:100]:
+        base = int(ipaddress.ip_network(cidr).network_address)
+        for address in (base, base + 1, base - 1):
+            address &= 0xFFFFFFFF
+            assert index.lookup(address) == brute_force_lookup(prefixes, address)
+
+
+def test_decisions_by_side_and_port_pair(tmp_path):
+    path = tmp_path / "lists.json"
+    path.write_text(json.dumps({
+        "allow": {"dst": ["224.0.0.251/32"], "ports": [[123, 123]]},
+        "deny": {"either": ["192.168.1.66/32"], "ports": [[0, 4444]]},
+    }))
+    lists = TrafficLists.from_file(path)
+    assert lists.classify("192.168.1.10", "224.0.0.251", 5353, 5353) == (ALLOW, "dst")
+    # The allow entry only covers destinations
+    assert lists.classify("224.0.0.251", "192.168.1.10") == (None, None)
+    # Deny wins over a matching allow entry
+    assert lists.classify("192.168.1.66", "224.0.0.251", 5353, 5353) == (DENY, "src")
+    assert lists.classify("192.168.1.10", "192.168.1.66") == (DENY, "dst")
+    assert lists.classify("192.168.1.10", "10.0.0.1", 40000, 4444) == (DENY, "ports")
+    assert lists.classify("192.168.1.10", "10.0.0.1", 123, 123) == (ALLOW, "ports")
+    assert lists.stats["scored"] == 1
+    assert "2 bypassed" in lists.summary()
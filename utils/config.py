@@ -1,6 +1,7 @@
 ## File: utils/config.py
 # Configuration settings for the project
 import os
+import socket
 from pathlib import Path
 
 # Base directory (project root)
@@ -21,10 +22,67 @@ SCALER_PATH = MODEL_DIR / "scaler.pkl"
 LEGACY_MODEL_PATH = BASE_DIR / "logistic_model.pkl"
 LEGACY_SCALER_PATH = BASE_DIR / "scaler.pkl"
 
+# Candidate model scored in shadow mode next to the production model
+SHADOW_MODEL_PATH = Path(os.getenv("SHADOW_MODEL_PATH", MODEL_DIR / "candidate_detector.pkl"))
+SHADOW_SCALER_PATH = Path(os.getenv("SHADOW_SCALER_PATH", MODEL_DIR / "candidate_scaler.pkl"))
+SHADOW_MODE = os.getenv("SHADOW_MODE", "false").lower() in ("1", "true", "yes")
+SHADOW_BATCH_SIZE = int(os.getenv("SHADOW_BATCH_SIZE", "256"))  # Rows per batch sent to the shadow worker
+SHADOW_MAX_PENDING_BATCHES = int(os.getenv("SHADOW_MAX_PENDING_BATCHES", "32"))  # Further batches are dropped
+SHADOW_REPORT_INTERVAL = float(os.getenv("SHADOW_REPORT_INTERVAL", "60"))  # Seconds between comparison reports
+# When set, Traning.py saves to the candidate paths instead of replacing the legacy model files
+TRAIN_AS_CANDIDATE = os.getenv("TRAIN_AS_CANDIDATE", "false").lower() in ("1", "true", "yes")
+
 # Logs directory
 LOGS_DIR = BASE_DIR / "logs"
 LOGS_FILE = LOGS_DIR / "logs.log"
 
+# Alert database (SQLite, WAL mode)
+ALERT_DB_PATH = Path(os.getenv("ALERT_DB_PATH", LOGS_DIR / "alerts.db"))
+ALERT_BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", "500"))  # Rows per write transaction
+ALERT_FLUSH_INTERVAL = float(os.getenv("ALERT_FLUSH_INTERVAL", "1.0"))  # Max seconds before a partial batch is written
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", "100000"))  # Rows buffered before new ones are dropped
+ALERT_RETENTION_DAYS = float(os.getenv("ALERT_RETENTION_DAYS", "30"))  # Older rows are pruned
+ALERT_STORE_ALL_VERDICTS = os.getenv("ALERT_STORE_ALL_VERDICTS", "false").lower() in ("1", "true", "yes")
+
+# Live verdict subscriptions for downstream tools (JSON lines over TCP, see alert_stream.py)
+ALERT_STREAM_ENABLED = os.getenv("ALERT_STREAM_ENABLED", "false").lower() in ("1", "true", "yes")
+ALERT_STREAM_HOST = os.getenv("ALERT_STREAM_HOST", "127.0.0.1")
+ALERT_STREAM_PORT = int(os.getenv("ALERT_STREAM_PORT", "8765"))
+ALERT_STREAM_CLIENT_BUFFER = int(os.getenv("ALERT_STREAM_CLIENT_BUFFER", str(256 * 1024)))  # Unsent bytes before a subscriber is dropped
+ALERT_STREAM_MAX_PENDING = int(os.getenv("ALERT_STREAM_MAX_PENDING", "10000"))  # Verdicts awaiting fan-out before new ones are dropped
+ALERT_STREAM_MAX_CLIENTS = int(os.getenv("ALERT_STREAM_MAX_CLIENTS", "1000"))
+
+# Forensic ring buffer of raw frames, dumped to pcap around alerts
+FORENSIC_CAPTURE = os.getenv("FORENSIC_CAPTURE", "true").lower() in ("1", "true", "yes")
+FORENSIC_RING_BYTES = int(os.getenv("FORENSIC_RING_BYTES", str(32 * 1024 * 1024)))  # Raw frame arena size
+FORENSIC_RING_FRAMES = int(os.getenv("FORENSIC_RING_FRAMES", "262144"))  # Max frames indexed
+FORENSIC_PRE_SECONDS = float(os.getenv("FORENSIC_PRE_SECONDS", "10"))  # Context kept before an alert
+FORENSIC_POST_SECONDS = float(os.getenv("FORENSIC_POST_SECONDS", "5"))  # Context kept after an alert
+FORENSIC_DIR = Path(os.getenv("FORENSIC_DIR", LOGS_DIR / "forensics"))
+
+# Detector state checkpoints for warm restarts
+CHECKPOINT_ENABLED = os.getenv("CHECKPOINT_ENABLED", "true").lower() in ("1", "true", "yes")
+CHECKPOINT_DIR = Path(os.getenv("CHECKPOINT_DIR", LOGS_DIR / "checkpoints"))
+CHECKPOINT_INTERVAL = float(os.getenv("CHECKPOINT_INTERVAL", "30"))  # Seconds between snapshots
+CHECKPOINT_MAX_AGE = float(os.getenv("CHECKPOINT_MAX_AGE", "3600"))  # Older snapshots are ignored at startup
+
+# Split-mode detection: lightweight sensors forward feature batches to a central scorer
+SCORER_HOST = os.getenv("SCORER_HOST", "127.0.0.1")  # Scorer address used by sensors
+# Address the scorer listens on; the protocol has no authentication, so only widen this on a trusted network
+SCORER_BIND = os.getenv("SCORER_BIND", "127.0.0.1")
+SCORER_PORT = int(os.getenv("SCORER_PORT", "9099"))
+SENSOR_NAME = os.getenv("SENSOR_NAME", socket.gethostname())
+SENSOR_BATCH_SIZE = int(os.getenv("SENSOR_BATCH_SIZE", "256"))  # Records per batch
+SENSOR_BATCH_INTERVAL = float(os.getenv("SENSOR_BATCH_INTERVAL", "0.5"))  # Max seconds before a partial batch is sent
+SENSOR_MAX_BUFFERED_BATCHES = int(os.getenv("SENSOR_MAX_BUFFERED_BATCHES", "1024"))  # Unacked batches kept during outages
+SENSOR_MAX_IN_FLIGHT = int(os.getenv("SENSOR_MAX_IN_FLIGHT", "32"))  # Batches sent but not yet acknowledged
+SENSOR_RECONNECT_MAX_DELAY = float(os.getenv("SENSOR_RECONNECT_MAX_DELAY", "30"))
+
+# Two-process detection: capture and inference processes share a ring of feature records
+SHM_RING_RECORDS = int(os.getenv("SHM_RING_RECORDS", "262144"))  # Ring capacity; records beyond it are dropped
+SHM_BATCH_SIZE = int(os.getenv("SHM_BATCH_SIZE", "1024"))  # Max records scored per batch
+SHM_POLL_INTERVAL = float(os.getenv("SHM_POLL_INTERVAL", "0.002"))  # Inference sleep when the ring is empty
+
 # Network interface configuration
 # Can be overridden via environment variable: NETWORK_INTERFACE
 # Windows format: r"\Device\NPF_{GUID}"
@@ -34,14 +92,69 @@ NETWORK_INTERFACE = os.getenv("NETWORK_INTERFACE", None)
 # Packet capture settings
 PACKET_LIMIT = int(os.getenv("PACKET_LIMIT", "50"))  # Number of packets to capture
 PACKET_FILTER = os.getenv("PACKET_FILTER", "ip")  # BPF filter for packet capture
+CAPTURE_SINK_QUEUE_SIZE = int(os.getenv("CAPTURE_SINK_QUEUE_SIZE", "10000"))  # Per-sink queue; overflow is dropped
+CAPTURE_REPORT_INTERVAL = float(os.getenv("CAPTURE_REPORT_INTERVAL", "60"))  # Seconds between sink throughput reports
+# Write an enhanced_packets-style training CSV while the detector runs (empty = disabled)
+CAPTURE_TRAINING_CSV = os.getenv("CAPTURE_TRAINING_CSV", "")
+# Stratified reservoir sampling in the capture scripts: capture until Ctrl+C and keep at most
+# this many packets, balanced across protocol / port class / rule-predicted class (0 = disabled)
+CAPTURE_SAMPLE_SIZE = int(os.getenv("CAPTURE_SAMPLE_SIZE", "0"))
+
+# Offline pcap-to-feature conversion (src/Sniffing/pcap_features.py)
+PCAP_FEATURES_PATH = Path(os.getenv("PCAP_FEATURES_PATH", BASE_DIR / "datasets" / "pcap_features.npz"))
+PCAP_CHUNK_BYTES = int(os.getenv("PCAP_CHUNK_BYTES", str(64 * 1024 * 1024)))  # Bytes of pcap per work unit
+PCAP_WORKERS = int(os.getenv("PCAP_WORKERS", "0"))  # Parser processes (0 = one per CPU)
 
 # Feature columns for ML model
 FEATURE_COLUMNS = ['Source Port', 'Destination Port', 'TTL', 'Length', 'Flags']
 TARGET_COLUMN = 'Label'
+SAMPLE_WEIGHT_COLUMN = 'Sample Weight'  # Written by sampled captures (src/Sniffing/sampling.py)
+
+# Labeling rules (see config/labeling_rules.json), shared by LabellingData.py and the detector
+LABELING_RULES_PATH = Path(os.getenv("LABELING_RULES_PATH", BASE_DIR / "config" / "labeling_rules.json"))
+# When enabled, packets that match no labeling rule are reported Normal without model scoring
+RULE_PREFILTER = os.getenv("RULE_PREFILTER", "false").lower() in ("1", "true", "yes")
+
+# CIDR/port allow- and deny-lists checked before feature extraction (see traffic_lists.py)
+TRAFFIC_LISTS_ENABLED = os.getenv("TRAFFIC_LISTS_ENABLED", "true").lower() in ("1", "true", "yes")
+TRAFFIC_LISTS_PATH = Path(os.getenv("TRAFFIC_LISTS_PATH", BASE_DIR / "config" / "traffic_lists.json"))
+
+# Per-host rate features computed from the count-min sketches in the detector
+HOST_RATE_COLUMNS = ['Src Packet Rate', 'Dst Packet Rate', 'Src Distinct Ports', 'Dst Distinct Ports']
+
+# Feature drift monitoring against the training data (see utils/drift.py)
+DRIFT_MONITOR = os.getenv("DRIFT_MONITOR", "true").lower() in ("1", "true", "yes")
+DRIFT_REFERENCE_PATH = Path(os.getenv("DRIFT_REFERENCE_PATH", MODEL_DIR / "drift_reference.json"))
+SHADOW_DRIFT_REFERENCE_PATH = MODEL_DIR / "candidate_drift_reference.json"
+DRIFT_HISTOGRAM_BINS = int(os.getenv("DRIFT_HISTOGRAM_BINS", "10"))  # Quantile bins per feature in the training reference
+DRIFT_WINDOW_SECONDS = float(os.getenv("DRIFT_WINDOW_SECONDS", "600"))  # Sliding window compared with training
+DRIFT_WINDOW_BUCKETS = int(os.getenv("DRIFT_WINDOW_BUCKETS", "6"))
+DRIFT_BATCH_SIZE = int(os.getenv("DRIFT_BATCH_SIZE", "256"))  # Rows buffered per statistics update
+DRIFT_MIN_SAMPLES = int(os.getenv("DRIFT_MIN_SAMPLES", "1000"))  # Rows in the window before drift is judged
+DRIFT_PSI_THRESHOLD = float(os.getenv("DRIFT_PSI_THRESHOLD", "0.25"))  # Population stability index per feature
+DRIFT_MEAN_SHIFT = float(os.getenv("DRIFT_MEAN_SHIFT", "1.0"))  # Window mean shift in training standard deviations
+
+# Count-min sketch settings for per-host rate tracking
+# Estimates overshoot by at most SKETCH_EPSILON * (packets in window) with probability 1 - SKETCH_DELTA
+SKETCH_EPSILON = float(os.getenv("SKETCH_EPSILON", "0.001"))
+SKETCH_DELTA = float(os.getenv("SKETCH_DELTA", "0.01"))
+SKETCH_WINDOW_SECONDS = float(os.getenv("SKETCH_WINDOW_SECONDS", "60"))  # Sliding window length
+SKETCH_WINDOW_BUCKETS = int(os.getenv("SKETCH_WINDOW_BUCKETS", "6"))  # Sub-windows per sliding window
+HEAVY_HITTER_K = int(os.getenv("HEAVY_HITTER_K", "20"))  # Size of the top-k heavy-hitter list
+
+# DNS spoofing detection settings
+DNS_QUERY_TIMEOUT = float(os.getenv("DNS_QUERY_TIMEOUT", "5"))  # Seconds a query waits for its answer
+DNS_ANSWER_HOLD = float(os.getenv("DNS_ANSWER_HOLD", "10"))  # Seconds answered queries are kept to catch late duplicates
+DNS_MAX_PENDING = int(os.getenv("DNS_MAX_PENDING", "65536"))  # Bound on tracked transactions
+DNS_MAX_ANSWER_TTL = int(os.getenv("DNS_MAX_ANSWER_TTL", "604800"))  # Record TTLs above this are anomalous
+DNS_IP_TTL_TOLERANCE = int(os.getenv("DNS_IP_TTL_TOLERANCE", "5"))  # Allowed IP TTL drift per resolver
+DNS_MAX_RESOLVERS = int(os.getenv("DNS_MAX_RESOLVERS", "1024"))
 
 # Model training parameters
 TEST_SIZE = float(os.getenv("TEST_SIZE", "0.2"))
 RANDOM_STATE = int(os.getenv("RANDOM_STATE", "42"))
+# Weight rows by their "Sample Weight" column (from sampled captures) to undo the stratification
+TRAIN_SAMPLE_WEIGHTS = os.getenv("TRAIN_SAMPLE_WEIGHTS", "true").lower() in ("1", "true", "yes")
 
 # Create necessary directories
 MODEL_DIR.mkdir(exist_ok=True)
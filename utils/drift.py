@@ -0,0 +1,213 @@
+"""
+Feature drift between live traffic and the data the model was trained on.
+
+Training (Traning.py) saves a reference next to the model: per feature, the
+bin edges of a quantile histogram of the training data and the share of rows
+in each bin. The detector's DriftMonitor keeps, per feature and per time
+bucket of a sliding window, a running mean/variance (Welford's update, applied
+a batch at a time with Chan's merge) and counts in the same fixed bins.
+
+Rows are buffered and folded in per batch, so the per-packet cost is a list
+append. After each batch the window is compared with the scaler's mean_/var_
+(mean shift in training standard deviations) and with the training histogram
+(population stability index, PSI). A feature drifts when either exceeds its
+threshold.
+"""
+
+import json
+import time
+
+import numpy as np
+
+# Keeps PSI finite when a bin is empty on one side
+_PSI_FLOOR = 1e-4
+
+
+def histogram(values, edges):
+    """Counts per bin; bin i holds edges[i-1] <= value < edges[i], with open outer bins."""
+    return np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+
+
+def psi(expected, actual):
+    """Population stability index between two bin distributions (proportions)."""
+    expected = np.maximum(np.asarray(expected, dtype=float), _PSI_FLOOR)
+    actual = np.maximum(np.asarray(actual, dtype=float), _PSI_FLOOR)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def _weighted_quantiles(values, weights, quantiles):
+    order = np.argsort(values, kind="stable")
+    cumulative = np.cumsum(weights[order])
+    positions = np.searchsorted(cumulative, quantiles * cumulative[-1], side="left")
+    return values[order][np.minimum(positions, len(values) - 1)]
+
+
+def build_reference(df, columns, bins=10, weights=None):
+    """Training histograms per column, with bin edges at the training quantiles.
+
+    weights (e.g. the sample weights of a stratified capture) make the reference
+    describe the original traffic rather than the sample.
+    """
+    reference = {"rows": len(df), "features": {}}
+    weights = np.ones(len(df)) if weights is None else np.asarray(weights, dtype=float)
+    total = weights.sum()
+    for column in columns:
+        values = df[column].to_numpy(dtype=float)
+        if total <= 0:
+            reference["features"][column] = {"edges": [], "proportions": [1.0], "mean": 0.0, "var": 0.0}
+            continue
+        # Discrete features (flags, well-known ports) collapse to fewer distinct edges
+        edges = np.unique(_weighted_quantiles(values, weights, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), weights=weights,
+                             minlength=len(edges) + 1)
+        mean = np.average(values, weights=weights)
+        reference["features"][column] = {
+            "edges": edges.tolist(),
+            "proportions": (counts / total).tolist(),
+            "mean": float(mean),
+            "var": float(np.average((values - mean) ** 2, weights=weights)),
+        }
+    return reference
+
+
+def save_reference(path, reference):
+    with open(path, "w") as f:
+        json.dump(reference, f, indent=1)
+
+
+def load_reference(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class DriftMonitor:
+    """Sliding-window feature statistics compared against the training distribution."""
+
+    def __init__(self, columns, train_mean, train_var, reference=None, window_seconds=600.0,
+                 buckets=6, batch_size=256, psi_threshold=0.25, mean_shift=1.0, min_samples=1000,
+                 positions=None):
+        """positions: where each of columns sits in the rows passed to add() (default: same order)."""
+        self.columns = list(columns)
+        self.positions = None if positions is None else np.asarray(positions)
+        self.train_mean = np.asarray(train_mean, dtype=float)
+        self.train_std = np.sqrt(np.maximum(np.asarray(train_var, dtype=float), 1e-12))
+        self.bucket_seconds = window_seconds / buckets
+        self.buckets = buckets
+        self.batch_size = batch_size
+        self.psi_threshold = psi_threshold
+        self.mean_shift = mean_shift
+        self.min_samples = min_samples
+
+        features = (reference or {}).get("features", {})
+        # Features without a training histogram are checked on mean shift only
+        self.edges = [np.asarray(features[c]["edges"], dtype=float) if c in features else None
+                      for c in self.columns]
+        self.expected = [np.asarray(features[c]["proportions"], dtype=float) if c in features else None
+                         for c in self.columns]
+
+        width = len(self.columns)
+        self.counts = np.zeros(buckets)
+        self.means = np.zeros((buckets, width))
+        self.m2 = np.zeros((buckets, width))
+        self.hists = [np.zeros((buckets, len(edges) + 1)) if edges is not None else None
+                      for edges in self.edges]
+        self.epoch = None
+        self.pending = []
+        self.last_timestamp = 0.0
+        self.drifting = []
+        self.stats = {"rows": 0, "batches": 0, "signals": 0, "seconds": 0.0}
+
+    def add(self, row, timestamp):
+        """Buffer one feature row; returns a report when a batch is folded in."""
+        self.pending.append(row)
+        self.last_timestamp = timestamp
+        if len(self.pending) >= self.batch_size:
+            return self.flush()
+        return None
+
+    def _slot(self, timestamp):
+        epoch = int(timestamp // self.bucket_seconds)
+        if self.epoch is None:
+            self.epoch = epoch
+        elif epoch > self.epoch:
+            # Clear the buckets that fell out of the window
+            for stale in range(self.epoch + 1, min(epoch, self.epoch + self.buckets) + 1):
+                slot = stale % self.buckets
+                self.counts[slot] = 0
+                self.means[slot] = 0
+                self.m2[slot] = 0
+                for hist in self.hists:
+                    if hist is not None:
+                        hist[slot] = 0
+            self.epoch = epoch
+        # Late rows go to the current bucket
+        return self.epoch % self.buckets
+
+    def flush(self):
+        """Fold the buffered rows into the window and check it; returns the check report."""
+        if not self.pending:
+            return None
+        start_time = time.perf_counter()
+        batch = np.asarray(self.pending, dtype=float)
+        if self.positions is not None:
+            batch = batch[:, self.positions]
+        self.pending = []
+        slot = self._slot(self.last_timestamp)
+
+        n = len(batch)
+        batch_mean = batch.mean(axis=0)
+        batch_m2 = ((batch - batch_mean) ** 2).sum(axis=0)
+        count = self.counts[slot]
+        total = count + n
+        delta = batch_mean - self.means[slot]
+        self.means[slot] += delta * (n / total)
+        self.m2[slot] += batch_m2 + delta ** 2 * (count * n / total)
+        self.counts[slot] = total
+        for i, edges in enumerate(self.edges):
+            if edges is not None:
+                self.hists[i][slot] += histogram(batch[:, i], edges)
+
+        self.stats["rows"] += n
+        self.stats["batches"] += 1
+        report = self.check()
+        self.stats["seconds"] += time.perf_counter() - start_time
+        return report
+
+    def window(self):
+        """(rows, mean, variance) per feature over the whole window."""
+        rows = self.counts.sum()
+        if rows == 0:
+            width = len(self.columns)
+            return 0, np.zeros(width), np.zeros(width)
+        weights = self.counts[:, None]
+        mean = (weights * self.means).sum(axis=0) / rows
+        m2 = self.m2.sum(axis=0) + (weights * (self.means - mean) ** 2).sum(axis=0)
+        return int(rows), mean, m2 / rows
+
+    def check(self):
+        """Compare the window with training; returns a report dict, or None below min_samples."""
+        rows, mean, var = self.window()
+        if rows < self.min_samples:
+            return None
+        shift = np.abs(mean - self.train_mean) / self.train_std
+        features = {}
+        drifting = []
+        for i, column in enumerate(self.columns):
+            feature = {"mean": float(mean[i]), "shift": float(shift[i]),
+                       "var_ratio": float(var[i] / self.train_std[i] ** 2)}
+            if self.edges[i] is not None:
+                feature["psi"] = psi(self.expected[i], self.hists[i].sum(axis=0) / rows)
+            features[column] = feature
+            if feature["shift"] > self.mean_shift or feature.get("psi", 0.0) > self.psi_threshold:
+                drifting.append(column)
+        changed = drifting != self.drifting
+        if drifting and not self.drifting:
+            self.stats["signals"] += 1
+        self.drifting = drifting
+        return {"rows": rows, "drifting": drifting, "changed": changed, "features": features}
+
+    def summary(self):
+        per_row = self.stats["seconds"] / self.stats["rows"] * 1e6 if self.stats["rows"] else 0.0
+        return (f"{self.stats['rows']} rows in {self.stats['batches']} batches, "
+                f"{self.stats['signals']} drift signals, {per_row:.2f} us/row, "
+                f"drifting now: {self.drifting or 'none'}")
@@ -0,0 +1,173 @@
+## File: utils/pcap.py
+# Minimal pcap reading/writing and raw frame decoding (standard library only)
+import socket
+import struct
+from collections import namedtuple
+
+PCAP_MAGIC = 0xa1b2c3d4
+PCAP_MAGIC_NANO = 0xa1b23c4d
+LINKTYPE_ETHERNET = 1
+
+GLOBAL_HEADER = struct.Struct("<IHHiIII")
+RECORD_HEADER = struct.Struct("<IIII")
+
+ETH_P_IP = 0x0800
+ETH_P_ARP = 0x0806
+ETH_P_VLAN = 0x8100
+
+PROTO_TCP = 6
+PROTO_UDP = 17
+
+DEFAULT_SRC_MAC = b"\x02\x00\x00\x00\x00\x01"
+DEFAULT_DST_MAC = b"\x02\x00\x00\x00\x00\x02"
+
+# Decoded view of an Ethernet/IPv4 frame; payload is a memoryview of the L4 payload
+RawPacket = namedtuple("RawPacket", [
+    "src_ip", "dst_ip", "proto", "ttl", "df", "src_port", "dst_port", "length", "payload"
+])
+
+
+def pcap_global_header(snaplen=65535, linktype=LINKTYPE_ETHERNET):
+    """Return the 24-byte pcap file header."""
+    return GLOBAL_HEADER.pack(PCAP_MAGIC, 2, 4, 0, 0, snaplen, linktype)
+
+
+def pcap_record(timestamp, frame):
+    """Return one pcap record (header + frame bytes)."""
+    seconds = int(timestamp)
+    micros = int(round((timestamp - seconds) * 1_000_000))
+    if micros >= 1_000_000:
+        seconds, micros = seconds + 1, micros - 1_000_000
+    return RECORD_HEADER.pack(seconds, micros, len(frame), len(frame)) + bytes(frame)
+
+
+class PcapWriter:
+    """Streaming pcap writer for (timestamp, frame) pairs."""
+
+    def __init__(self, path, snaplen=65535, linktype=LINKTYPE_ETHERNET, mode="wb"):
+        self.file = open(path, mode)
+        self.file.write(pcap_global_header(snaplen, linktype))
+        self.count = 0
+
+    def write(self, timestamp, frame):
+        self.file.write(pcap_record(timestamp, frame))
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_pcap(path, frames):
+    """Write an iterable of (timestamp, frame) pairs to a pcap file."""
+    with PcapWriter(path) as writer:
+        for timestamp, frame in frames:
+            writer.write(timestamp, frame)
+        return writer.count
+
+
+def parse_global_header(header):
+    """Return (record header struct, timestamp divisor, linktype) for a pcap file header."""
+    if len(header) < GLOBAL_HEADER.size:
+        raise ValueError("Truncated pcap file header")
+    for endian in ("<", ">"):
+        magic = struct.unpack(endian + "I", header[:4])[0]
+        if magic in (PCAP_MAGIC, PCAP_MAGIC_NANO):
+            linktype = struct.unpack(endian + "I", header[20:24])[0]
+            divisor = 1_000_000 if magic == PCAP_MAGIC else 1_000_000_000
+            return struct.Struct(endian + "IIII"), divisor, linktype
+    raise ValueError("Not a pcap file (pcapng is not supported)")
+
+
+def read_pcap(path):
+    """Yield (timestamp, frame bytes) pairs from a pcap file."""
+    with open(path, "rb") as f:
+        record, divisor, _ = parse_global_header(f.read(GLOBAL_HEADER.size))
+        while True:
+            header = f.read(record.size)
+            if len(header) < record.size:
+                return
+            seconds, fraction, caplen, _ = record.unpack(header)
+            frame = f.read(caplen)
+            if len(frame) < caplen:
+                return
+            yield seconds + fraction / divisor, frame
+
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def build_udp(src_port, dst_port, payload=b""):
+    """Return a UDP header + payload (checksum left at 0, which IPv4 allows)."""
+    return struct.pack("!HHHH", src_port, dst_port, 8 + len(payload), 0) + payload
+
+
+def build_tcp(src_port, dst_port, payload=b"", seq=0, ack=0, flags=0x18, window=64240):
+    """Return a 20-byte TCP header + payload (checksum left at 0)."""
+    return struct.pack("!HHIIBBHHH", src_port, dst_port, seq, ack, 5 << 4, flags,
+                       window, 0, 0) + payload
+
+
+def build_ipv4_frame(src_ip, dst_ip, proto, l4, ttl=64, df=True, ident=0,
+                     src_mac=DEFAULT_SRC_MAC, dst_mac=DEFAULT_DST_MAC):
+    """Return an Ethernet frame carrying an IPv4 packet with the given L4 bytes."""
+    header = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(l4), ident & 0xFFFF,
+                         0x4000 if df else 0, ttl, proto, 0,
+                         socket.inet_aton(src_ip), socket.inet_aton(dst_ip))
+    header = header[:10] + struct.pack("!H", _checksum(header)) + header[12:]
+    return dst_mac + src_mac + struct.pack("!H", ETH_P_IP) + header + l4
+
+
+def build_arp_frame(op, sender_mac, sender_ip, target_mac, target_ip, dst_mac=b"\xff" * 6):
+    """Return an Ethernet ARP frame (op 1 = request, 2 = reply)."""
+    body = struct.pack("!HHBBH6s4s6s4s", 1, ETH_P_IP, 6, 4, op,
+                       sender_mac, socket.inet_aton(sender_ip),
+                       target_mac, socket.inet_aton(target_ip))
+    return dst_mac + sender_mac + struct.pack("!H", ETH_P_ARP) + body
+
+
+def decode_frame(frame):
+    """Decode an Ethernet/IPv4 frame into a RawPacket, or return None for other traffic."""
+    if len(frame) < 34:
+        return None
+    ethertype = (frame[12] << 8) | frame[13]
+    offset = 14
+    if ethertype == ETH_P_VLAN:
+        ethertype = (frame[16] << 8) | frame[17]
+        offset = 18
+    if ethertype != ETH_P_IP or len(frame) < offset + 20:
+        return None
+
+    ihl = (frame[offset] & 0x0F) * 4
+    ttl = frame[offset + 8]
+    proto = frame[offset + 9]
+    df = 1 if frame[offset + 6] & 0x40 else 0
+    fragment_offset = ((frame[offset + 6] & 0x1F) << 8) | frame[offset + 7]
+    src_ip = socket.inet_ntoa(frame[offset + 12:offset + 16])
+    dst_ip = socket.inet_ntoa(frame[offset + 16:offset + 20])
+
+    l4 = offset + ihl
+    src_port = dst_port = 0
+    payload_start = l4
+    # Non-first fragments carry no L4 header
+    if proto in (PROTO_TCP, PROTO_UDP) and fragment_offset == 0 and len(frame) >= l4 + 8:
+        src_port = (frame[l4] << 8) | frame[l4 + 1]
+        dst_port = (frame[l4 + 2] << 8) | frame[l4 + 3]
+        if proto == PROTO_UDP:
+            payload_start = l4 + 8
+        elif len(frame) >= l4 + 13:
+            payload_start = l4 + (frame[l4 + 12] >> 4) * 4
+
+    return RawPacket(src_ip, dst_ip, proto, ttl, df, src_port, dst_port,
+                     len(frame), memoryview(frame)[payload_start:])
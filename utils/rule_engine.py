@@ -0,0 +1,161 @@
+## File: utils/rule_engine.py
+# Declarative labeling rules compiled into vectorized and per-packet evaluators
+import json
+import math
+import numbers
+import operator
+from collections import namedtuple
+
+import numpy as np
+
+Rule = namedtuple("Rule", ["name", "column", "op", "value", "description"])
+
+_COMPARISONS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+_MEMBERSHIP = {"in", "not_in"}
+
+
+def _is_number(value):
+    # json.load accepts NaN and Infinity, which no packet feature can match meaningfully
+    return (isinstance(value, numbers.Real) and not isinstance(value, bool)
+            and math.isfinite(value))
+
+
+def _validate_rule(entry):
+    """Return a Rule from a config entry, raising ValueError on bad definitions."""
+    missing = [key for key in ("name", "column", "op", "value") if key not in entry]
+    if missing:
+        raise ValueError(f"Rule {entry.get('name', entry)} is missing {missing}")
+
+    op = entry["op"]
+    value = entry["value"]
+    if op in _COMPARISONS:
+        if not _is_number(value):
+            raise ValueError(f"Rule {entry['name']}: '{op}' needs a finite numeric value")
+    elif op in _MEMBERSHIP:
+        if not isinstance(value, list) or not all(_is_number(v) for v in value):
+            raise ValueError(f"Rule {entry['name']}: '{op}' needs a list of finite numbers")
+        value = tuple(value)
+    else:
+        raise ValueError(f"Rule {entry['name']}: unknown operator '{op}'")
+    return Rule(entry["name"], entry["column"], op, value, entry.get("description", ""))
+
+
+def load_rules(path):
+    """Load a rules file and return (rules, label_on_match, label_default)."""
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    rules = [_validate_rule(entry) for entry in config.get("rules", [])]
+    names = [rule.name for rule in rules]
+    if len(set(names)) != len(names):
+        raise ValueError("Rule names must be unique")
+    return rules, config.get("label_on_match", 1), config.get("label_default", 0)
+
+
+def load_malicious_label(path):
+    """Return the rules file's label_on_match: the model class to report as malicious.
+
+    Training labels come from these rules, so every scorer compares model
+    predictions with this value rather than assuming a class.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("label_on_match", 1)
+
+
+def _rule_mask(rule, frame):
+    """Evaluate one rule over a DataFrame (or mapping of column -> array)."""
+    values = np.asarray(frame[rule.column])
+    if rule.op == "in":
+        return np.isin(values, rule.value)
+    if rule.op == "not_in":
+        return ~np.isin(values, rule.value)
+    return _COMPARISONS[rule.op](values, rule.value)
+
+
+def _compile_packet_evaluator(rules, columns):
+    """Generate a function returning the index of the first matching rule, or -1.
+
+    Rules are tested in the given order and evaluation stops at the first match,
+    so the most frequently matching rules should come first.
+    """
+    namespace = {}
+    lines = ["def evaluate(features):"]
+    for i, rule in enumerate(rules):
+        position = columns.index(rule.column)
+        if rule.op in _MEMBERSHIP:
+            namespace[f"_values_{i}"] = frozenset(rule.value)
+            keyword = "in" if rule.op == "in" else "not in"
+            condition = f"features[{position}] {keyword} _values_{i}"
+        else:
+            # Thresholds are bound by name rather than inlined as source text
+            namespace[f"_value_{i}"] = rule.value
+            condition = f"features[{position}] {rule.op} _value_{i}"
+        lines.append(f"    if {condition}:")
+        lines.append(f"        return {i}")
+    lines.append("    return -1")
+    exec(compile("\n".join(lines), "<labeling rules>", "exec"), namespace)
+    return namespace["evaluate"]
+
+
+class RuleSet:
+    """A set of OR-combined labeling rules with two compiled forms.
+
+    - label_frame: vectorized NumPy evaluation for DataFrames and feature batches
+    - match_packet / label_packet: short-circuit evaluation of one feature row,
+      with rules ordered by their measured match rate
+    """
+
+    def __init__(self, rules, columns, label_on_match=1, label_default=0):
+        unknown = [rule.column for rule in rules if rule.column not in columns]
+        if unknown:
+            raise ValueError(f"Rules reference unknown columns: {unknown}")
+        self.rules = list(rules)
+        self.columns = list(columns)
+        self.label_on_match = label_on_match
+        self.label_default = label_default
+        self.selectivity = {}
+        self._order(self.rules)
+
+    @classmethod
+    def from_file(cls, path, columns):
+        rules, label_on_match, label_default = load_rules(path)
+        return cls(rules, columns, label_on_match, label_default)
+
+    def _order(self, ordered):
+        self.ordered_rules = ordered
+        self._evaluate = _compile_packet_evaluator(ordered, self.columns)
+
+    def calibrate(self, frame):
+        """Measure each rule's match rate on frame and reorder the per-packet evaluator."""
+        rows = len(frame)
+        if rows == 0:
+            return self.selectivity
+        self.selectivity = {rule.name: float(_rule_mask(rule, frame).mean()) for rule in self.rules}
+        self._order(sorted(self.rules, key=lambda rule: -self.selectivity[rule.name]))
+        return self.selectivity
+
+    def rule_masks(self, frame):
+        """Return {rule name: boolean match array} for every rule."""
+        return {rule.name: _rule_mask(rule, frame) for rule in self.rules}
+
+    def label_frame(self, frame):
+        """Label every row of frame; returns an integer NumPy array."""
+        matched = np.zeros(len(frame), dtype=bool)
+        for rule in self.ordered_rules:
+            matched |= _rule_mask(rule, frame)
+        return np.where(matched, self.label_on_match, self.label_default)
+
+    def match_packet(self, features):
+        """Return the name of the first rule matching a feature row (in column order), or None."""
+        index = self._evaluate(features)
+        return None if index < 0 else self.ordered_rules[index].name
+
+    def label_packet(self, features):
+        """Return the label for a single feature row given in column order."""
+        return self.label_default if self._evaluate(features) < 0 else self.label_on_match